@@ -0,0 +1,34 @@
+"""set book_chapter sort_order type is double
+
+Revision ID: d2f7a4c9b318
+Revises: a6e3c58f1b72
+Create Date: 2025-10-13 10:42:18.305614
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f7a4c9b318'
+down_revision: Union[str, None] = 'a6e3c58f1b72'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column('book_chapter', 'sort_order',
+                    existing_type=sa.Float(),
+                    type_=sa.Double(),
+                    existing_nullable=False)
+    # 单精度转换后带有误差（如 1001.01 -> 1001.0100097656），排序值只有两位小数，取整还原
+    op.execute("update book_chapter set sort_order = round(sort_order, 2)")
+
+
+def downgrade() -> None:
+    op.alter_column('book_chapter', 'sort_order',
+                    existing_type=sa.Double(),
+                    type_=sa.Float(),
+                    existing_nullable=False)
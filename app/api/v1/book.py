@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Path
+from fastapi import APIRouter, File, Path, UploadFile, status
 from fastapi.params import Depends, Query
-from typing import Annotated
+from typing import Annotated, Literal
 
 from pydantic import Field
 from sqlmodel.ext.asyncio.session import AsyncSession
@@ -8,14 +8,44 @@ from sqlmodel.ext.asyncio.session import AsyncSession
 from app.core import wrap_error_handler_api
 from app.core.config import settings
 from app.core.database import get_session
+from app.core.error_handler import CustomException
 from app.core.security import get_current_user
 from app.models.response_model import ResponseModel
 from app.services.book_service import book_service
-from app.services.cache_service import cache
+from app.services.cache_service import cache_response
+from app.services.ingest_service import ingest_service
+from app.services.popularity_service import popularity_service
+from app.services.recommendation_service import recommendation_service
 
 book_router = APIRouter(prefix="/book", tags=["book"])
 
 
+async def track_chapter_read(
+        database: Annotated[AsyncSession, Depends(get_session)],
+        current_user=Depends(get_current_user),
+        id: int = Path(..., title="id", description="id", gt=0)):
+    """
+    记录章节阅读事件（依赖项，缓存命中时同样生效）
+    """
+    book_id = await book_service.get_chapter_book_id(chapter_id=id, database=database)
+    if book_id:
+        await popularity_service.record_read(book_id=book_id, user_id=current_user['id'], chapter_id=id)
+
+
+async def track_chapter_read_by_index(
+        database: Annotated[AsyncSession, Depends(get_session)],
+        current_user=Depends(get_current_user),
+        book_id: int = Path(..., title="book_id", description="book_id", gt=0),
+        chapter_index: int = Path(..., title="chapter_index", description="chapter_index", gt=-1)):
+    """
+    记录章节阅读事件（按索引读取），章节不存在时不记录
+    """
+    chapter_id = await book_service.get_chapter_id_by_index(book_id=book_id, chapter_index=chapter_index,
+                                                            database=database)
+    if chapter_id:
+        await popularity_service.record_read(book_id=book_id, user_id=current_user['id'], chapter_id=chapter_id)
+
+
 @book_router.get("/total", response_model=ResponseModel)
 @wrap_error_handler_api()
 async def get_books_total_count(
@@ -65,8 +95,61 @@ async def get_book_list(
     return ResponseModel(data=result)
 
 
+@book_router.get("/popular", response_model=ResponseModel)
+@wrap_error_handler_api()
+async def get_popular_books(
+        period: Annotated[Literal["day", "week", "all", "trending"], Query()] = "day",
+        limit: Annotated[int, Query(gt=0, le=settings.POPULARITY_TOP_LIMIT)] = 20,
+):
+    """
+    获取热门图书排行
+    :param period:    排行周期 day | week | all | trending（按时间衰减）
+    :param limit:     条数
+    :return:          [{"book_id", "score", "readers"}]
+    """
+    result = await popularity_service.get_top_books(period=period, limit=limit)
+    return ResponseModel(data=result)
+
+
+@book_router.post("/upload", status_code=status.HTTP_202_ACCEPTED, response_model=ResponseModel)
+@wrap_error_handler_api()
+async def upload_book(
+        file: Annotated[UploadFile, File(description="EPUB 文件")],
+        current_user=Depends(get_current_user)):
+    """
+    上传 EPUB 并创建入库任务，解析与写库由 app/workers/ingest_worker.py 异步完成
+    :param file:     EPUB 文件
+    :return:         任务信息，通过 /book/upload/{job_id} 查询进度
+    """
+    if not (file.filename or "").lower().endswith(".epub"):
+        raise CustomException(status_code=status.HTTP_400_BAD_REQUEST, message="只支持 EPUB 文件")
+    try:
+        path = await ingest_service.save_upload(file)
+    except ValueError as e:
+        raise CustomException(status_code=status.HTTP_400_BAD_REQUEST, message=str(e))
+    job = await ingest_service.create_job(user_id=current_user['id'], filename=file.filename, path=path)
+    return ResponseModel(data=job)
+
+
+@book_router.get("/upload/{job_id}", response_model=ResponseModel)
+@wrap_error_handler_api()
+async def get_upload_job(
+        current_user=Depends(get_current_user),
+        job_id: str = Path(..., title="job_id", description="任务ID", pattern=r"^[0-9a-f]{32}$")):
+    """
+    查询入库任务状态
+    :param job_id:     任务ID
+    :return:       任务信息（status: queued | running | done | skipped | failed，progress: 0~100）
+    """
+    job = await ingest_service.get_job(job_id)
+    if job is None or job['user_id'] != current_user['id']:
+        raise CustomException(status_code=status.HTTP_404_NOT_FOUND, message="任务不存在")
+    return ResponseModel(data=ingest_service.to_public(job))
+
+
 @book_router.get("/{book_id}", response_model=ResponseModel)
 @wrap_error_handler_api()
+@cache_response(expire=settings.RESPONSE_CACHE_EXPIRE, exclude_kwargs=["database"], key_prefix="get_book_by_id")
 async def get_book(
         database: Annotated[AsyncSession, Depends(get_session)]
         , book_id: int = Path(..., title="book_id", description="book_id", gt=0)):
@@ -80,8 +163,24 @@ async def get_book(
     return ResponseModel(data=result)
 
 
+@book_router.get("/recommend/{book_id}", response_model=ResponseModel)
+@wrap_error_handler_api()
+async def get_book_recommendations(
+        database: Annotated[AsyncSession, Depends(get_session)]
+        , book_id: int = Path(..., title="book_id", description="book_id", gt=0)):
+    """
+    获取图书推荐（读过此书的人也读过）
+    :param database:      数据库会话
+    :param book_id:         图书ID
+    :return:         [{"book_id", "score"}]
+    """
+    result = await recommendation_service.get_book_recommendations(book_id=book_id, database=database)
+    return ResponseModel(data=result)
+
+
 @book_router.get("/toc/{book_id}", response_model=ResponseModel)
 @wrap_error_handler_api()
+@cache_response(expire=settings.RESPONSE_CACHE_EXPIRE, exclude_kwargs=["database"], key_prefix="get_book_toc_by_id")
 async def get_book_toc(
         database: Annotated[AsyncSession, Depends(get_session)]
         , book_id: int = Path(..., title="book_id", description="book_id", gt=0)):
@@ -95,8 +194,10 @@ async def get_book_toc(
     return ResponseModel(data=result)
 
 
-@book_router.get("/chapter/{id}", dependencies=[Depends(get_current_user)], response_model=ResponseModel)
+@book_router.get("/chapter/{id}", dependencies=[Depends(get_current_user), Depends(track_chapter_read)],
+                 response_model=ResponseModel)
 @wrap_error_handler_api()
+@cache_response(expire=settings.RESPONSE_CACHE_EXPIRE, exclude_kwargs=["database"], key_prefix="get_book_chapter_by_id")
 async def get_book_chapter(
         database: Annotated[AsyncSession, Depends(get_session)]
         , id: int = Path(..., title="id", description="id", gt=0)):
@@ -110,7 +211,8 @@ async def get_book_chapter(
     return ResponseModel(data=result)
 
 
-@book_router.get("/chapter/{book_id}/{chapter_index}", dependencies=[Depends(get_current_user)],
+@book_router.get("/chapter/{book_id}/{chapter_index}",
+                 dependencies=[Depends(get_current_user), Depends(track_chapter_read_by_index)],
                  response_model=ResponseModel)
 @wrap_error_handler_api()
 async def get_book_chapter_by_index(
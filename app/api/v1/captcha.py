@@ -2,6 +2,7 @@ from fastapi import APIRouter, Response
 from starlette import status
 
 from app.core import wrap_error_handler_api
+from app.core.error_handler import CustomException
 from app.services.captcha_service import CaptchaService
 
 captcha_router = APIRouter(prefix='/captcha', tags=["captcha"])
@@ -14,7 +15,14 @@ async def get_captcha():
     获取验证码
     :return: 验证码图片 bytes
     """
-    image_bytes, captcha_id = await CaptchaService.get_captcha()
+    captcha = await CaptchaService.get_captcha()
+    if captcha is None:
+        raise CustomException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            message="验证码生成繁忙，请稍后重试",
+            headers={"Retry-After": "1"},
+        )
+    image_bytes, captcha_id = captcha
 
     return Response(
         content=image_bytes,
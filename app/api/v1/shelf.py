@@ -1,10 +1,11 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Body, status
+from fastapi import APIRouter, Depends, Body, Query, status
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.core import wrap_error_handler_api
+from app.core import settings, wrap_error_handler_api
 from app.core.database import get_session
+from app.core.error_handler import CustomException
 from app.core.security import get_current_user
 from app.models.response_model import ResponseModel, ResponseCode
 from app.services.shelf_service import shelf_service
@@ -16,15 +17,47 @@ shelf_router = APIRouter(prefix='/shelf', tags=["shelf"], dependencies=[Depends(
 @wrap_error_handler_api()
 async def get_shelf(
         database: Annotated[AsyncSession, Depends(get_session)],
+        limit: Annotated[int, Query(ge=1, le=settings.SHELF_PAGE_MAX)] = settings.SHELF_PAGE_SIZE,
+        cursor: Annotated[str | None, Query()] = None,
         current_user=Depends(get_current_user)
 ):
     """
-    获取用户书架
+    获取用户书架（按最近阅读倒序分页）
     :param current_user:    当前用户
     :param database:    数据库会话
-    :return:    书架列表
+    :param limit:    每页条数
+    :param cursor:    上一页返回的 next_cursor
+    :return:    {"items": 书架列表, "next_cursor": 下一页游标}
     """
-    result = await shelf_service.get_shelf(user_id=current_user['id'], database=database)
+    try:
+        result = await shelf_service.get_shelf(user_id=current_user['id'], database=database,
+                                               limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise CustomException(status_code=status.HTTP_400_BAD_REQUEST, message=str(e))
+    return ResponseModel(data=result)
+
+
+@shelf_router.get('/view', response_model=ResponseModel)
+@wrap_error_handler_api()
+async def get_shelf_view(
+        database: Annotated[AsyncSession, Depends(get_session)],
+        limit: Annotated[int, Query(ge=1, le=settings.SHELF_PAGE_MAX)] = settings.SHELF_PAGE_SIZE,
+        cursor: Annotated[str | None, Query()] = None,
+        current_user=Depends(get_current_user)
+):
+    """
+    书架首页：一次请求返回图书卡片、最新阅读进度和章节标题，按最近阅读倒序分页
+    :param current_user:    当前用户
+    :param database:    数据库会话
+    :param limit:    每页条数
+    :param cursor:    上一页返回的 next_cursor
+    :return:    {"items": 书架视图, "next_cursor": 下一页游标}
+    """
+    try:
+        result = await shelf_service.get_shelf_view(user_id=current_user['id'], database=database,
+                                                    limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise CustomException(status_code=status.HTTP_400_BAD_REQUEST, message=str(e))
     return ResponseModel(data=result)
 
 
@@ -42,13 +75,59 @@ async def add_shelf(
     :param current_user:    当前用户
     :return:       添加结果
     """
-    result = await shelf_service.add_shelf(book_id=book_id, user_id=current_user['id'], database=database)
+    try:
+        result = await shelf_service.add_shelf(book_id=book_id, user_id=current_user['id'], database=database)
+    except ValueError as e:
+        raise CustomException(status_code=status.HTTP_400_BAD_REQUEST, message=str(e))
     if result:
         return ResponseModel()
     else:
         return ResponseModel(code=ResponseCode.ERROR, message="添加失败")
 
 
+@shelf_router.post('/add/batch', response_model=ResponseModel)
+@wrap_error_handler_api()
+async def add_shelf_books(
+        book_ids: Annotated[list[int], Body(embed=True, min_length=1, max_length=settings.SHELF_BATCH_MAX)],
+        database: Annotated[AsyncSession, Depends(get_session)],
+        current_user=Depends(get_current_user)
+):
+    """
+    批量添加图书到书架（导入书单），已在书架上的图书忽略
+    :param book_ids:  图书ID列表
+    :param database:    数据库会话
+    :param current_user:    当前用户
+    :return:       {"items": [{book_id, status}]}，status 为 added / exists / not_found
+    """
+    try:
+        items = await shelf_service.add_shelf_books(book_ids=book_ids, user_id=current_user['id'], database=database)
+    except ValueError as e:
+        raise CustomException(status_code=status.HTTP_400_BAD_REQUEST, message=str(e))
+    return ResponseModel(data={"items": items})
+
+
+@shelf_router.post('/delete/batch', response_model=ResponseModel)
+@wrap_error_handler_api()
+async def remove_shelf_books(
+        book_ids: Annotated[list[int], Body(embed=True, min_length=1, max_length=settings.SHELF_BATCH_MAX)],
+        database: Annotated[AsyncSession, Depends(get_session)],
+        current_user=Depends(get_current_user)
+):
+    """
+    批量删除书架上的图书
+    :param book_ids:  图书ID列表
+    :param database:    数据库会话
+    :param current_user:    当前用户
+    :return:       {"items": [{book_id, status}]}，status 为 removed / not_on_shelf
+    """
+    try:
+        items = await shelf_service.remove_shelf_books(book_ids=book_ids, user_id=current_user['id'],
+                                                       database=database)
+    except ValueError as e:
+        raise CustomException(status_code=status.HTTP_400_BAD_REQUEST, message=str(e))
+    return ResponseModel(data={"items": items})
+
+
 @shelf_router.delete('/delete/{book_id}', response_model=ResponseModel)
 @wrap_error_handler_api()
 async def delete_shelf(
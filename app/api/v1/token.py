@@ -3,7 +3,7 @@ from re import match
 
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Header, status, Body, BackgroundTasks, Query
+from fastapi import APIRouter, Depends, Header, status, Body, Query
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel
 from sqlalchemy.orm import exc
@@ -20,7 +20,7 @@ from app.models.sql.User import User
 from app.services import user_service
 from app.services.cache_service import cache_delete, cache_get, cache_set
 from app.services.captcha_service import CaptchaService
-from app.services.email_service import email_sender
+from app.services.email_outbox_service import email_outbox_service
 from app.services.user_service import UserService
 
 token_router = APIRouter(prefix='/token', tags=["token"])
@@ -166,7 +166,6 @@ def is_allowed_domain(email: str) -> bool:
 @wrap_error_handler_api()
 async def verify_email(
         email: Annotated[str, Body(embed=True)],
-        background_tasks: BackgroundTasks
 ):
     if not is_valid_email(email) or not is_allowed_domain(email):
         # 仍然返回 204，但不发邮件
@@ -183,8 +182,8 @@ async def verify_email(
 
     verify_url = f"{settings.SERVER_URL}/token/verify_email?token={token}"
 
-    background_tasks.add_task(
-        email_sender.send_email,
+    # 写入发件箱，由发件进程发送
+    await email_outbox_service.enqueue(
         to_emails=[email],
         subject='在线阅读系统注册邮箱验证',
         body=f'点击以下链接完成邮箱验证：<br><a href="{verify_url}">{verify_url}</a>',
@@ -1,17 +1,33 @@
+from datetime import datetime
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, Body, Path
+from pydantic import BaseModel, Field
 from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette import status
 
-from app.core import get_session, wrap_error_handler_api
+from app.core import get_session, settings, wrap_error_handler_api
+from app.core.error_handler import CustomException
 from app.core.security import get_current_user
 
 from app.models.response_model import ResponseModel, ResponseCode
+from app.services.reading_stats_service import reading_stats_service
 from app.services.user_reading_progress import user_reading_progress_service
 
 user_reading_progress_router = APIRouter(prefix="/user_reading_progress", tags=["user_reading_progress"])
 
 
+class ReadingProgressEntry(BaseModel):
+    """
+    单本书的阅读进度
+    - **last_read_at**: 客户端阅读时间，缺省为服务器当前时间；早于已保存进度的条目被忽略
+    """
+    book_id: int = Field(..., gt=0)
+    last_chapter_id: int = Field(..., gt=0)
+    last_position: int = Field(0, ge=0)
+    last_read_at: datetime | None = None
+
+
 @user_reading_progress_router.get("/get", response_model=ResponseModel)
 @wrap_error_handler_api()
 async def get_user_reading_progress(
@@ -23,6 +39,21 @@ async def get_user_reading_progress(
     return ResponseModel(data=result)
 
 
+@user_reading_progress_router.get("/stats", response_model=ResponseModel)
+@wrap_error_handler_api()
+async def get_user_reading_stats(
+        database: Annotated[AsyncSession, Depends(get_session)],
+        current_user=Depends(get_current_user)
+):
+    """
+    获取用户阅读统计（阅读时长、读过的章节、连续阅读天数），读取预先汇总的数据
+    :param current_user:    当前用户
+    :return:    阅读统计
+    """
+    result = await reading_stats_service.get_user_stats(user_id=current_user['id'], database=database)
+    return ResponseModel(data=result)
+
+
 @user_reading_progress_router.patch("/add", response_model=ResponseModel)
 @wrap_error_handler_api()
 async def update_user_reading_progress(
@@ -40,19 +71,47 @@ async def update_user_reading_progress(
     :param last_position:    最后阅读位置
     :return:    更新结果
     """
-    result = await user_reading_progress_service.update_user_single_book_reading_progress(
-        user_id=current_user['id'],
-        book_id=book_id,
-        last_chapter_id=last_chapter_id,
-        last_position=last_position,
-        database=database
-    )
+    try:
+        result = await user_reading_progress_service.update_user_single_book_reading_progress(
+            user_id=current_user['id'],
+            book_id=book_id,
+            last_chapter_id=last_chapter_id,
+            last_position=last_position,
+            database=database
+        )
+    except ValueError as e:
+        raise CustomException(status_code=status.HTTP_400_BAD_REQUEST, message=str(e))
     if result:
         return ResponseModel()
     else:
         raise ValueError(f"更新用户阅读进度失败")
 
 
+@user_reading_progress_router.patch("/sync", response_model=ResponseModel)
+@wrap_error_handler_api()
+async def sync_user_reading_progress(
+        database: Annotated[AsyncSession, Depends(get_session)],
+        entries: Annotated[list[ReadingProgressEntry],
+                           Body(embed=True, min_length=1, max_length=settings.PROGRESS_SYNC_MAX_ENTRIES)],
+        current_user=Depends(get_current_user),
+):
+    """
+    批量同步多本书的阅读进度，一条 SQL 写入
+    :param current_user:    当前用户
+    :param entries:    阅读进度列表
+    :return:    写入的图书数
+    """
+    try:
+        result = await user_reading_progress_service.sync_user_reading_progress(
+            user_id=current_user['id'],
+            entries=[entry.model_dump() for entry in entries],
+            database=database
+        )
+    except ValueError as e:
+        raise CustomException(status_code=status.HTTP_400_BAD_REQUEST, message=str(e))
+    return ResponseModel(data={"synced": result})
+
+
 @user_reading_progress_router.delete(path="/delete/{book_id}", response_model=ResponseModel)
 @wrap_error_handler_api()
 async def delete_user_reading_progress(
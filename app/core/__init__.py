@@ -1,4 +1,5 @@
 from .config import settings
 from .database import redis_pool, get_session
-from .security import get_current_user, get_password_hash, verify_password,create_refresh_token
+from .security import get_current_user, get_password_hash, verify_password,create_refresh_token, \
+    get_password_hash_async, verify_password_async
 from .error_handler import wrap_error_handler_api
@@ -5,10 +5,28 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     APP_NAME: str = "Online Reading System"
     ENV: str = "development"
+    # 服务进程（run.py）：ENV=production 时多进程、uvloop + httptools，否则为单进程热重载的开发模式
+    SERVER_HOST: str = "127.0.0.1"
+    SERVER_PORT: int = 8000
+    # worker 进程数，0 表示按可用 CPU 核数
+    WEB_CONCURRENCY: int = 0
+    # 监听队列长度、keep-alive 空闲超时（秒，需大于前置负载均衡的空闲超时）、收到 SIGTERM 后等待请求完成的时间（秒）
+    SERVER_BACKLOG: int = 2048
+    SERVER_KEEP_ALIVE: int = 75
+    SERVER_GRACEFUL_TIMEOUT: int = 30
+    # 信任其 X-Forwarded-For 的反向代理地址（逗号分隔，"*" 为全部），限流按改写后的客户端 IP 计数
+    FORWARDED_ALLOW_IPS: str = "127.0.0.1"
     PROTOCOL: str
     # Database
     MYSQL_DSN: str
     REDIS_URL: str
+    # MySQL 连接池（每个 worker 进程一个）：常驻连接数、允许临时超出的连接数、连接回收时间（秒）
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 3600
+    # 启动时预先建立的连接数（每个 worker 进程），0 表示不预热
+    DB_POOL_WARMUP: int = 5
+    REDIS_POOL_WARMUP: int = 5
 
     # Security
     SECRET_KEY: str
@@ -17,21 +35,98 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE: int = 30 * 60 * 60
     # refresh_token 有效期
     REFRESH_TOKEN_EXPIRE: int = 7 * 24 * 60 * 60
+    # 已验证访问令牌的进程内缓存：最大条数、最长缓存时间（不超过令牌本身的 exp）
+    TOKEN_CACHE_SIZE: int = 10000
+    TOKEN_CACHE_TTL: int = 5 * 60
+    # 密码哈希线程池：线程数、最大排队任务数（超出时直接返回 503）
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    # 限流模式：redis（每个请求一次 Redis 调用）/ hybrid（进程内令牌桶，异步批量同步到 Redis）
+    RATE_LIMIT_MODE: str = "hybrid"
+    # hybrid 模式：同步间隔（秒）；每个进程未同步的消耗上限（占桶容量的比例，达到时当前请求同步等待），
+    # 全局最多超发 进程数 × 容量 × 比例 个请求
+    RATE_LIMIT_SYNC_INTERVAL: float = 0.1
+    RATE_LIMIT_MAX_DRIFT: float = 0.1
     # 邮箱验证 有效期
     EMAIL_VERIFY_EXPIRE: int = 5 * 60
     #  验证码 有效期
     CAPTCHA_EXPIRE: int = 2 * 60
+    # 预生成验证码池（app/workers/captcha_worker.py）：池容量、低水位（低于时补充到容量）、生成进程数
+    CAPTCHA_POOL_SIZE: int = 1000
+    CAPTCHA_POOL_LOW_WATERMARK: int = 300
+    CAPTCHA_WORKERS: int = 2
+    # 池为空时最多同时现场生成的验证码数，超出返回 503
+    CAPTCHA_RENDER_MAX_PENDING: int = 2
     # 分表
     BOOK_SHARD_COUNT: int = 64
 
     #  书籍缓存
     BOOK_CACHE_EXPIRE: int = 60 * 60 * 24 * 7
+    # 不存在的章节的缓存时间（秒）：避免反复查询数据库，又不会长时间挡住之后入库的章节
+    MISSING_CACHE_EXPIRE: int = 5 * 60
+    # 路由响应缓存：直接缓存最终响应 bytes，命中时跳过模型校验与序列化
+    RAW_RESPONSE_CACHE: bool = True
+    RESPONSE_CACHE_EXPIRE: int = 60 * 60 * 24
+    # 热度排行：趋势榜半衰期（秒）
+    POPULARITY_HALF_LIFE: int = 3 * 24 * 60 * 60
+    # 热度排行：返回条数上限
+    POPULARITY_TOP_LIMIT: int = 100
+    # 热度排行：同一用户同一章节的阅读事件去重时间（秒），阅读进度在滚动时频繁更新
+    POPULARITY_READ_DEDUPE_EXPIRE: int = 60 * 60
+    # 推荐：每本书保留的推荐数量
+    RECOMMENDATION_TOP_K: int = 20
+    # 书籍静态文件目录
+    STATIC_BOOK_DIR: str = "./app/static/book"
+    # 封面缩略图尺寸（名称 -> 最大宽度）
+    COVER_THUMBNAIL_SIZES: dict[str, int] = {"small": 120, "medium": 240, "large": 480}
+    # 封面缩略图格式与质量
+    COVER_THUMBNAIL_FORMAT: str = "webp"
+    COVER_THUMBNAIL_QUALITY: int = 80
+    # 列表页使用的封面尺寸
+    BOOK_LIST_COVER_SIZE: str = "medium"
+    # 单个章节内容上限（UTF-8 字节，MEDIUMTEXT 上限 16MB），超出按段落切分为多个章节
+    CHAPTER_MAX_BYTES: int = 8 * 1024 * 1024
+    # 上传图书：EPUB 保存目录、单个文件大小上限
+    UPLOAD_EPUB_DIR: str = "./upload/epub"
+    UPLOAD_EPUB_MAX_BYTES: int = 512 * 1024 * 1024
+    # 入库任务：状态保留时间、入库进程数（app/workers/ingest_worker.py）
+    INGEST_JOB_EXPIRE: int = 60 * 60 * 24 * 7
+    INGEST_WORKERS: int = 2
+    # 阅读进度写缓冲：更新先写入 Redis，由 app/workers/progress_flusher.py 定期合并写入 MySQL
+    PROGRESS_WRITE_BEHIND: bool = True
+    # 写缓冲保留时间（秒，每次更新续期）、刷写间隔（秒）、每条 SQL 写入的行数
+    PROGRESS_BUFFER_EXPIRE: int = 60 * 60 * 24
+    PROGRESS_FLUSH_INTERVAL: float = 5
+    PROGRESS_FLUSH_BATCH: int = 500
+    # 批量同步阅读进度：单次请求最多条数（不超过 PROGRESS_FLUSH_BATCH，保证一条 SQL 写入）
+    PROGRESS_SYNC_MAX_ENTRIES: int = 200
+    # 书架分页：默认每页条数、每页最大条数
+    SHELF_PAGE_SIZE: int = 20
+    SHELF_PAGE_MAX: int = 100
+    # 批量添加 / 删除书架图书：单次请求最多条数
+    SHELF_BATCH_MAX: int = 500
+    # 阅读统计：两次进度更新间隔不超过该值（秒）时计为阅读时长，超过视为中断
+    READING_STATS_MAX_GAP: int = 5 * 60
+    # Redis 中每日汇总的保留时间（秒，需大于压缩间隔），压缩进程写入 MySQL 的间隔（秒）
+    READING_STATS_DAY_EXPIRE: int = 3 * 24 * 60 * 60
+    READING_STATS_COMPACT_INTERVAL: float = 60
+    # 用户书架 / 阅读进度快照的过期时间（秒），写入数据库后立即失效
+    USER_SNAPSHOT_EXPIRE: int = 60 * 60 * 24
     # SERVER_URL
     SERVER_URL: str = "http://127.0.0.1:8000"
     # 邮箱授权码
     EMAIL_CODE: str
     # 邮箱账号
     EMAIL_ACCOUNT: str
+    # SMTP 服务器（本地测试可指向不加密的 SMTP 服务并关闭 SMTP_SSL）
+    SMTP_SERVER: str = "smtp.qq.com"
+    SMTP_PORT: int = 465
+    SMTP_SSL: bool = True
+    # 邮件发件箱（app/workers/email_worker.py）：每批发送数、每秒最多发送数、最大重试次数、重试基础间隔（秒，指数退避）
+    EMAIL_BATCH_SIZE: int = 20
+    EMAIL_MAX_PER_SECOND: float = 5
+    EMAIL_MAX_RETRIES: int = 5
+    EMAIL_RETRY_BASE_DELAY: int = 10
 
     class Config:
         env_file = ".env"
@@ -1,5 +1,10 @@
 # app/core/database.py
+import asyncio
+
+import pymysql
 from redis import asyncio as aioredis
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import SQLModel
 from sqlmodel.ext.asyncio.session import AsyncSession
@@ -9,17 +14,84 @@ from app.core.config import settings
 # redis 配置
 redis_pool = aioredis.from_url(settings.REDIS_URL)
 
+# 已登记的 Lua 脚本（EVALSHA 调用，NOSCRIPT 时自动回退加载）
+lua_scripts = []
+
+
+def register_lua_script(source: str):
+    """
+    登记 Lua 脚本
+    :param source: 脚本源码
+    :return: 可直接 await script(keys=[...], args=[...]) 调用的脚本对象
+    """
+    script = redis_pool.register_script(source)
+    lua_scripts.append(script)
+    return script
+
 # MySQL 异步引擎
 engine = create_async_engine(
     url=settings.MYSQL_DSN,
-    pool_size=20,
-    max_overflow=10,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
     pool_pre_ping=True,
-    pool_recycle=3600,
+    pool_recycle=settings.DB_POOL_RECYCLE,
     echo=False,
 )
 
 
+async def check_database() -> None:
+    """
+    MySQL 就绪检查：取一个连接执行 select 1，失败时抛出异常
+    """
+    async with engine.connect() as connection:
+        await connection.execute(text("select 1"))
+
+
+async def check_redis() -> None:
+    """
+    Redis 就绪检查：PING，失败时抛出异常
+    """
+    await redis_pool.ping()
+
+
+async def warm_up_database(connections: int) -> None:
+    """
+    预先建立 MySQL 连接：同时占用 connections 个连接执行 select 1，归还后留在连接池中
+    :param connections: 连接数，超过 DB_POOL_SIZE 的部分归还时会被关闭，按 DB_POOL_SIZE 截断
+    """
+    await asyncio.gather(*(check_database() for _ in range(min(connections, settings.DB_POOL_SIZE))))
+
+
+async def warm_up_redis(connections: int) -> None:
+    """
+    预先建立 Redis 连接，并一次往返把已登记的 Lua 脚本加载到服务端（之后的 EVALSHA 不会遇到 NOSCRIPT）
+    :param connections: 连接数
+    """
+    pool = redis_pool.connection_pool
+    opened = await asyncio.gather(*(pool.get_connection("PING") for _ in range(connections)))
+    try:
+        for connection in opened:
+            await connection.send_command("PING")
+            await connection.read_response()
+    finally:
+        for connection in opened:
+            await pool.release(connection)
+
+    if lua_scripts:
+        pipe = redis_pool.pipeline(transaction=False)
+        for script in lua_scripts:
+            pipe.script_load(script.script)
+        await pipe.execute()
+
+
+async def close_pools() -> None:
+    """
+    关闭 MySQL 连接池与 Redis 连接池
+    """
+    await engine.dispose()
+    await redis_pool.aclose()
+
+
 def get_shard_table_name(base_name: str, book_id: int) -> str:
     """
     :param base_name: 表名
@@ -31,6 +103,25 @@ def get_shard_table_name(base_name: str, book_id: int) -> str:
     return f"{base_name}_shard_{shard_id}"
 
 
+def get_sync_connection(**kwargs) -> pymysql.connections.Connection:
+    """
+    获取同步 MySQL 连接（离线脚本、批处理任务使用）
+    连接参数从 MYSQL_DSN 解析，不再在脚本中硬编码
+    :param kwargs: 额外的 pymysql 连接参数
+    :return: pymysql 连接
+    """
+    url = make_url(settings.MYSQL_DSN)
+    return pymysql.connect(
+        host=url.host or "127.0.0.1",
+        port=url.port or 3306,
+        user=url.username,
+        password=url.password or "",
+        database=url.database,
+        charset=url.query.get("charset", "utf8mb4"),
+        **kwargs
+    )
+
+
 async def create_database_and_tables():
     """
     创建数据库和表
@@ -1,10 +1,14 @@
+import asyncio
+import hashlib
 import json
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from secrets import token_urlsafe
 from time import time
 from typing import Annotated, Any
 
 import jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
 from passlib.context import CryptContext
@@ -24,6 +28,47 @@ except Exception as e:
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token/get")
 
 
+class TokenCache:
+    """
+    已验证访问令牌的进程内缓存（LRU），键为令牌的 sha256 摘要，
+    过期时间取令牌 exp 与 TOKEN_CACHE_TTL 的较早者，只缓存验证通过的令牌
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, key: bytes, now: float) -> dict | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expire, user = entry
+        if expire <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return user
+
+    def set(self, key: bytes, user: dict, expire: float, now: float):
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = (min(expire, now + self.ttl), user)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+token_cache = TokenCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL)
+
+
 def verify_password(plain_password: str, hashed_password: str):
     """
     验证密码是否正确
@@ -47,6 +92,57 @@ def get_password_hash(password: str):
     return pwd_context.hash(password)
 
 
+# 密码哈希专用线程池（bcrypt 计算时释放 GIL），与 FastAPI 默认线程池隔离
+password_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password")
+# 已提交到线程池、尚未完成的任务数（只在事件循环线程中修改）
+_password_pending = 0
+
+
+async def _run_password_task(func, *args):
+    """
+    在密码线程池中执行，排队任务数达到 PASSWORD_HASH_MAX_PENDING 时直接拒绝，避免请求无限堆积
+    """
+    global _password_pending
+    if _password_pending >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise CustomException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            message="服务繁忙，请稍后重试",
+            headers={"Retry-After": "1"},
+        )
+    _password_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(password_executor, func, *args)
+    finally:
+        _password_pending -= 1
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    验证密码是否正确（在密码线程池中执行，不阻塞事件循环）
+    Args:
+        plain_password (str): 明文密码
+        hashed_password (str): 密码哈希值
+    Returns:
+        bool: 如果密码正确，则返回True，否则返回False
+    Raises:
+        CustomException: 线程池排队已满时抛出503
+    """
+    return await _run_password_task(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    获取密码哈希值（在密码线程池中执行，不阻塞事件循环）
+    Args:
+        password (str): 密码
+    Returns:
+        str: 密码哈希值
+    Raises:
+        CustomException: 线程池排队已满时抛出503
+    """
+    return await _run_password_task(get_password_hash, password)
+
+
 def create_access_token(data: dict[str, Any], expires_delta: int | None = None):
     """
     创建访问令牌
@@ -67,15 +163,19 @@ def create_access_token(data: dict[str, Any], expires_delta: int | None = None):
     return encoded_jwt
 
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
+def verify_access_token(token: str) -> dict:
     """
-    获取当前用户
-    该函数接收一个访问令牌，并使用它来验证用户身份。
-    如果访问令牌无效或已过期，将抛出HTTP 401未授权异常。
+    验证访问令牌并返回令牌中的用户信息，验证结果按令牌缓存，命中时跳过 HMAC 校验与 JSON 解析
     - param token: 访问令牌
-    - return: 当前用户
-    - raises HTTPException: 当访问令牌无效或已过期时抛出401未授权异常
+    - return: 用户信息（副本，可安全修改）
+    - raises CustomException: 当访问令牌无效或已过期时抛出401未授权异常
     """
+    now = time()
+    key = TokenCache.digest(token)
+    user = token_cache.get(key, now)
+    if user is not None:
+        return dict(user)
+
     credentials_exception = CustomException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         message="Could not validate credentials",
@@ -87,7 +187,7 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
         expire = payload.get("exp")
         if not user:
             raise credentials_exception
-        if not expire or expire < time():
+        if not expire or expire < now:
             credentials_exception.message = "Token expired"
             raise credentials_exception
     except InvalidTokenError as e:
@@ -95,8 +195,26 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
         credentials_exception.message = f"Invalid token: {e}"
         raise credentials_exception
 
-    # 这里应该从数据库获取用户
-    # 简化处理，直接返回用户名
+    token_cache.set(key, user, expire, now)
+    return dict(user)
+
+
+async def get_current_user(request: Request, token: Annotated[str, Depends(oauth2_scheme)]):
+    """
+    获取当前用户
+    该函数接收一个访问令牌，并使用它来验证用户身份。
+    如果访问令牌无效或已过期，将抛出HTTP 401未授权异常。
+    同一请求内只验证一次（结果保存在 request.state.current_user，中间件等也可复用）。
+    - param token: 访问令牌
+    - return: 当前用户
+    - raises HTTPException: 当访问令牌无效或已过期时抛出401未授权异常
+    """
+    user = getattr(request.state, "current_user", None)
+    if user is None:
+        # 这里应该从数据库获取用户
+        # 简化处理，直接返回令牌中的用户信息
+        user = verify_access_token(token)
+        request.state.current_user = user
     return user
 
 
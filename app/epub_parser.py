@@ -1,104 +1,196 @@
-import os
+"""
+EPUB 批量入库
 
+多进程解析（每个文件只读取一次），主进程按书批量写库（一本书一个事务），最后输出吞吐统计。
+增量入库：文件 sha256 未变的书直接跳过；已存在的书只更新内容哈希变化的章节，
+输出变化的图书ID并刷新对应缓存。
+流式入库（--streaming 或文件超过 --stream-threshold）：子进程直接从 zip 逐个读取章节文件并边解析边写库，
+内存占用与整本书大小无关。超过 CHAPTER_MAX_BYTES 的章节按段落切分，分段使用 sort_order 间隔排序。
+数据库连接取自 MYSQL_DSN，封面与缩略图写入 STATIC_BOOK_DIR/{book_id}/。
+用法（在项目根目录执行）：
+    python -m app.epub_parser /path/to/epubs --workers 8 --changed-output changed.json
+    python -m app.epub_parser /path/to/epubs --stream-threshold 50
+"""
+import argparse
+import asyncio
+import bisect
+import hashlib
+import json
+import os
 import re
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Iterable, Iterator
 
-import pymysql
-from ebooklib import epub
-from bs4 import BeautifulSoup
 import ebooklib
-import tkinter as tk
-from tkinter import filedialog
-
-# === MySQL 连接配置 ===
-MYSQL_CONFIG = {
-    'host': '1.95.141.194',
-    'database': 'reading_plus',
-    'user': 'root',
-    'password': '123456',
-    'charset': 'utf8mb4'
-}
-mysql_conn = pymysql.connect(**MYSQL_CONFIG)
-cursor = mysql_conn.cursor()
-UPLOAD_FOLDER = 'static/book'  # 替换为你想存储书籍的文件夹路径
-
-def get_book_id(name):
-    try:
-        cursor.execute(f"select book.id from book where book.name = '{name}'")
-        book_id = cursor.fetchone()[0]
-        return book_id
-    except Exception as e:
-        # print(f"Error getting book id: {e}")
-        return None
-# 批量处理文件夹中的所有 .epub 文件
-def batch_upload_books(folder_path):
-    for root, dirs, files in os.walk(folder_path):
-        for file in files:
-            try:
-                if file.lower().endswith('.epub'):
-                    epub_path = os.path.join(root, file)
-                    print(f"Processing: {epub_path}")
-
-                    # 提取元数据
-                    metadata = extract_epub_metadata(epub_path)
-                    if not metadata:
-                        print(f"Failed to extract metadata for: {epub_path}")
-                        continue
-                    # 创建唯一目录存储书籍文件
-
-                    # os.makedirs(book_folder, exist_ok=True)
-
-                    # 检查是否为epub文件并提取封面和总页数
-                    book_id = get_book_id(metadata['title'])
-                    # if book_id:
-                    book_folder = os.path.join(UPLOAD_FOLDER, str(book_id))
-                    # os.makedirs(book_folder, exist_ok=True)
-                    book = epub.read_epub(epub_path)
-                    for item in book.get_items():
-                        if item.get_type() != ebooklib.ITEM_DOCUMENT and item.get_type() != ebooklib.ITEM_COVER and item.get_type() != ebooklib.ITEM_NAVIGATION:
-                            pass
-                            # with open(os.path.join(book_folder, re.split(r'[/\\]', item.file_name)[-1]), 'wb') as f:
-                            #     f.write(item.content)
-                    cover = next(book.get_items_of_type(ebooklib.ITEM_COVER))
-                    cover_path = os.path.join(book_folder, re.split(r'[/\\]', cover.file_name)[-1])
-                    if cover and cover_path:
-                        cover_path = cover_path.replace('\\', '/')
-                        # with open(cover_path, 'wb') as f:
-                        #     f.write(cover.content)
-                    catalog = []
-                    for item in book.toc:
-                        catalog.append([str(item.title).replace('.', '_'),book.get_item_with_href(
-                            item.href).content.decode('utf-8')])
-                    # 创建并保存新的书籍对象
-
-                    init_order = 1.0
-                    for title, content in catalog:
-                        # 确保 content 不超过数据库限制
-                        cursor.execute(f"insert into book_chapter(book_id,sort_order,title,content,created_at) values (%s,%s,%s,%s,now())", (book_id, init_order, title, content))
-                        init_order += 10
-                    cursor.connection.commit()
-
-
-                    # print(f"New book created: {new_book.name}  {new_book.author} {new_book.category} {new_book.total_chapter} {new_book.cover}  {new_book.description}")
-                else:
-                    continue
-            except Exception as e:
-                print(f"Error processing {file}: {str(e)}")
-                continue
+from bs4 import BeautifulSoup
+from ebooklib import epub
 
+from app.core.config import settings
+from app.core.database import get_sync_connection
+from app.services.book_service import book_service
+from app.services.cover_service import build_cover_variants, get_book_dir
+from app.services.snapshot_service import snapshot_service
+from app.utils.epub_stream import iter_member_segments, read_package, split_content
 
-def extract_epub_metadata(epub_path):
-    try:
-        book = epub.read_epub(epub_path)
-    except Exception as e:
-        print(f"Error reading EPUB file: {e}")
-        return None
-    # 提取元数据
+# executemany 每批章节数（pymysql 会合并为多行 INSERT）
+CHAPTER_BATCH_SIZE = 200
+# 每批章节内容总字节数上限，超出提前提交一批，限制写库缓冲内存
+CHAPTER_BATCH_BYTES = 16 * 1024 * 1024
+DEFAULT_CATEGORY = "综合"
+# 章节排序间隔
+SORT_ORDER_STEP = 10
+# 超长章节分段的排序间隔（同一章节最多 SORT_ORDER_STEP / SEGMENT_SORT_STEP 段）
+SEGMENT_SORT_STEP = 0.01
+# 同一目录项最多的分段数，超出会与下一个目录项的排序值重叠
+MAX_SEGMENTS = round(SORT_ORDER_STEP / SEGMENT_SORT_STEP)
+# 流式模式下读取简介时最多读取首个文档的字节数
+DESCRIPTION_READ_BYTES = 64 * 1024
+
+# 已入库文件的哈希（进程池初始化时注入每个子进程）
+_known_hashes: set[str] = set()
+# 流式模式下子进程自己的数据库连接（首次使用时创建）
+_connection = None
+
+
+@dataclass
+class ParsedChapter:
+    title: str
+    content: str
+    sort_order: float
+    content_hash: str
+
+
+@dataclass
+class ParsedBook:
+    """单次解析 EPUB 得到的全部入库数据"""
+    path: str
+    title: str = ""
+    authors: list[str] = field(default_factory=list)
+    description: str = ""
+    cover_name: str | None = None
+    cover_content: bytes | None = None
+    chapters: list[ParsedChapter] = field(default_factory=list)
+    size: int = 0
+    content_hash: str = ""
+    # 文件哈希已存在，未解析
+    unchanged: bool = False
+    # 流式模式：章节由写库时逐个产生，不保存在 chapters 中
+    streaming: bool = False
+    # 目录项数（流式模式下用于计算进度）
+    toc_entries: int = 0
+
+
+@dataclass
+class BookChange:
+    """一本书的写库结果"""
+    book_id: int
+    # 内容发生变化或被删除的已有章节ID（需刷新缓存）
+    chapter_ids: list[int] = field(default_factory=list)
+    # 本次解析出的章节数（含分段）
+    chapters: int = 0
+    written: int = 0
+    deleted: int = 0
+    # 变更前后章节数的较大值（按索引读取的缓存范围）
+    chapter_count: int = 0
+    # 阅读进度指向被更新（标题可能变化）或被删除章节的用户（需刷新书架与阅读进度快照）
+    progress_user_ids: list[int] = field(default_factory=list)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.written or self.deleted)
+
+
+@dataclass
+class IngestStats:
+    """入库统计"""
+    books: int = 0
+    chapters: int = 0
+    bytes: int = 0
+    failed: int = 0
+    skipped: int = 0
+    written_chapters: int = 0
+    streamed: int = 0
+    changes: list[BookChange] = field(default_factory=list)
+    started_at: float = field(default_factory=time.perf_counter)
+
+    @property
+    def changed_book_ids(self) -> list[int]:
+        return sorted({change.book_id for change in self.changes if change.changed})
+
+    def add(self, change: BookChange, size: int):
+        self.books += 1
+        self.chapters += change.chapters
+        self.written_chapters += change.written
+        self.bytes += size
+        self.changes.append(change)
+        if self.books % 100 == 0:
+            print(self.report())
+
+    def report(self) -> str:
+        elapsed = max(time.perf_counter() - self.started_at, 1e-9)
+        return (f"书籍 {self.books} 本（流式 {self.streamed}，跳过 {self.skipped}，失败 {self.failed}），"
+                f"章节 {self.chapters}（写入 {self.written_chapters}），"
+                f"耗时 {elapsed:.1f}s，{self.books / elapsed:.2f} 本/s，"
+                f"{self.chapters / elapsed:.0f} 章/s，{self.bytes / elapsed / 1024 / 1024:.2f} MB/s")
+
+
+def file_sha256(path: str) -> str:
+    """
+    分块计算文件 sha256
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def chapter_sha256(title: str, content: str) -> str:
+    """
+    计算章节内容哈希（标题 + 内容）
+    """
+    digest = hashlib.sha256(title.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(content.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def build_chapters(title: str, segments: Iterable[str], sort_order: float) -> Iterator[ParsedChapter]:
+    """
+    生成一个目录项的章节，超长内容的后续分段依次使用 sort_order + k * SEGMENT_SORT_STEP
+    :param title: 目录标题
+    :param segments: 已按 CHAPTER_MAX_BYTES 切分的内容
+    :param sort_order: 目录项的排序值
+    :raises ValueError: 分段数超过 MAX_SEGMENTS
+    """
+    for index, content in enumerate(segments):
+        if index >= MAX_SEGMENTS:
+            raise ValueError(f"章节 {title} 分段超过 {MAX_SEGMENTS} 段")
+        segment_title = title if index == 0 else f"{title}（{index + 1}）"
+        yield ParsedChapter(
+            title=segment_title,
+            content=content,
+            sort_order=sort_order + index * SEGMENT_SORT_STEP,
+            content_hash=chapter_sha256(segment_title, content),
+        )
+
+
+def extract_epub_metadata(book: epub.EpubBook) -> dict:
+    """
+    提取 EPUB 元数据
+    :param book: 已读取的 EPUB
+    :return: {"title", "authors", "description"}
+    """
     title = book.get_metadata('DC', 'title')
     authors = book.get_metadata('DC', 'creator')
     description = book.get_metadata('DC', 'description')
     intro_text = None
     if not description:
-        item = next(book.get_items_of_type(ebooklib.ITEM_DOCUMENT))
+        item = next(book.get_items_of_type(ebooklib.ITEM_DOCUMENT), None)
         if item:
             soup = BeautifulSoup(item.get_content(), 'html.parser')
             paragraphs = soup.find_all('p')
@@ -114,19 +206,494 @@ def extract_epub_metadata(epub_path):
     }
 
 
-def run():
-    # 使用 tkinter 选择文件夹
-    root = tk.Tk()
-    root.withdraw()  # 隐藏主窗口
+def _flatten_toc(toc) -> list[epub.Link]:
+    """
+    展开多级目录
+    """
+    links = []
+    for entry in toc:
+        if isinstance(entry, tuple):
+            section, children = entry
+            if getattr(section, 'href', None):
+                links.append(section)
+            links.extend(_flatten_toc(children))
+        else:
+            links.append(entry)
+    return links
+
+
+def parse_epub(epub_path: str, content_hash: str = "") -> ParsedBook:
+    """
+    解析 EPUB（同步 CPU 任务，供进程池调用），元数据、封面和章节一次读取完成
+    :param epub_path: 文件路径
+    :param content_hash: 文件哈希，为空时计算
+    :return: 解析结果
+    """
+    book = epub.read_epub(epub_path)
+    metadata = extract_epub_metadata(book)
+    parsed = ParsedBook(
+        path=epub_path,
+        title=metadata['title'],
+        authors=metadata['authors'],
+        description=metadata['description'],
+        size=os.path.getsize(epub_path),
+        content_hash=content_hash or file_sha256(epub_path),
+    )
+    cover = next(book.get_items_of_type(ebooklib.ITEM_COVER), None)
+    if cover:
+        parsed.cover_name = re.split(r'[/\\]', cover.file_name)[-1]
+        parsed.cover_content = cover.content
+    seen = set()
+    for link in _flatten_toc(book.toc):
+        # 去掉锚点，同一文件只取一次（与流式解析一致）
+        href = link.href.split('#')[0]
+        item = book.get_item_with_href(href)
+        if item is None or href in seen:
+            continue
+        index = len(seen)
+        seen.add(href)
+        title = str(link.title).replace('.', '_')
+        content = item.content.decode('utf-8')
+        parsed.chapters.extend(build_chapters(
+            title, split_content(content, settings.CHAPTER_MAX_BYTES), 1.0 + index * SORT_ORDER_STEP))
+    return parsed
+
+
+def stream_epub(epub_path: str, content_hash: str = "") -> tuple[ParsedBook, Iterator[ParsedChapter]]:
+    """
+    流式解析 EPUB：只读取 OPF、目录与封面，章节在迭代时才从 zip 中逐个读取并切分
+    :param epub_path: 文件路径
+    :param content_hash: 文件哈希，为空时计算
+    :return: (不含章节的解析结果, 章节迭代器；迭代期间保持 zip 打开)
+    """
+    zf = zipfile.ZipFile(epub_path)
+    try:
+        package = read_package(zf)
+        parsed = ParsedBook(
+            path=epub_path,
+            title=package.title,
+            authors=package.authors,
+            description=package.description,
+            size=os.path.getsize(epub_path),
+            content_hash=content_hash or file_sha256(epub_path),
+            streaming=True,
+            toc_entries=len(package.toc),
+        )
+        if not parsed.description and package.first_document:
+            with zf.open(package.first_document) as member:
+                soup = BeautifulSoup(member.read(DESCRIPTION_READ_BYTES), 'html.parser')
+            parsed.description = ' '.join(p.get_text().strip() for p in soup.find_all('p')[:3])  # 取前 3 段
+        if not parsed.description:
+            parsed.description = f"{parsed.title} 是一本由 {'、'.join(parsed.authors)} 创作的书籍。"
+        if package.cover_href:
+            parsed.cover_name = package.cover_href.rsplit('/', 1)[-1]
+            parsed.cover_content = zf.read(package.cover_href)
+    except Exception:
+        zf.close()
+        raise
+
+    def chapters() -> Iterator[ParsedChapter]:
+        with zf:
+            for index, (title, href) in enumerate(package.toc):
+                yield from build_chapters(
+                    title.replace('.', '_'),
+                    iter_member_segments(zf, href, settings.CHAPTER_MAX_BYTES),
+                    1.0 + index * SORT_ORDER_STEP,
+                )
+
+    return parsed, chapters()
+
+
+def _init_worker(known_hashes: set[str]):
+    global _known_hashes
+    _known_hashes = known_hashes
+
+
+def _get_worker_connection():
+    global _connection
+    if _connection is None:
+        _connection = get_sync_connection()
+    return _connection
+
+
+def _parse_worker(epub_path: str) -> ParsedBook | str:
+    """
+    进程池任务：文件哈希已入库则跳过解析；异常转为字符串返回，避免单个文件中断整个批次
+    """
+    try:
+        content_hash = file_sha256(epub_path)
+        if content_hash in _known_hashes:
+            return ParsedBook(path=epub_path, content_hash=content_hash, unchanged=True)
+        return parse_epub(epub_path, content_hash=content_hash)
+    except Exception as e:
+        return f"{epub_path}: {e}"
+
+
+def _stream_worker(epub_path: str) -> BookChange | str | None:
+    """
+    进程池任务（流式）：在子进程中边解析边写库，并生成封面缩略图
+    :return: 写库结果；文件哈希已入库时返回 None；异常转为字符串
+    """
+    try:
+        content_hash = file_sha256(epub_path)
+        if content_hash in _known_hashes:
+            return None
+        return ingest_epub(_get_worker_connection(), epub_path, content_hash=content_hash)
+    except Exception as e:
+        return f"{epub_path}: {e}"
+
+
+def ingest_epub(
+        connection,
+        epub_path: str,
+        content_hash: str = "",
+        progress: Callable[[float], None] | None = None,
+) -> BookChange:
+    """
+    流式入库一本书：边解析边写库，保存封面并生成缩略图（同步 CPU 任务，需在子进程中调用）
+    :param connection: pymysql 连接
+    :param epub_path: 文件路径
+    :param content_hash: 文件哈希，为空时计算
+    :param progress: 进度回调，参数为 0~1 的已处理目录比例
+    :return: 写库结果
+    """
+    parsed, chapters = stream_epub(epub_path, content_hash=content_hash)
+    if progress is not None:
+        chapters = _track_progress(chapters, parsed.toc_entries, progress)
+    change = write_book(connection, parsed, chapters)
+    if save_cover(change.book_id, parsed):
+        variants = build_cover_variants(change.book_id, parsed.cover_name)
+        with connection.cursor() as cursor:
+            cursor.execute("update book set cover_variants = %s where id = %s",
+                           (json.dumps(variants), change.book_id))
+        connection.commit()
+    return change
+
+
+def _track_progress(
+        chapters: Iterator[ParsedChapter],
+        toc_entries: int,
+        progress: Callable[[float], None],
+) -> Iterator[ParsedChapter]:
+    for chapter in chapters:
+        yield chapter
+        # 目录项的排序值为 1 + index * SORT_ORDER_STEP，分段不改变整数部分
+        progress(min((chapter.sort_order // SORT_ORDER_STEP + 1) / max(toc_entries, 1), 1.0))
+
+
+def load_known_hashes(connection) -> set[str]:
+    """
+    读取已入库文件的哈希
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("select content_hash from book where content_hash != ''")
+        return {content_hash for content_hash, in cursor.fetchall()}
+
+
+def _get_or_create_book(cursor, parsed: ParsedBook) -> tuple[int, int | None]:
+    """
+    按书名查找图书，不存在则创建
+    :return: (图书ID, 原章节数；新建时为 None)
+    """
+    cursor.execute("select id, total_chapter from book where name = %s", (parsed.title,))
+    row = cursor.fetchone()
+    if row:
+        return row[0], row[1]
+    cursor.execute(
+        "insert into book(name, author, cover, cover_variants, description, category, tags, total_chapter, "
+        "content_hash, created_at) values (%s, %s, %s, '', %s, %s, '', 0, '', %s)",
+        (parsed.title, '、'.join(parsed.authors), parsed.cover_name or '', parsed.description,
+         DEFAULT_CATEGORY, datetime.now())
+    )
+    return cursor.lastrowid, None
 
-    # 让用户选择文件夹
-    folder_path = filedialog.askdirectory(title="请选择要处理的文件夹")
 
-    if folder_path:
+def _sort_key(sort_order: float) -> int:
+    """
+    排序值按 SEGMENT_SORT_STEP 换算为整数后比较，不受浮点误差影响
+    """
+    return round(sort_order / SEGMENT_SORT_STEP)
 
-        batch_upload_books(folder_path)
+
+def _move_progress_off_chapters(cursor, book_id: int, removed: dict[int, float]) -> list[int]:
+    """
+    阅读进度指向即将删除的章节时（外键不允许直接删除），改到排序在其之前最近的保留章节，
+    没有则改到第一章；整本书不再有章节时删除这些进度
+    :param removed: {被删除的章节ID: 排序值的 _sort_key}
+    :return: 进度被修改的用户ID
+    """
+    cursor.execute("select user_id, last_chapter_id from user_reading_progress where last_chapter_id in %s",
+                   (list(removed),))
+    progress = cursor.fetchall()
+    if not progress:
+        return []
+    cursor.execute("select id, sort_order from book_chapter where book_id = %s order by sort_order", (book_id,))
+    kept = [(_sort_key(sort_order), chapter_id) for chapter_id, sort_order in cursor.fetchall()
+            if chapter_id not in removed]
+    if not kept:
+        cursor.execute("delete from user_reading_progress where last_chapter_id in %s", (list(removed),))
     else:
-        print("未选择文件夹，程序退出。")
+        sort_orders = [sort_order for sort_order, _ in kept]
+        targets = {}
+        for chapter_id in {chapter_id for _, chapter_id in progress}:
+            position = bisect.bisect_right(sort_orders, removed[chapter_id])
+            targets[chapter_id] = kept[max(position - 1, 0)][1]
+        cursor.executemany(
+            "update user_reading_progress set last_chapter_id = %s, last_position = 0 where last_chapter_id = %s",
+            [(target, chapter_id) for chapter_id, target in targets.items()]
+        )
+    return sorted({user_id for user_id, _ in progress})
+
+
+def _flush_chapters(cursor, rows: list[tuple]):
+    cursor.executemany(
+        "insert into book_chapter(book_id, sort_order, title, content, content_hash, created_at) "
+        "values (%s, %s, %s, %s, %s, %s) "
+        "on duplicate key update title = values(title), content = values(content), "
+        "content_hash = values(content_hash)",
+        rows
+    )
+
+
+def write_book(connection, parsed: ParsedBook, chapters: Iterable[ParsedChapter] | None = None) -> BookChange:
+    """
+    写入一本书（一个事务）：只写入内容哈希变化的章节，删除已不存在的章节。
+    章节逐个消费，按条数或字节数分批写入，缓冲内存不超过 CHAPTER_BATCH_BYTES
+    :param connection: pymysql 连接
+    :param parsed: 解析结果
+    :param chapters: 章节迭代器（流式模式），默认使用 parsed.chapters
+    :return: 写库结果
+    """
+    chapters = parsed.chapters if chapters is None else chapters
+    try:
+        with connection.cursor() as cursor:
+            book_id, old_total = _get_or_create_book(cursor, parsed)
+            # {_sort_key: (章节ID, 内容哈希, 库中的排序值)}
+            existing: dict[int, tuple[int, str, float]] = {}
+            if old_total is not None:
+                cursor.execute("select id, sort_order, content_hash from book_chapter where book_id = %s",
+                               (book_id,))
+                existing = {_sort_key(sort_order): (chapter_id, content_hash, sort_order)
+                            for chapter_id, sort_order, content_hash in cursor.fetchall()}
+            change = BookChange(book_id=book_id)
+
+            now = datetime.now()
+            rows = []
+            batch_bytes = 0
+            for chapter in chapters:
+                change.chapters += 1
+                current = existing.pop(_sort_key(chapter.sort_order), None)
+                if current and current[1] == chapter.content_hash:
+                    continue
+                sort_order = chapter.sort_order
+                if current:
+                    change.chapter_ids.append(current[0])
+                    # 沿用库中的排序值，保证命中唯一索引更新原行
+                    sort_order = current[2]
+                rows.append((book_id, sort_order, chapter.title, chapter.content, chapter.content_hash, now))
+                batch_bytes += len(chapter.content.encode('utf-8'))
+                if len(rows) >= CHAPTER_BATCH_SIZE or batch_bytes >= CHAPTER_BATCH_BYTES:
+                    _flush_chapters(cursor, rows)
+                    change.written += len(rows)
+                    rows, batch_bytes = [], 0
+            if rows:
+                _flush_chapters(cursor, rows)
+                change.written += len(rows)
+            progress_user_ids = set()
+            if change.chapter_ids:
+                # 书架首页快照包含进度所在章节的标题
+                cursor.execute("select distinct user_id from user_reading_progress where last_chapter_id in %s",
+                               (change.chapter_ids,))
+                progress_user_ids.update(user_id for user_id, in cursor.fetchall())
+            removed = [chapter_id for chapter_id, _, _ in existing.values()]
+            if removed:
+                progress_user_ids.update(_move_progress_off_chapters(
+                    cursor, book_id, {chapter_id: key for key, (chapter_id, _, _) in existing.items()}))
+                cursor.execute("delete from book_chapter where id in %s", (removed,))
+                change.chapter_ids.extend(removed)
+            change.progress_user_ids = sorted(progress_user_ids)
+            change.deleted = len(removed)
+            change.chapter_count = max(old_total or 0, change.chapters)
+
+            cursor.execute(
+                "update book set total_chapter = %s, content_hash = %s, cover = if(%s = '', cover, %s) where id = %s",
+                (change.chapters, parsed.content_hash, parsed.cover_name or '', parsed.cover_name or '', book_id)
+            )
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    return change
+
+
+def save_cover(book_id: int, parsed: ParsedBook) -> bool:
+    """
+    保存封面原图
+    """
+    if not parsed.cover_name or not parsed.cover_content:
+        return False
+    book_dir = get_book_dir(book_id)
+    os.makedirs(book_dir, exist_ok=True)
+    with open(os.path.join(book_dir, parsed.cover_name), 'wb') as f:
+        f.write(parsed.cover_content)
+    return True
+
+
+def find_epub_files(folder_path: str) -> list[str]:
+    """
+    递归查找目录下的 .epub 文件
+    """
+    return [
+        os.path.join(root, file)
+        for root, _, files in os.walk(folder_path)
+        for file in files if file.lower().endswith('.epub')
+    ]
+
+
+def batch_upload_books(
+        folder_path: str,
+        workers: int | None = None,
+        invalidate_cache: bool = True,
+        stream_threshold: int | None = None,
+) -> IngestStats:
+    """
+    批量处理文件夹中的所有 .epub 文件
+    :param folder_path: 目录
+    :param workers: 解析进程数，默认 CPU 核数
+    :param invalidate_cache: 是否刷新变化图书的缓存
+    :param stream_threshold: 文件大小（字节）不小于该值时在子进程中流式入库，0 表示全部流式，None 表示不启用
+    :return: 统计信息
+    """
+    paths = find_epub_files(folder_path)
+    workers = workers or os.cpu_count() or 1
+    stats = IngestStats()
+    connection = get_sync_connection()
+    known_hashes = load_known_hashes(connection)
+    print(f"待处理: {len(paths)} 个文件")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(known_hashes,)) as executor:
+        # 限制同时在途的解析结果数量，避免内存随文件数增长
+        max_pending = workers * 2
+        pending: dict[Future, str] = {}
+        cover_jobs: dict[Future, int] = {}
+        queue = iter(paths)
+
+        def submit_next() -> bool:
+            path = next(queue, None)
+            if path is None:
+                return False
+            if stream_threshold is not None and os.path.getsize(path) >= stream_threshold:
+                pending[executor.submit(_stream_worker, path)] = path
+            else:
+                pending[executor.submit(_parse_worker, path)] = path
+            return True
+
+        while len(pending) < max_pending and submit_next():
+            pass
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                submit_next()
+                parsed = future.result()
+                if isinstance(parsed, str):
+                    stats.failed += 1
+                    print(f"Error processing {parsed}")
+                    continue
+                if isinstance(parsed, BookChange):
+                    # 流式任务已在子进程中写库并生成缩略图
+                    stats.streamed += 1
+                    stats.add(parsed, os.path.getsize(path))
+                    continue
+                if parsed is None or parsed.unchanged:
+                    stats.skipped += 1
+                    continue
+                try:
+                    change = write_book(connection, parsed)
+                except Exception as e:
+                    stats.failed += 1
+                    print(f"Error processing {parsed.path}: {e}")
+                    continue
+                if save_cover(change.book_id, parsed):
+                    cover_jobs[executor.submit(build_cover_variants, change.book_id, parsed.cover_name)] = \
+                        change.book_id
+                stats.add(change, parsed.size)
+
+        # 封面缩略图在同一个进程池中生成，最后批量回写
+        variants = []
+        for future, book_id in cover_jobs.items():
+            try:
+                variants.append((json.dumps(future.result()), book_id))
+            except Exception as e:
+                print(f"Error building cover for book {book_id}: {e}")
+        if variants:
+            with connection.cursor() as cursor:
+                cursor.executemany("update book set cover_variants = %s where id = %s", variants)
+            connection.commit()
+
+    connection.close()
+    if invalidate_cache and stats.changed_book_ids:
+        asyncio.run(_invalidate_changes(stats.changes))
+    print(stats.report())
+    print(peak_memory_report())
+    print(f"变化的图书: {stats.changed_book_ids}")
+    return stats
+
+
+def peak_memory_report() -> str:
+    """
+    主进程与（已退出的）子进程的峰值常驻内存
+    """
+    try:
+        import resource
+    except ImportError:  # Windows
+        return "峰值内存: 不支持"
+    # Linux 下 ru_maxrss 单位为 KB
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return f"峰值内存: 主进程 {own:.0f} MB，子进程 {children:.0f} MB"
+
+
+async def invalidate_change(change: BookChange):
+    """
+    刷新一本书变化后的缓存（图书信息、目录、变化的章节，以及进度指向变化章节的用户的快照）
+    """
+    if not change.changed:
+        return
+    await book_service.invalidate_book_content_cache(
+        book_id=change.book_id,
+        chapter_ids=change.chapter_ids,
+        chapter_count=change.chapter_count,
+    )
+    await snapshot_service.invalidate(change.progress_user_ids)
+
+
+async def _invalidate_changes(changes: list[BookChange]):
+    """
+    刷新变化图书的缓存
+    """
+    for change in changes:
+        await invalidate_change(change)
+
+
+def run():
+    parser = argparse.ArgumentParser(description="EPUB 批量入库")
+    parser.add_argument("folder", help="EPUB 文件目录")
+    parser.add_argument("--workers", type=int, default=None, help="解析进程数，默认 CPU 核数")
+    parser.add_argument("--changed-output", default=None, help="变化的图书ID写入该 JSON 文件")
+    parser.add_argument("--skip-cache-invalidation", action="store_true", help="不刷新变化图书的缓存")
+    parser.add_argument("--streaming", action="store_true", help="全部文件使用流式入库")
+    parser.add_argument("--stream-threshold", type=float, default=None,
+                        help="文件大小（MB）不小于该值时使用流式入库")
+    args = parser.parse_args()
+    stream_threshold = 0 if args.streaming else (
+        int(args.stream_threshold * 1024 * 1024) if args.stream_threshold is not None else None)
+    stats = batch_upload_books(args.folder, workers=args.workers,
+                               invalidate_cache=not args.skip_cache_invalidation,
+                               stream_threshold=stream_threshold)
+    if args.changed_output:
+        with open(args.changed_output, 'w') as f:
+            json.dump(stats.changed_book_ids, f)
 
 
 if __name__ == "__main__":
@@ -1,19 +1,49 @@
-import time
+import asyncio
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, status
 from fastapi.openapi.docs import get_swagger_ui_html, get_swagger_ui_oauth2_redirect_html
 from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
 
 from app.api import token_router, user_router, book_router, shelf_router, user_reading_progress_router, captcha_router
-from app.middleware import RateLimitMiddleware
-from app.middleware.logging import logger
+from app.core import settings
+from app.core.database import check_database, check_redis, close_pools, warm_up_database, warm_up_redis
+from app.core.security import password_executor
+from app.middleware import LoggingMiddleware, RateLimitMiddleware, RateLimitPolicy, logger
+from app.middleware.rate_limit import hybrid_rate_limiter
+from app.utils.static_files import CachedStaticFiles
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    """
+    启动：预先建立 MySQL / Redis 连接、加载 Lua 脚本，任一失败则 worker 启动失败，不接收请求
+    退出：同步限流器剩余消耗，关闭连接池与密码哈希线程池
+    """
+    await asyncio.gather(
+        warm_up_database(settings.DB_POOL_WARMUP),
+        warm_up_redis(settings.REDIS_POOL_WARMUP),
+    )
+    await asyncio.gather(check_database(), check_redis())
+    logger.info(f"Ready: {settings.DB_POOL_WARMUP} MySQL / {settings.REDIS_POOL_WARMUP} Redis connections opened")
+    try:
+        yield
+    finally:
+        try:
+            await hybrid_rate_limiter.stop()
+        except Exception as e:
+            logger.warning(f"Rate limiter final sync failed: {e}")
+        await close_pools()
+        password_executor.shutdown(wait=True)
+
 
 # 在 main.py 中注册
-app = FastAPI(docs_url=None)
+app = FastAPI(docs_url=None, lifespan=lifespan)
 
-# 挂载静态文件目录
-app.mount("/static", StaticFiles(directory="./app/static"), name="static")
+# 挂载静态文件目录（封面缩略图等带哈希的文件长期缓存）
+app.mount("/static", CachedStaticFiles(directory="./app/static", default_cache_control="public, max-age=86400"),
+          name="static")
 # 开发环境允许的源（包括本地）
 DEV_ORIGINS = [
     "http://localhost:3000",
@@ -28,25 +58,27 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["x-captcha-id"],  # 暴露自定义头部
+    # 暴露自定义头部
+    expose_headers=["x-captcha-id", "RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset", "Retry-After"],
 )
 app.add_middleware(
     RateLimitMiddleware,
-    calls=15,
+    calls=120,  # 其余路径：每个用户（未登录按 IP）每分钟 120 次
     period=60,
-    exclude_paths={"/docs", "/openapi.json", "/health"}  # 排除 Swagger 等
+    exclude_paths={"/docs", "/openapi.json", "/health"},  # 排除 Swagger 等
+    policies=[
+        # 验证码、登录、注册按 IP 严格限制
+        RateLimitPolicy(prefix="/captcha", limit=10, period=60, per_user=False),
+        RateLimitPolicy(prefix="/token", limit=15, period=60, per_user=False),
+        RateLimitPolicy(prefix="/user/register", limit=5, period=60, per_user=False),
+        # 阅读接口允许翻页时的突发请求
+        RateLimitPolicy(prefix="/book", limit=300, period=60),
+        RateLimitPolicy(prefix="/user_reading_progress", limit=300, period=60),
+    ],
 )
 # allow_origin_regex=r'$http://localhost\.*^',
-
-
-@app.middleware('http')
-async def log_middleware(request: Request, call_next):
-    start_time = time.perf_counter()
-    response = await call_next(request)
-    process_time = time.perf_counter() - start_time
-    response.headers["X-Process-Time"] = str(process_time)
-    logger.info(f"{request.client.host} {request.method} {request.url} {response.status_code} {process_time:.4f}s")
-    return response
+# 访问日志放在最外层，耗时包含限流检查
+app.add_middleware(LoggingMiddleware)
 
 
 # 中间件
@@ -69,6 +101,22 @@ async def swagger_ui_redirect():
 @app.get("/")
 async def root():
     return {"message": "Hello World"}
+
+
+@app.get("/health", include_in_schema=False)
+async def health():
+    """
+    就绪检查：MySQL 与 Redis 都可用时返回 200，否则返回 503（负载均衡据此摘除实例）
+    """
+    checks = {"mysql": check_database(), "redis": check_redis()}
+    results = await asyncio.gather(*(asyncio.wait_for(check, timeout=3) for check in checks.values()),
+                                   return_exceptions=True)
+    failed = [name for name, result in zip(checks, results) if isinstance(result, Exception)]
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE if failed else status.HTTP_200_OK,
+        content={"status": "unavailable" if failed else "ok", "failed": failed},
+    )
+
 #  获取 token  路由
 app.include_router(token_router)
 # 用户相关
@@ -1,2 +1,2 @@
-from .logging import logger
-from .rate_limit import RateLimitMiddleware
\ No newline at end of file
+from .logging import logger, LoggingMiddleware
+from .rate_limit import RateLimitMiddleware, RateLimitPolicy
\ No newline at end of file
@@ -1,6 +1,11 @@
 # app/middleware/logging.py
 import logging
 import sys
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 # 结构化日志
 logger = logging.getLogger("app")
@@ -17,3 +22,29 @@ if not logger.handlers:
 # 防止日志重复输出
 logger.propagate = False
 
+
+class LoggingMiddleware:
+    """
+    纯 ASGI 访问日志中间件：响应开始时写入 X-Process-Time 并记录日志，不包装响应体
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+
+        async def send_with_process_time(message: Message):
+            if message["type"] == "http.response.start":
+                process_time = time.perf_counter() - start_time
+                MutableHeaders(scope=message)["X-Process-Time"] = str(process_time)
+                request = Request(scope)
+                client = request.client.host if request.client else "-"
+                logger.info(f"{client} {request.method} {request.url} {message['status']} {process_time:.4f}s")
+            await send(message)
+
+        await self.app(scope, receive, send_with_process_time)
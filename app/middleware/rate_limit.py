@@ -1,58 +1,326 @@
 # middleware/rate_limit.py
+import asyncio
+import math
+import time
+from dataclasses import dataclass
+
 from fastapi import Request, status
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import redis_pool, settings
+from app.core.database import register_lua_script
+# app.core.security 依赖 app.middleware.logging，这里导入模块避免循环导入
+from app.core import error_handler, security
+from app.middleware.logging import logger
+from app.models.response_model import ResponseCode
+
+# 令牌桶：一次往返完成补充、扣减与过期设置，时间取 Redis 服务器时间，多个进程之间没有时钟偏差
+# KEYS[1] 桶；ARGV: 容量, 补满所需毫秒, 本次消耗
+# 返回 {是否允许, 剩余令牌, 距离补满的毫秒数, 被拒绝时需要等待的毫秒数}
+_token_bucket_script = register_lua_script("""
+local capacity = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * capacity / period)
+local allowed = 0
+local retry = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry = math.ceil((cost - tokens) * period / capacity)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+local reset = math.ceil((capacity - tokens) * period / capacity)
+redis.call('PEXPIRE', KEYS[1], math.max(reset, 1))
+return {allowed, math.floor(tokens), reset, retry}
+""")
+
+# 批量同步进程内消耗：KEYS 为多个桶；ARGV 依次为每个桶的 容量, 补满所需毫秒, 已消耗令牌数
+# 与 _token_bucket_script 使用相同的桶格式，返回每个桶同步后的全局剩余令牌（字符串，保留小数）
+_sync_buckets_script = register_lua_script("""
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local result = {}
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 3 - 2])
+    local period = tonumber(ARGV[i * 3 - 1])
+    local consumed = tonumber(ARGV[i * 3])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * capacity / period)
+    tokens = math.max(0, tokens - consumed)
+    redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', now)
+    redis.call('PEXPIRE', key, math.max(math.ceil((capacity - tokens) * period / capacity), 1))
+    result[i] = tostring(tokens)
+end
+return result
+""")
 
-from app.core import redis_pool
-from app.models.response_model import ResponseModel, ResponseCode
+# 单次同步的最大桶数
+SYNC_BATCH_KEYS = 500
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    """
+    限流策略：每 period 秒补满 limit 个令牌（允许 limit 次突发）
+    :param prefix: 路径前缀，按最长前缀匹配
+    :param limit: 桶容量
+    :param period: 补满所需时间（秒）
+    :param per_user: 已登录时按用户限流，否则（或未登录）按客户端 IP
+    """
+    prefix: str
+    limit: int
+    period: int
+    per_user: bool = True
 
 
 def get_client_ip(request: Request) -> str:
-    # 优先使用 X-Forwarded-For（适用于 Nginx、负载均衡）
-    if "X-Forwarded-For" in request.headers:
-        ip = request.headers["X-Forwarded-For"].split(",")[0].strip()
-    elif "X-Real-IP" in request.headers:
-        ip = request.headers["X-Real-IP"]
-    else:
-        ip = request.client.host if request.client else "127.0.0.1"
-    return ip
+    """
+    客户端 IP：请求头可由客户端伪造，不直接读取 X-Forwarded-For / X-Real-IP；
+    部署在反向代理之后时由 uvicorn 的 proxy_headers（只信任 FORWARDED_ALLOW_IPS）改写 request.client
+    """
+    return request.client.host if request.client else "127.0.0.1"
+
+
+def get_rate_limit_identity(request: Request, policy: RateLimitPolicy) -> str:
+    """
+    限流主体：有效的 Bearer 令牌对应用户ID，否则为客户端 IP
+    验证结果保存在 request.state.current_user，get_current_user 直接复用
+    """
+    if policy.per_user:
+        authorization = request.headers.get("Authorization", "")
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() == "bearer" and token:
+            try:
+                user = security.verify_access_token(token)
+            except error_handler.CustomException:
+                pass
+            else:
+                request.state.current_user = user
+                return f"user:{user.get('id')}"
+    return f"ip:{get_client_ip(request)}"
+
+
+class RedisRateLimiter:
+    """
+    每个请求一次 EVALSHA，全局精确
+    """
+
+    async def hit(self, key: str, policy: RateLimitPolicy) -> tuple[bool, int, int, int]:
+        """
+        消耗一个令牌
+        :return: (是否允许, 剩余令牌, 距离补满的毫秒数, 被拒绝时需要等待的毫秒数)
+        """
+        allowed, remaining, reset, retry = await _token_bucket_script(
+            keys=[key],
+            args=[policy.limit, policy.period * 1000, 1],
+        )
+        return bool(allowed), remaining, reset, retry
+
+    async def stop(self):
+        pass
+
+
+class LocalBucket:
+    __slots__ = ("policy", "tokens", "ts", "pending")
+
+    def __init__(self, policy: RateLimitPolicy, tokens: float, ts: float):
+        self.policy = policy
+        # 估计的全局剩余令牌（已扣除本进程未同步的消耗）
+        self.tokens = tokens
+        self.ts = ts
+        # 本进程尚未同步到 Redis 的消耗
+        self.pending = 0
+
+    def refill(self, now: float):
+        rate = self.policy.limit / self.policy.period
+        self.tokens = min(self.policy.limit, self.tokens + (now - self.ts) * rate)
+        self.ts = now
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+class HybridRateLimiter:
+    """
+    进程内令牌桶，消耗数由后台任务按 sync_interval 批量同步到 Redis，并取回其他进程消耗后的全局剩余令牌
+    - 本进程首次遇到的桶先同步一次，获取全局状态
+    - 每个桶未同步的消耗达到 容量 × max_drift（至少 1）时，当前请求同步等待
+      因此全局最多超发 进程数 × 容量 × max_drift 个请求，容量很小的严格策略退化为每个请求同步
+    """
+
+    def __init__(self, sync_interval: float, max_drift: float):
+        self.sync_interval = sync_interval
+        self.max_drift = max_drift
+        self.buckets: dict[str, LocalBucket] = {}
+        self._task: asyncio.Task | None = None
+
+    async def hit(self, key: str, policy: RateLimitPolicy) -> tuple[bool, int, int, int]:
+        """
+        消耗一个令牌（大多数请求不访问 Redis）
+        :return: (是否允许, 剩余令牌, 距离补满的毫秒数, 被拒绝时需要等待的毫秒数)
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._sync_loop())
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = LocalBucket(policy, policy.limit, time.monotonic())
+            await self.sync([key])
+        elif bucket.pending >= max(1, int(policy.limit * self.max_drift)):
+            await self.sync([key])
+
+        bucket.refill(time.monotonic())
+        period_ms = policy.period * 1000
+        retry = 0
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            bucket.pending += 1
+            allowed = True
+        else:
+            retry = math.ceil((1 - bucket.tokens) * period_ms / policy.limit)
+            allowed = False
+        reset = math.ceil((policy.limit - bucket.tokens) * period_ms / policy.limit)
+        return allowed, math.floor(bucket.tokens), reset, retry
+
+    async def sync(self, keys: list[str] | None = None):
+        """
+        同步消耗到 Redis 并更新本地桶
+        :param keys: 要同步的桶，默认为所有有未同步消耗的桶
+        """
+        if keys is None:
+            keys = [key for key, bucket in self.buckets.items() if bucket.pending]
+        for start in range(0, len(keys), SYNC_BATCH_KEYS):
+            batch = [(key, self.buckets[key]) for key in keys[start:start + SYNC_BATCH_KEYS] if key in self.buckets]
+            # 先取走待同步的消耗，同步期间的新消耗留到下一次
+            consumed = [bucket.pending for _, bucket in batch]
+            args = []
+            for (_, bucket), count in zip(batch, consumed):
+                bucket.pending = 0
+                args += [bucket.policy.limit, bucket.policy.period * 1000, count]
+            try:
+                remote = await _sync_buckets_script(keys=[key for key, _ in batch], args=args)
+            except Exception:
+                for (_, bucket), count in zip(batch, consumed):
+                    bucket.pending += count
+                raise
+            now = time.monotonic()
+            for (_, bucket), tokens in zip(batch, remote):
+                bucket.tokens = float(tokens) - bucket.pending
+                bucket.ts = now
+
+    def evict_idle(self):
+        """
+        移除已补满且没有未同步消耗的桶，限制内存占用
+        """
+        now = time.monotonic()
+        for key in [key for key, bucket in self.buckets.items()
+                    if not bucket.pending and now - bucket.ts > bucket.policy.period]:
+            del self.buckets[key]
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+                self.evict_idle()
+            except Exception as e:
+                logger.error(f"Rate limit sync failed: {e}")
+
+    async def stop(self):
+        """
+        停止后台同步并同步剩余消耗
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.sync()
+
+
+redis_rate_limiter = RedisRateLimiter()
+hybrid_rate_limiter = HybridRateLimiter(
+    sync_interval=settings.RATE_LIMIT_SYNC_INTERVAL,
+    max_drift=settings.RATE_LIMIT_MAX_DRIFT,
+)
+
+
+class RateLimitMiddleware:
+    """
+    纯 ASGI 限流中间件：不包装请求 / 响应流，流式响应直接透传，只在响应开始时追加限流响应头
+    """
+
     def __init__(
             self,
-            app,
-            calls: int = 15,  # 允许请求次数
-            period: int = 60,  # 时间窗口（秒）
-            exclude_paths: set | None= None,  # 不限流的路径
+            app: ASGIApp,
+            calls: int = 15,  # 默认策略：桶容量
+            period: int = 60,  # 默认策略：补满所需时间（秒）
+            exclude_paths: set | None = None,  # 不限流的路径
+            policies: list[RateLimitPolicy] | None = None,  # 按路径前缀的策略
+            mode: str = settings.RATE_LIMIT_MODE,  # redis / hybrid
     ):
-        super().__init__(app)
-        self.calls = calls
-        self.period = period
+        self.app = app
+        self.default_policy = RateLimitPolicy(prefix="", limit=calls, period=period)
         self.exclude_paths = exclude_paths or set()
+        # 最长前缀优先
+        self.policies = sorted(policies or [], key=lambda policy: len(policy.prefix), reverse=True)
+        self.limiter = hybrid_rate_limiter if mode == "hybrid" else redis_rate_limiter
 
-    async def dispatch(self, request: Request, call_next):
-        # 跳过不需要限流的路径
-        if request.url.path in self.exclude_paths:
-            return await call_next(request)
+    def get_policy(self, path: str) -> RateLimitPolicy:
+        for policy in self.policies:
+            if path.startswith(policy.prefix):
+                return policy
+        return self.default_policy
 
-        # 获取客户端 IP（支持反向代理）
-        client_ip = get_client_ip(request)
-        key = f"rate_limit:{client_ip}:{request.url.path}"
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        # 跳过不需要限流的路径
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
 
-        # 使用 Redis 的 INCR + EXPIRE 实现原子限流
-        current = await redis_pool.incr(key)
-        if current == 1:
-            await redis_pool.expire(key, self.period)
+        request = Request(scope)
+        policy = self.get_policy(scope["path"])
+        key = f"rate_limit:{policy.prefix or '*'}:{get_rate_limit_identity(request, policy)}"
+        try:
+            allowed, remaining, reset, retry = await self.limiter.hit(key, policy)
+        except Exception as e:
+            # Redis 不可用时放行，不影响正常访问
+            logger.error(f"Rate limit check failed: {e}")
+            await self.app(scope, receive, send)
+            return
 
-        if current > self.calls:
-            return JSONResponse(
+        headers = {
+            "RateLimit-Limit": str(policy.limit),
+            "RateLimit-Remaining": str(remaining),
+            "RateLimit-Reset": str(math.ceil(reset / 1000)),
+            "RateLimit-Policy": f"{policy.limit};w={policy.period}",
+        }
+        if not allowed:
+            headers["Retry-After"] = str(math.ceil(retry / 1000))
+            response = JSONResponse(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 content={
                     "code": ResponseCode.ERROR,
                     "message": "请求频率过高，请稍后重试",
                     "data": None
-                }
+                },
+                headers=headers,
             )
-        response = await call_next(request)
-        return response
+            await response(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).update(headers)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
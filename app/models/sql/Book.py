@@ -9,6 +9,8 @@ class Book(SQLModel ,table=True):
     name: str = Field(index=True)
     author: str = Field(index=True)
     cover: str = Field(default="")
+    # 封面缩略图 {"small": "cover-small.<hash>.webp", ...} 的 JSON 字符串
+    cover_variants: str = Field(default="")
     description: str = Field(
         default="",
         sa_column=Column(Text)
@@ -16,6 +18,8 @@ class Book(SQLModel ,table=True):
     category: str = Field(default="")
     tags: str = Field(default="")
     total_chapter: int = Field(default=0)
+    # 源 EPUB 文件的 sha256，重复入库时内容未变则跳过
+    content_hash: str = Field(default="", index=True)
     created_at: datetime = Field(default_factory=datetime.now)
 
 
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Index, Column, Text
+from sqlalchemy import Index, Column, Text, Double
 from sqlalchemy.dialects.mysql import MEDIUMTEXT
 from sqlmodel import SQLModel, Field
 from sympy.physics.optics import Medium
@@ -12,11 +12,14 @@ class BookChapter(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     book_id: int = Field(foreign_key="book.id", index=True)
     title: str = Field(default="")
-    sort_order: float = Field(default=0.0, index=True)
+    # 双精度：单精度在排序值较大时无法区分分段（间隔 0.01）
+    sort_order: float = Field(default=0.0, sa_column=Column(Double, nullable=False, default=0.0, index=True))
     content: str = Field(
         default="",
         sa_column=Column(MEDIUMTEXT)
     )
+    # 标题 + 内容的 sha256，重复入库时只更新变化的章节
+    content_hash: str = Field(default="")
     created_at: datetime = Field(default_factory=datetime.now)
 
     # 添加联合唯一索引（防止同一本书章节排序重复）
@@ -0,0 +1,21 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Index
+from sqlmodel import SQLModel, Field
+
+
+class BookRecommendation(SQLModel, table=True):
+    """图书推荐（读过此书的人也读过），由离线任务根据书架共现计算"""
+    __tablename__: str = "book_recommendation"
+    id: Optional[int] = Field(default=None, primary_key=True)
+    book_id: int = Field(foreign_key="book.id")
+    recommended_book_id: int = Field(foreign_key="book.id")
+    score: float = Field(default=0.0)
+    rank: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+    # 按 book_id 查询并按 rank 排序，一次索引范围扫描
+    __table_args__ = (
+        Index("index_book_rank_unique", "book_id", "rank", unique=True),
+    )
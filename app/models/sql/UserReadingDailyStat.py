@@ -0,0 +1,22 @@
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import Index
+from sqlmodel import SQLModel, Field
+
+
+class UserReadingDailyStat(SQLModel, table=True):
+    """用户每日阅读统计，由 app/workers/stats_compactor.py 从 Redis 的每日汇总写入"""
+    __tablename__: str = "user_reading_daily_stat"
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id")
+    day: date
+    reading_seconds: int = Field(default=0)
+    chapters_read: int = Field(default=0)
+    updates: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+    # 按用户读取全部日期（重算汇总），同时作为 upsert 的唯一键
+    __table_args__ = (
+        Index("index_user_day_unique", "user_id", "day", unique=True),
+    )
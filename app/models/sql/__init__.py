@@ -3,3 +3,5 @@ from .BookChapter import BookChapter
 from .Shelf import Shelf
 from .User import User
 from .UserReadingProgress import UserReadingProgress
+from .BookRecommendation import BookRecommendation
+from .UserReadingDailyStat import UserReadingDailyStat
@@ -7,9 +7,34 @@ from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core.config import settings
+from app.core.database import redis_pool
 from app.models.sql import BookChapter
 from app.models.sql.Book import Book
-from app.services.cache_service import cache, cache_get, cache_set
+from app.services.cache_service import (
+    cache, cache_delete, cache_get, cache_get_many, cache_set, cache_set_many, generate_cache_key,
+)
+from app.services.cover_service import build_cover_urls
+
+
+def _book_to_dict(book: Book) -> dict[str, Any]:
+    """
+    图书对象转换为响应字典，封面替换为完整地址并附带各尺寸缩略图
+    """
+    data = book.model_dump(mode="json", exclude={"cover_variants"})
+    data["covers"] = build_cover_urls(book.id, book.cover, book.cover_variants)
+    data["cover"] = data["covers"]["original"]
+    return data
+
+
+def _book_to_card(book: dict[str, Any]) -> dict[str, Any]:
+    """
+    列表页使用缩略图作为封面，减少传输量
+    """
+    covers = book.get("covers") or {}
+    cover = covers.get(settings.BOOK_LIST_COVER_SIZE)
+    if not cover:
+        return book
+    return {**book, "cover": cover}
 
 
 class BookService:
@@ -44,54 +69,59 @@ class BookService:
             statement = select(Book).where(Book.id == book_id)
             result = await database.exec(statement)
             book = result.one_or_none()
-            book.cover = f"{settings.SERVER_URL}/static/book/{book.id}/{book.cover}"
-            return book.model_dump(mode="json")
+            if book is None:
+                return None
+            return _book_to_dict(book)
         except NoResultFound:
             return None  # 返回 None
 
     @staticmethod
-    async def get_book_by_list(
+    async def get_books_by_ids(
             book_ids: list[int],
             database: AsyncSession
-    ) -> list[Book]:
+    ) -> dict[int, dict[str, Any]]:
         """
-        获取图书信息
+        批量获取图书信息：一次 MGET 读取 get_book_by_id 的缓存，未命中的一次查询并回填缓存
         :param book_ids:  图书ID列表
         :param database:        数据库会话
-        :return:         图书信息
+        :return:         {图书ID: 图书信息}，不存在的图书不返回
         """
         if not book_ids:
-            return []
-        miss_book_ids = []
-        book_list = []
-        for book_id in book_ids:
-            try:
-                result = await cache_get(
-                    args=[],
-                    kwargs={"book_id": book_id},
-                    key_prefix="get_book_by_id"
-                )
-                if result:
-                    book_list.append(result)
-                else:
-                    miss_book_ids.append(book_id)
-            except Exception as e:
-                raise ValueError(f"获取图书信息失败{str(e)}")
+            return {}
+        cached = await cache_get_many(
+            kwargs_list=[{"book_id": book_id} for book_id in book_ids],
+            key_prefix="get_book_by_id",
+        )
+        books = {book_id: book for book_id, book in zip(book_ids, cached) if book}
+        miss_book_ids = [book_id for book_id in book_ids if book_id not in books]
         if miss_book_ids:
             statement = select(Book).where(Book.id.in_(miss_book_ids))
             result = await database.exec(statement)
-            books = result.all()
-            for book in books:
-                book.cover = f"{settings.SERVER_URL}/static/book/{book.id}/{book.cover}"
-            tasks = [cache_set(
-                args=[],
-                kwargs={"book_id": book.id},
+            missed = [_book_to_dict(book) for book in result.all()]
+            await cache_set_many(
+                items=[({"book_id": book["id"]}, book) for book in missed],
+                expire=settings.BOOK_CACHE_EXPIRE,
                 key_prefix="get_book_by_id",
-                value=book.model_dump(mode="json")
-            ) for book in books]
-            await asyncio.gather(*tasks)
-            book_list.extend(books)
-        return book_list
+            )
+            books.update((book["id"], book) for book in missed)
+        return books
+
+    @staticmethod
+    async def get_book_by_list(
+            book_ids: list[int],
+            database: AsyncSession
+    ) -> list[dict[str, Any]]:
+        """
+        获取图书信息（列表页，封面为缩略图）
+        :param book_ids:  图书ID列表
+        :param database:        数据库会话
+        :return:         图书信息
+        """
+        try:
+            books = await BookService.get_books_by_ids(book_ids, database)
+        except Exception as e:
+            raise ValueError(f"获取图书信息失败{str(e)}")
+        return [_book_to_card(books[book_id]) for book_id in dict.fromkeys(book_ids) if book_id in books]
 
     @staticmethod
     @cache(expire=settings.BOOK_CACHE_EXPIRE, exclude_kwargs=["database"])
@@ -151,6 +181,95 @@ class BookService:
         chapter = result.one_or_none()
         return str(chapter)
 
+    @staticmethod
+    @cache(expire=settings.BOOK_CACHE_EXPIRE, exclude_kwargs=["database"])
+    async def _get_chapter_book_id(
+            chapter_id: int,
+            database: AsyncSession,
+    ) -> int | None:
+        statement = select(BookChapter.book_id).where(BookChapter.id == chapter_id)
+        result = await database.exec(statement)
+        return result.one_or_none()
+
+    @staticmethod
+    @cache(expire=settings.BOOK_CACHE_EXPIRE, exclude_kwargs=["database"])
+    async def _get_chapter_id_by_index(
+            book_id: int,
+            chapter_index: int,
+            database: AsyncSession,
+    ) -> int | None:
+        statement = select(BookChapter.id) \
+            .where(BookChapter.book_id == book_id) \
+            .order_by(BookChapter.sort_order) \
+            .limit(1) \
+            .offset(chapter_index)
+        result = await database.exec(statement)
+        return result.one_or_none()
+
+    @staticmethod
+    async def _lookup_or_mark_missing(kwargs: dict[str, Any], key_prefix: str, lookup) -> int | None:
+        """
+        查询存在时长期缓存；不存在时写入 MISSING_CACHE_EXPIRE 的标记，标记有效期内不再查询数据库
+        """
+        if await cache_get(kwargs=kwargs, key_prefix=f"missing:{key_prefix}"):
+            return None
+        value = await lookup()
+        if value is None:
+            await cache_set(value=1, kwargs=kwargs, key_prefix=f"missing:{key_prefix}",
+                            expire=settings.MISSING_CACHE_EXPIRE)
+        return value
+
+    @staticmethod
+    async def get_chapter_book_id(
+            chapter_id: int,
+            database: AsyncSession,
+    ) -> int | None:
+        """
+        获取章节所属图书ID
+        :param chapter_id:    章节ID
+        :param database:      数据库会话
+        :return:              图书ID，章节不存在时为 None
+        """
+        return await BookService._lookup_or_mark_missing(
+            {"chapter_id": chapter_id}, "get_chapter_book_id",
+            lambda: BookService._get_chapter_book_id(chapter_id=chapter_id, database=database),
+        )
+
+    @staticmethod
+    async def get_chapter_book_ids(
+            chapter_ids: list[int] | set[int],
+            database: AsyncSession,
+    ) -> dict[int, int]:
+        """
+        批量获取章节所属图书ID（一条查询）
+        :param chapter_ids:   章节ID列表
+        :param database:      数据库会话
+        :return:              {章节ID: 图书ID}，不存在的章节不返回
+        """
+        if not chapter_ids:
+            return {}
+        statement = select(BookChapter.id, BookChapter.book_id).where(BookChapter.id.in_(set(chapter_ids)))
+        return dict((await database.exec(statement)).all())
+
+    @staticmethod
+    async def get_chapter_id_by_index(
+            book_id: int,
+            chapter_index: int,
+            database: AsyncSession,
+    ) -> int | None:
+        """
+        按索引获取章节ID
+        :param book_id:        图书ID
+        :param chapter_index:  章节索引
+        :param database:       数据库会话
+        :return:               章节ID，图书或章节不存在时为 None
+        """
+        return await BookService._lookup_or_mark_missing(
+            {"book_id": book_id, "chapter_index": chapter_index}, "get_chapter_id_by_index",
+            lambda: BookService._get_chapter_id_by_index(book_id=book_id, chapter_index=chapter_index,
+                                                         database=database),
+        )
+
     @staticmethod
     @cache(expire=settings.BOOK_CACHE_EXPIRE, exclude_kwargs=["database"])
     async def get_books_total_count(
@@ -165,5 +284,47 @@ class BookService:
         result = await database.exec(statement)
         return result.one_or_none()
 
+    @staticmethod
+    async def invalidate_book_cache(book_ids: list[int]) -> None:
+        """
+        删除图书信息缓存（封面、元数据更新后调用）
+        :param book_ids: 图书ID列表
+        """
+        tasks = [cache_delete(
+            kwargs={"book_id": book_id},
+            key_prefix=key_prefix
+        ) for book_id in book_ids for key_prefix in ("get_book_by_id", "response:get_book_by_id")]
+        await asyncio.gather(*tasks)
+
+    @staticmethod
+    async def invalidate_book_content_cache(
+            book_id: int,
+            chapter_ids: list[int],
+            chapter_count: int,
+    ) -> None:
+        """
+        删除图书内容相关缓存（重新入库后调用）：图书信息、目录、变化的章节、按索引读取的章节
+        :param book_id:       图书ID
+        :param chapter_ids:   内容变化或被删除的章节ID
+        :param chapter_count: 变更前后章节数的较大值
+        """
+        keys = [
+            generate_cache_key(kwargs={"book_id": book_id}, key_prefix=key_prefix)
+            for key_prefix in ("BookService.get_book_toc_by_id", "response:get_book_toc_by_id")
+        ]
+        keys += [generate_cache_key(kwargs={"chapter_id": chapter_id},
+                                    key_prefix="BookService.get_book_chapter_by_id")
+                 for chapter_id in chapter_ids]
+        keys += [generate_cache_key(kwargs={"id": chapter_id}, key_prefix="response:get_book_chapter_by_id")
+                 for chapter_id in chapter_ids]
+        keys += [generate_cache_key(kwargs={"book_id": book_id, "chapter_index": chapter_index},
+                                    key_prefix=key_prefix)
+                 for chapter_index in range(chapter_count)
+                 for key_prefix in ("BookService.get_book_chapter_by_index", "BookService._get_chapter_id_by_index",
+                                    "missing:get_chapter_id_by_index")]
+        for start in range(0, len(keys), 1000):
+            await redis_pool.delete(*keys[start:start + 1000])
+        await BookService.invalidate_book_cache([book_id])
+
 
 book_service = BookService()
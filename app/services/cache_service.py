@@ -7,8 +7,12 @@ import json
 import uuid
 from typing import Callable,Any
 
+from starlette.responses import Response
+
+from app.core.config import settings
 from app.core.database import redis_pool
 from app.middleware.logging import logger
+from app.models.response_model import ResponseModel, ResponseCode
 
 
 def generate_cache_key(
@@ -75,6 +79,7 @@ async def cache_get(
     fallback_func: Callable[..., Any] | None = None,
     fallback_args: tuple[Any, ...] = (),
     fallback_kwargs: dict[str, Any] | None= None,
+    raw: bool = False,
 ) -> Any:
     """
     手动获取缓存，支持回源（带分布式锁 + 自动续期）
@@ -83,9 +88,12 @@ async def cache_get(
     :param kwargs: 用于生成 key 的关键字参数
     :param fallback_func: 当缓存未命中时调用的异步函数
     :param fallback_args, fallback_kwargs: 传递给 fallback_func 的参数
+    :param raw: 为 True 时缓存值为 bytes，读写均不做 JSON 编解码
     :return: 缓存值 或 fallback_func 的返回值
     """
     fallback_kwargs = fallback_kwargs or {}
+    decode = (lambda value: value) if raw else json.loads
+    encode = (lambda value: value) if raw else json.dumps
     cache_key = generate_cache_key(
         args, kwargs, exclude_args, exclude_kwargs, key_prefix
     )
@@ -96,7 +104,7 @@ async def cache_get(
         cached = await redis_pool.get(cache_key)
         if cached is not None:
             logger.info(f"Cache hit: {cache_key}")
-            return json.loads(cached)
+            return decode(cached)
     except Exception as e:
         logger.error(f"Cache read failed: {e}")
 
@@ -122,7 +130,7 @@ async def cache_get(
             # 双重检查：可能在加锁前已被写入
             cached = await redis_pool.get(cache_key)
             if cached is not None:
-                return json.loads(cached)
+                return decode(cached)
 
             # 执行回源逻辑
             result = await fallback_func(*fallback_args, **fallback_kwargs)
@@ -133,7 +141,7 @@ async def cache_get(
             )
             if should_cache:
                 await redis_pool.setex(
-                    cache_key, expire, json.dumps(result)
+                    cache_key, expire, encode(result)
                 )
                 logger.info(f"Cache set: {cache_key} (expire={expire}s)")
 
@@ -148,7 +156,7 @@ async def cache_get(
                 cached = await redis_pool.get(cache_key)
                 if cached is not None:
                     logger.info(f"Cache filled by another worker: {cache_key}")
-                    return json.loads(cached)
+                    return decode(cached)
 
             # 超时仍未命中，认为锁持有者失败，自己回源
             logger.warning(
@@ -219,6 +227,52 @@ async def cache_set(
         return False
 
 
+async def cache_get_many(
+    *,
+    kwargs_list: list[dict[str, Any]],
+    key_prefix: str | None = None,
+) -> list[Any]:
+    """
+    批量读取缓存（一次 MGET），key 与 cache_get(args=[], kwargs=...) 相同
+    :param kwargs_list: 每个缓存项用于生成 key 的关键字参数
+    :return: 与 kwargs_list 一一对应的缓存值，未命中为 None
+    """
+    if not kwargs_list:
+        return []
+    keys = [generate_cache_key([], kwargs, key_prefix=key_prefix) for kwargs in kwargs_list]
+    try:
+        values = await redis_pool.mget(keys)
+    except Exception as e:
+        logger.error(f"Cache read many failed: {e}")
+        return [None] * len(keys)
+    return [json.loads(value) if value is not None else None for value in values]
+
+
+async def cache_set_many(
+    *,
+    items: list[tuple[dict[str, Any], Any]],
+    expire: int = 300,
+    key_prefix: str | None = None,
+) -> bool:
+    """
+    批量设置缓存（一次 pipeline 往返）
+    :param items: [(用于生成 key 的关键字参数, 缓存值)]，空值不缓存
+    """
+    if key_prefix is None or key_prefix == "":
+        raise ValueError("key_prefix must be set")
+    pipe = redis_pool.pipeline(transaction=False)
+    for kwargs, value in items:
+        if value is None or value == {} or value == []:
+            continue
+        pipe.setex(generate_cache_key([], kwargs, key_prefix=key_prefix), expire, json.dumps(value, default=str))
+    try:
+        await pipe.execute()
+        return True
+    except Exception as e:
+        logger.error(f"Cache set many failed: {e}")
+        return False
+
+
 async def cache_delete(
     *,
     args: list[Any]|None=None,
@@ -279,4 +333,56 @@ def cache(
 
         return wrapper
 
-    return decorator
\ No newline at end of file
+    return decorator
+
+
+def cache_response(
+    expire: int = 300,
+    exclude_kwargs: list[str] | None = None,
+    key_prefix: str | None = None,
+    lock_timeout: int = 10,
+):
+    """
+    路由级响应缓存：缓存最终的 ResponseModel JSON bytes
+    命中时直接返回原始 Response，跳过 JSON 解码、模型校验和重新序列化
+    仅缓存 code 为 SUCCESS 且 data 非空的响应；RAW_RESPONSE_CACHE 关闭时直接调用路由函数
+    需放在 wrap_error_handler_api 之下，异常仍由其统一处理
+    """
+    def decorator(func: Callable) -> Callable:
+        prefix = f"response:{key_prefix if key_prefix else func.__qualname__}"
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs) -> Any:
+            if not settings.RAW_RESPONSE_CACHE:
+                return await func(*args, **kwargs)
+
+            uncached = {}
+
+            async def _fallback():
+                result = await func(*args, **kwargs)
+                if (
+                    isinstance(result, ResponseModel)
+                    and result.code == ResponseCode.SUCCESS
+                    and result.data not in (None, {}, [])
+                ):
+                    return result.model_dump_json().encode()
+                # 不可缓存的响应原样返回
+                uncached["result"] = result
+                return None
+
+            body = await cache_get(
+                kwargs=kwargs,
+                expire=expire,
+                exclude_kwargs=exclude_kwargs,
+                key_prefix=prefix,
+                lock_timeout=lock_timeout,
+                fallback_func=_fallback,
+                raw=True,
+            )
+            if body is None:
+                return uncached.get("result")
+            return Response(content=body, media_type="application/json")
+
+        return wrapper
+
+    return decorator
@@ -1,11 +1,31 @@
 from string import ascii_letters, digits
 from random import choices
-from typing import Tuple
+from typing import Optional, Tuple
 from uuid import uuid4
 from captcha.image import ImageCaptcha
+from starlette.concurrency import run_in_threadpool
 
 from app.core import settings
-from app.services.cache_service import cache_delete, cache_get, cache_set
+from app.core.database import redis_pool, register_lua_script
+from app.middleware.logging import logger
+from app.services.cache_service import cache_delete, cache_get, cache_set, generate_cache_key
+
+# 预生成验证码池，元素为 "答案:PNG bytes"，由 app/workers/captcha_worker.py 补充
+CAPTCHA_POOL_KEY = "captcha:pool"
+
+# 一次往返：从池中取出一个验证码并写入答案缓存（与 cache_set 相同的 JSON 字符串格式）
+_pop_captcha_script = register_lua_script("""
+local entry = redis.call('LPOP', KEYS[1])
+if not entry then
+    return false
+end
+local sep = string.find(entry, ':', 1, true)
+redis.call('SET', KEYS[2], '"' .. string.sub(entry, 1, sep - 1) .. '"', 'EX', ARGV[1])
+return string.sub(entry, sep + 1)
+""")
+
+# 池为空时正在现场生成的验证码数（只在事件循环线程中修改）
+_render_pending = 0
 
 
 class CaptchaService:
@@ -19,19 +39,59 @@ class CaptchaService:
         """
         return ''.join(choices(ascii_letters + digits, k=length))
 
+    @staticmethod
+    def render_captcha(text: str, width: int = 160, height: int = 60) -> bytes:
+        """
+        渲染验证码图片（CPU 密集，不要在事件循环中直接调用）
+        :param text: 验证码
+        :return: PNG bytes
+        """
+        return ImageCaptcha(width=width, height=height).generate(text).getvalue()
+
+    @staticmethod
+    def render_pool_entries(count: int, length: int = 4) -> list[bytes]:
+        """
+        批量生成验证码池元素（供进程池调用）
+        :param count: 数量
+        :param length: 验证码长度
+        :return: ["答案:PNG bytes"]
+        """
+        entries = []
+        for _ in range(count):
+            text = CaptchaService.generate_captcha_text(length)
+            entries.append(text.encode() + b":" + CaptchaService.render_captcha(text))
+        return entries
+
     @staticmethod
     async def get_captcha(
-            length: int = 4,
-            width: int = 160,
-            height: int = 60,
             expire: int = settings.CAPTCHA_EXPIRE  # 2分钟
-    ) -> Tuple[bytes, str]:
-        """生成验证码图片并缓存，返回图片 bytes 和 ID"""
-        text = CaptchaService.generate_captcha_text(length)
-        image = ImageCaptcha(width=width, height=height)
-        image_bytes = image.generate(text).getvalue()  # 直接获取 bytes
-
+    ) -> Optional[Tuple[bytes, str]]:
+        """
+        获取验证码图片并缓存答案，返回图片 bytes 和 ID
+        优先从预生成池中取出；池为空时在线程池中现场生成（默认长度与尺寸），
+        同时生成的数量达到 CAPTCHA_RENDER_MAX_PENDING 时直接返回 None，避免请求堆积
+        :param expire: 答案有效期
+        :return: (图片 bytes, 验证码ID)，池为空且现场生成繁忙时为 None
+        """
+        global _render_pending
         captcha_id = str(uuid4())
+        image_bytes = await _pop_captcha_script(
+            keys=[CAPTCHA_POOL_KEY, generate_cache_key(key_prefix=f"captcha:{captcha_id}")],
+            args=[expire],
+        )
+        if image_bytes:
+            return image_bytes, captcha_id
+
+        if _render_pending >= settings.CAPTCHA_RENDER_MAX_PENDING:
+            logger.warning("Captcha pool is empty and on-demand rendering is saturated")
+            return None
+        logger.warning("Captcha pool is empty, rendering on demand")
+        _render_pending += 1
+        try:
+            text = CaptchaService.generate_captcha_text()
+            image_bytes = await run_in_threadpool(CaptchaService.render_captcha, text)
+        finally:
+            _render_pending -= 1
         await cache_set(
             key_prefix=f"captcha:{captcha_id}",
             value=text,
@@ -39,6 +99,13 @@ class CaptchaService:
         )
         return image_bytes, captcha_id
 
+    @staticmethod
+    async def get_pool_size() -> int:
+        """
+        获取验证码池当前数量
+        """
+        return await redis_pool.llen(CAPTCHA_POOL_KEY)
+
     @staticmethod
     async def verify_captcha(captcha_id: str, captcha_text: str) -> bool:
         """
@@ -0,0 +1,85 @@
+# app/services/cover_service.py
+import hashlib
+import io
+import json
+import os
+
+from PIL import Image
+
+from app.core.config import settings
+
+# 带内容哈希的文件名： cover-small.<12位哈希>.webp
+HASHED_NAME_LENGTH = 12
+
+
+def get_book_dir(book_id: int) -> str:
+    """
+    获取书籍静态文件目录
+    :param book_id: 书籍ID
+    :return: 目录路径
+    """
+    return os.path.join(settings.STATIC_BOOK_DIR, str(book_id))
+
+
+def _write_atomic(path: str, content: bytes):
+    """
+    先写临时文件再替换，避免并发读到半个文件
+    """
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def build_cover_variants(book_id: int, cover_file: str, book_dir: str | None = None) -> dict[str, str]:
+    """
+    生成封面缩略图（同步 CPU 任务，供进程池调用）
+    文件名包含内容哈希，内容不变则文件名不变，可被客户端永久缓存
+    :param book_id: 书籍ID
+    :param cover_file: 原始封面文件名
+    :param book_dir: 书籍目录，默认 STATIC_BOOK_DIR/{book_id}
+    :return: {尺寸名称: 文件名}
+    """
+    book_dir = book_dir or get_book_dir(book_id)
+    image_format = settings.COVER_THUMBNAIL_FORMAT.lower()
+    save_kwargs = {"quality": settings.COVER_THUMBNAIL_QUALITY}
+    if image_format == "webp":
+        save_kwargs["method"] = 6
+
+    variants = {}
+    with Image.open(os.path.join(book_dir, cover_file)) as image:
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        for name, width in settings.COVER_THUMBNAIL_SIZES.items():
+            thumbnail = image.copy()
+            # 只限制宽度，高度按比例缩放
+            thumbnail.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            thumbnail.save(buffer, format=image_format.upper(), **save_kwargs)
+            content = buffer.getvalue()
+            digest = hashlib.sha256(content).hexdigest()[:HASHED_NAME_LENGTH]
+            filename = f"cover-{name}.{digest}.{image_format}"
+            path = os.path.join(book_dir, filename)
+            if not os.path.exists(path):
+                _write_atomic(path, content)
+            variants[name] = filename
+    return variants
+
+
+def build_cover_urls(book_id: int, cover: str, cover_variants: str | None) -> dict[str, str]:
+    """
+    生成封面各尺寸的访问地址
+    :param book_id: 书籍ID
+    :param cover: 原始封面文件名
+    :param cover_variants: 缩略图 JSON 字符串
+    :return: {"original": url, "small": url, ...}
+    """
+    base_url = f"{settings.SERVER_URL}/static/book/{book_id}"
+    covers = {"original": f"{base_url}/{cover}"}
+    if cover_variants:
+        try:
+            variants = json.loads(cover_variants)
+        except ValueError:
+            variants = {}
+        for name, filename in variants.items():
+            covers[name] = f"{base_url}/{filename}"
+    return covers
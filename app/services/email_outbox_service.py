@@ -0,0 +1,72 @@
+# app/services/email_outbox_service.py
+import json
+import uuid
+from time import time
+
+from app.core.database import redis_pool
+
+# 待发送邮件（LPUSH 入队，发件进程从右端取出）
+EMAIL_OUTBOX_KEY = "email:outbox"
+# 发件进程正在发送的邮件，进程异常退出后重新入队
+EMAIL_PROCESSING_KEY = "email:processing"
+# 等待重试的邮件（score 为下次发送时间）
+EMAIL_RETRY_KEY = "email:retry"
+# 超过最大重试次数的邮件
+EMAIL_DEAD_KEY = "email:dead"
+# 发送计数 {sent, retried, dead}
+EMAIL_METRICS_KEY = "email:metrics"
+
+
+class EmailOutboxService:
+
+    @staticmethod
+    async def enqueue(
+            to_emails: list[str],
+            subject: str,
+            body: str,
+            is_html: bool = False,
+    ) -> str:
+        """
+        邮件写入发件箱，由 app/workers/email_worker.py 异步发送
+        :param to_emails: 收件人列表
+        :param subject: 邮件主题
+        :param body: 邮件正文
+        :param is_html: 是否为 HTML 格式
+        :return: 邮件ID
+        """
+        message_id = uuid.uuid4().hex
+        await redis_pool.lpush(EMAIL_OUTBOX_KEY, json.dumps({
+            "id": message_id,
+            "to_emails": to_emails,
+            "subject": subject,
+            "body": body,
+            "is_html": is_html,
+            "attempts": 0,
+            "created_at": time(),
+        }))
+        return message_id
+
+    @staticmethod
+    async def get_metrics() -> dict[str, int]:
+        """
+        获取发件箱指标
+        :return: {"queued", "processing", "retrying", "dead", "sent", "retried"}
+        """
+        pipe = redis_pool.pipeline(transaction=False)
+        pipe.llen(EMAIL_OUTBOX_KEY)
+        pipe.llen(EMAIL_PROCESSING_KEY)
+        pipe.zcard(EMAIL_RETRY_KEY)
+        pipe.llen(EMAIL_DEAD_KEY)
+        pipe.hgetall(EMAIL_METRICS_KEY)
+        queued, processing, retrying, dead, counters = await pipe.execute()
+        return {
+            "queued": queued,
+            "processing": processing,
+            "retrying": retrying,
+            "dead": dead,
+            "sent": int(counters.get(b"sent", 0)),
+            "retried": int(counters.get(b"retried", 0)),
+        }
+
+
+email_outbox_service = EmailOutboxService()
@@ -5,6 +5,7 @@ from email.mime.multipart import MIMEMultipart
 from email.header import Header
 from typing import List, Optional
 
+from app.core.config import settings
 from app.middleware.logging import logger
 
 
@@ -15,6 +16,7 @@ class QQEmailSender:
             authorization_code: str,
             smtp_server: str = "smtp.qq.com",
             smtp_port: int = 465,
+            use_ssl: bool = True,
     ):
         """
         初始化 QQ 邮箱发送器
@@ -23,11 +25,88 @@ class QQEmailSender:
         :param authorization_code: QQ 邮箱 SMTP 授权码（16位）
         :param smtp_server: SMTP 服务器地址，默认 smtp.qq.com
         :param smtp_port: SMTP 端口，默认 587（STARTTLS）
+        :param use_ssl: 是否使用 SMTP_SSL，本地测试用的 SMTP 服务可关闭
         """
         self.sender_email = sender_email
         self.authorization_code = authorization_code
         self.smtp_server = smtp_server
         self.smtp_port = smtp_port
+        self.use_ssl = use_ssl
+        # 复用的已登录连接（发件进程中使用）
+        self._server: smtplib.SMTP | None = None
+
+    def build_message(
+            self,
+            to_emails: List[str],
+            subject: str,
+            body: str,
+            is_html: bool = False,
+            cc_emails: Optional[List[str]] = None,
+    ) -> tuple[list[str], str]:
+        """
+        构建邮件
+        :return: (所有收件人（包括抄送）, 邮件内容)
+        """
+        msg = MIMEMultipart()
+        msg["From"] = Header(self.sender_email)
+        msg["To"] = Header(", ".join(to_emails))
+        if cc_emails:
+            msg["Cc"] = Header(", ".join(cc_emails))
+        msg["Subject"] = Header(subject)
+
+        # 添加正文
+        mime_type = "html" if is_html else "plain"
+        msg.attach(MIMEText(body, mime_type, "utf-8"))
+        return to_emails + (cc_emails or []), msg.as_string()
+
+    def connect(self) -> smtplib.SMTP:
+        """
+        建立并登录 SMTP 连接
+        """
+        if self.use_ssl:
+            server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port)
+        else:
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
+        server.ehlo_or_helo_if_needed()
+        # 本地测试用的 SMTP 服务通常不支持认证
+        if self.authorization_code and server.has_extn("auth"):
+            server.login(self.sender_email, self.authorization_code)
+        return server
+
+    def send_with_connection(
+            self,
+            to_emails: List[str],
+            subject: str,
+            body: str,
+            is_html: bool = False,
+            cc_emails: Optional[List[str]] = None,
+    ) -> None:
+        """
+        使用复用的连接发送邮件，连接断开时重连一次；失败时抛出 smtplib 异常，由调用方决定是否重试
+        """
+        recipients, message = self.build_message(to_emails, subject, body, is_html, cc_emails)
+        for attempt in range(2):
+            if self._server is None:
+                self._server = self.connect()
+            try:
+                self._server.sendmail(self.sender_email, recipients, message)
+                return
+            except smtplib.SMTPServerDisconnected:
+                # 服务器关闭了空闲连接
+                self._server = None
+                if attempt:
+                    raise
+
+    def close(self) -> None:
+        """
+        关闭复用的连接
+        """
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
 
     def send_email(
             self,
@@ -49,24 +128,11 @@ class QQEmailSender:
         """
         try:
             # 创建邮件对象
-            msg = MIMEMultipart()
-            msg["From"] = Header(self.sender_email)
-            msg["To"] = Header(", ".join(to_emails))
-            if cc_emails:
-                msg["Cc"] = Header(", ".join(cc_emails))
-            msg["Subject"] = Header(subject)
-
-            # 添加正文
-            mime_type = "html" if is_html else "plain"
-            msg.attach(MIMEText(body, mime_type, "utf-8"))
-
-            # 所有收件人（包括抄送）
-            all_recipients = to_emails + (cc_emails or [])
+            all_recipients, message = self.build_message(to_emails, subject, body, is_html, cc_emails)
 
             # 连接 SMTP 服务器
-            with smtplib.SMTP_SSL(self.smtp_server, self.smtp_port) as server:
-                server.login(self.sender_email, self.authorization_code)
-                server.sendmail(self.sender_email, all_recipients, msg.as_string())
+            with self.connect() as server:
+                server.sendmail(self.sender_email, all_recipients, message)
 
             logger.info(f"邮件已成功发送至: {', '.join(to_emails)}")
             return True
@@ -89,8 +155,11 @@ class QQEmailSender:
 
 
 email_sender = QQEmailSender(
-    sender_email="2112183503@qq.com",
-    authorization_code="gbovhuasbrtzedji"  # ← 替换为你自己的授权码
+    sender_email=settings.EMAIL_ACCOUNT,
+    authorization_code=settings.EMAIL_CODE,
+    smtp_server=settings.SMTP_SERVER,
+    smtp_port=settings.SMTP_PORT,
+    use_ssl=settings.SMTP_SSL,
 )
 # ========================
 # 使用示例
@@ -0,0 +1,134 @@
+# app/services/ingest_service.py
+import os
+import uuid
+from time import time
+from typing import BinaryIO
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import redis_pool
+
+# 文件读写分块大小
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# 待处理任务队列（LPUSH 入队，工作进程 BLMOVE 到处理中队列后消费）
+INGEST_QUEUE_KEY = "ingest:queue"
+INGEST_PROCESSING_KEY = "ingest:processing"
+
+
+def job_key(job_id: str) -> str:
+    return f"ingest:job:{job_id}"
+
+
+def _copy_upload(source: BinaryIO, path: str) -> None:
+    source.seek(0)
+    # EPUB 是 zip 文件
+    if source.read(4) != b"PK\x03\x04":
+        raise ValueError("文件不是有效的 EPUB")
+    source.seek(0)
+    size = 0
+    with open(path, "wb") as target:
+        while chunk := source.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > settings.UPLOAD_EPUB_MAX_BYTES:
+                raise ValueError(f"文件大小超过 {settings.UPLOAD_EPUB_MAX_BYTES // 1024 // 1024} MB")
+            target.write(chunk)
+
+
+class IngestService:
+    # queued -> running -> done | skipped | failed
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_SKIPPED = "skipped"
+    STATUS_FAILED = "failed"
+
+    @staticmethod
+    async def save_upload(file: UploadFile) -> str:
+        """
+        分块保存上传的 EPUB（在线程池中执行，不阻塞事件循环）
+        :param file: 上传文件
+        :return: 保存路径
+        :raises ValueError: 文件不是 zip 格式或超过大小限制
+        """
+        os.makedirs(settings.UPLOAD_EPUB_DIR, exist_ok=True)
+        path = os.path.join(settings.UPLOAD_EPUB_DIR, f"{uuid.uuid4().hex}.epub")
+        try:
+            await run_in_threadpool(_copy_upload, file.file, path)
+        except Exception:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        return path
+
+    @staticmethod
+    async def create_job(
+            user_id: int,
+            filename: str,
+            path: str,
+    ) -> dict:
+        """
+        创建入库任务并入队
+        :param user_id: 上传用户ID
+        :param filename: 原始文件名
+        :param path: 已保存的文件路径
+        :return: 任务信息
+        """
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "user_id": user_id,
+            "filename": filename,
+            "path": path,
+            "status": IngestService.STATUS_QUEUED,
+            "progress": 0,
+            "message": "",
+            "book_id": 0,
+            "chapters": 0,
+            "created_at": time(),
+            "updated_at": time(),
+        }
+        pipe = redis_pool.pipeline(transaction=True)
+        pipe.hset(job_key(job_id), mapping=job)
+        pipe.expire(job_key(job_id), settings.INGEST_JOB_EXPIRE)
+        pipe.lpush(INGEST_QUEUE_KEY, job_id)
+        await pipe.execute()
+        return IngestService.to_public(job)
+
+    @staticmethod
+    async def get_job(job_id: str) -> dict | None:
+        """
+        获取任务信息
+        :param job_id: 任务ID
+        :return: 任务信息，不存在（或已过期）时返回 None
+        """
+        job = await redis_pool.hgetall(job_key(job_id))
+        if not job:
+            return None
+        job = {key.decode(): value.decode() for key, value in job.items()}
+        for name in ("user_id", "book_id", "chapters"):
+            job[name] = int(job[name])
+        for name in ("progress", "created_at", "updated_at"):
+            job[name] = float(job[name])
+        return job
+
+    @staticmethod
+    async def update_job(job_id: str, **fields) -> None:
+        """
+        更新任务状态
+        :param job_id: 任务ID
+        :param fields: 要更新的字段
+        """
+        fields["updated_at"] = time()
+        await redis_pool.hset(job_key(job_id), mapping=fields)
+
+    @staticmethod
+    def to_public(job: dict) -> dict:
+        """
+        去掉服务器本地路径等内部字段
+        """
+        return {key: value for key, value in job.items() if key != "path"}
+
+
+ingest_service = IngestService()
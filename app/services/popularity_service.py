@@ -0,0 +1,135 @@
+# app/services/popularity_service.py
+import math
+from datetime import datetime
+from time import time
+
+from app.core.config import settings
+from app.core.database import redis_pool, register_lua_script
+from app.middleware.logging import logger
+
+# 趋势榜衰减基准时间（2025-01-01 00:00:00 UTC）
+POPULARITY_EPOCH = 1735689600
+DAY_KEY_TTL = 2 * 24 * 60 * 60
+WEEK_KEY_TTL = 14 * 24 * 60 * 60
+# 独立读者 HyperLogLog：每次阅读续期，长期无人阅读的图书自动清除
+READERS_KEY_TTL = 30 * 24 * 60 * 60
+
+# 一次往返完成：日/周/总榜计数、趋势榜衰减计分、独立读者 HyperLogLog
+# 趋势榜分数保存为对数形式 log(Σ 2^((t - epoch) / half_life))，避免数值溢出
+# KEYS[6]（可选）为 用户+章节 去重标记：同一用户同一章节在 ARGV[7] 秒内只计一次
+_record_read_script = register_lua_script("""
+if KEYS[6] and not redis.call('SET', KEYS[6], 1, 'NX', 'EX', ARGV[7]) then
+    return 0
+end
+redis.call('ZINCRBY', KEYS[1], 1, ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('ZINCRBY', KEYS[2], 1, ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+redis.call('ZINCRBY', KEYS[3], 1, ARGV[1])
+local weight = tonumber(ARGV[4])
+local current = redis.call('ZSCORE', KEYS[4], ARGV[1])
+if current then
+    current = tonumber(current)
+    local high = math.max(current, weight)
+    local low = math.min(current, weight)
+    weight = high + math.log(1 + math.exp(low - high))
+end
+redis.call('ZADD', KEYS[4], weight, ARGV[1])
+if ARGV[5] ~= '' then
+    redis.call('PFADD', KEYS[5], ARGV[5])
+    redis.call('EXPIRE', KEYS[5], ARGV[6])
+end
+return 1
+""")
+
+
+def _period_key(period: str, now: datetime) -> str:
+    """
+    获取排行榜 key
+    :param period: day | week | all | trending
+    :param now: 当前时间
+    :return: redis key
+    """
+    if period == "day":
+        return f"popularity:day:{now.strftime('%Y%m%d')}"
+    if period == "week":
+        return f"popularity:week:{now.strftime('%G%V')}"
+    if period == "all":
+        return "popularity:all"
+    if period == "trending":
+        return "popularity:trending"
+    raise ValueError(f"不支持的排行周期: {period}")
+
+
+def _readers_key(book_id: int | str) -> str:
+    return f"popularity:readers:{book_id}"
+
+
+def _seen_key(user_id: int, chapter_id: int) -> str:
+    return f"popularity:seen:{user_id}:{chapter_id}"
+
+
+class PopularityService:
+    PERIODS = ("day", "week", "all", "trending")
+
+    @staticmethod
+    async def record_read(
+            book_id: int,
+            user_id: int | None = None,
+            chapter_id: int | None = None,
+    ) -> None:
+        """
+        记录一次阅读事件，失败只记录日志，不影响阅读请求
+        章节请求与阅读进度更新（滚动时频繁调用）都会记录，同一用户同一章节在 POPULARITY_READ_DEDUPE_EXPIRE 内只计一次
+        :param book_id: 图书ID
+        :param user_id: 用户ID，用于统计独立读者数
+        :param chapter_id: 章节ID，与 user_id 一起用于去重
+        """
+        timestamp = time()
+        now = datetime.fromtimestamp(timestamp)
+        log_weight = (timestamp - POPULARITY_EPOCH) * math.log(2) / settings.POPULARITY_HALF_LIFE
+        keys = [
+            _period_key("day", now),
+            _period_key("week", now),
+            _period_key("all", now),
+            _period_key("trending", now),
+            _readers_key(book_id),
+        ]
+        if user_id is not None and chapter_id is not None:
+            keys.append(_seen_key(user_id, chapter_id))
+        try:
+            await _record_read_script(
+                keys=keys,
+                args=[book_id, DAY_KEY_TTL, WEEK_KEY_TTL, log_weight, user_id if user_id is not None else "",
+                      READERS_KEY_TTL, settings.POPULARITY_READ_DEDUPE_EXPIRE],
+            )
+        except Exception as e:
+            logger.warning(f"Record read event failed: book {book_id} {e}")
+
+    @staticmethod
+    async def get_top_books(
+            period: str = "day",
+            limit: int = 20,
+    ) -> list[dict[str, int | float]]:
+        """
+        获取热门图书排行，O(log n + N)，不访问 MySQL
+        :param period: day | week | all | trending
+        :param limit: 条数
+        :return: [{"book_id": 图书ID, "score": 分数, "readers": 独立读者数（估算，最近一次阅读后保留 30 天）}]
+        """
+        key = _period_key(period, datetime.now())
+        limit = min(limit, settings.POPULARITY_TOP_LIMIT)
+        entries = await redis_pool.zrevrange(key, 0, limit - 1, withscores=True)
+        if not entries:
+            return []
+        pipe = redis_pool.pipeline(transaction=False)
+        for member, _ in entries:
+            pipe.pfcount(_readers_key(int(member)))
+        readers = await pipe.execute()
+        return [
+            {"book_id": int(member), "score": score, "readers": count}
+            for (member, score), count in zip(entries, readers)
+        ]
+
+
+popularity_service = PopularityService()
@@ -0,0 +1,365 @@
+# app/services/reading_stats_service.py
+import math
+from datetime import date, datetime, timedelta
+from time import time
+from typing import Any
+
+from sqlalchemy import func
+from sqlalchemy.dialects.mysql import insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.database import redis_pool, register_lua_script
+from app.middleware.logging import logger
+from app.models.sql import UserReadingDailyStat
+
+# 用户上一次进度更新的时间戳，用于计算阅读时长
+STATS_LAST_KEY = "stats:last:{user_id}"
+# 每日汇总 hash {seconds, chapters, updates}，日期为 YYYYMMDD
+STATS_DAY_KEY = "stats:day:{user_id}:{day}"
+# 当天读过的章节ID，用于章节去重
+STATS_CHAPTERS_KEY = "stats:chapters:{user_id}:{day}"
+# 用户累计汇总 hash {total_seconds, total_chapters, days_read, streak, longest_streak, last_day}，不过期
+STATS_SUMMARY_KEY = "stats:summary:{user_id}"
+# 待压缩到 MySQL 的 "user_id:YYYYMMDD"
+STATS_DIRTY_KEY = "stats:dirty"
+# 压缩进程取走的批次，写入成功后删除
+STATS_COMPACTING_KEY = "stats:dirty:compacting"
+
+SUMMARY_FIELDS = ("total_seconds", "total_chapters", "days_read", "streak", "longest_streak")
+# 每条 upsert 写入的行数
+WRITE_BATCH_SIZE = 500
+
+# 一次往返更新每日汇总与累计汇总
+# 累计汇总不存在时不更新，由读取时从 MySQL 与近几天的每日汇总重算；
+# 日期早于累计汇总的 last_day（离线同步的旧进度）时无法增量计算连续天数，删除累计汇总待读取时重算
+# KEYS: 上次时间, 每日汇总, 当天章节, 累计汇总, 待压缩集合
+# ARGV: 时间戳, 章节ID, 最大间隔, 每日汇总过期时间, "user_id:YYYYMMDD", 今天, 昨天
+_record_reading_script = register_lua_script("""
+local now = tonumber(ARGV[1])
+local last = tonumber(redis.call('GET', KEYS[1]) or '0')
+local seconds = 0
+if now > last then
+    if now - last <= tonumber(ARGV[3]) then
+        seconds = math.floor(now - last)
+    end
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+end
+local first_today = redis.call('HINCRBY', KEYS[2], 'updates', 1) == 1
+redis.call('HINCRBY', KEYS[2], 'seconds', seconds)
+local new_chapter = redis.call('SADD', KEYS[3], ARGV[2])
+redis.call('HINCRBY', KEYS[2], 'chapters', new_chapter)
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+redis.call('EXPIRE', KEYS[3], ARGV[4])
+redis.call('SADD', KEYS[5], ARGV[5])
+
+if redis.call('EXISTS', KEYS[4]) == 0 then
+    return 0
+end
+local last_day = redis.call('HGET', KEYS[4], 'last_day')
+if last_day and last_day ~= '' and ARGV[6] < last_day then
+    redis.call('DEL', KEYS[4])
+    return 0
+end
+redis.call('HINCRBY', KEYS[4], 'total_seconds', seconds)
+redis.call('HINCRBY', KEYS[4], 'total_chapters', new_chapter)
+if first_today and last_day ~= ARGV[6] then
+    redis.call('HINCRBY', KEYS[4], 'days_read', 1)
+    local streak = 1
+    if last_day == ARGV[7] then
+        streak = redis.call('HINCRBY', KEYS[4], 'streak', 1)
+    else
+        redis.call('HSET', KEYS[4], 'streak', 1)
+    end
+    if streak > tonumber(redis.call('HGET', KEYS[4], 'longest_streak') or '0') then
+        redis.call('HSET', KEYS[4], 'longest_streak', streak)
+    end
+    redis.call('HSET', KEYS[4], 'last_day', ARGV[6])
+end
+return 1
+""")
+
+# 写入累计汇总：ARGV 中为今天之前的汇总，今天的每日汇总在脚本内读取并累加（与 _record_reading_script 相同口径），
+# 与 record_reading 互斥执行，当天的更新不会丢失或重复计算
+# KEYS: 累计汇总, 今天的每日汇总；ARGV: 是否覆盖(1/0), 今天, 昨天, field, value, ...
+# 返回写入后（不覆盖且已存在时为现有）的累计汇总
+_write_summary_script = register_lua_script("""
+if ARGV[1] == '0' and redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('HGETALL', KEYS[1])
+end
+local summary = {}
+for i = 4, #ARGV, 2 do
+    summary[ARGV[i]] = ARGV[i + 1]
+end
+local today = redis.call('HMGET', KEYS[2], 'updates', 'seconds', 'chapters')
+if tonumber(today[1] or '0') > 0 and summary['last_day'] ~= ARGV[2] then
+    summary['total_seconds'] = tonumber(summary['total_seconds']) + tonumber(today[2] or '0')
+    summary['total_chapters'] = tonumber(summary['total_chapters']) + tonumber(today[3] or '0')
+    summary['days_read'] = tonumber(summary['days_read']) + 1
+    local streak = 1
+    if summary['last_day'] == ARGV[3] then
+        streak = tonumber(summary['streak']) + 1
+    end
+    summary['streak'] = streak
+    if streak > tonumber(summary['longest_streak']) then
+        summary['longest_streak'] = streak
+    end
+    summary['last_day'] = ARGV[2]
+end
+local fields = {}
+for field, value in pairs(summary) do
+    table.insert(fields, field)
+    table.insert(fields, value)
+end
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], unpack(fields))
+return redis.call('HGETALL', KEYS[1])
+""")
+
+
+def _build_upsert_statement():
+    """
+    写入每日统计：Redis 中的每日汇总是当天累计值，取较大值，重复写入无副作用
+    """
+    statement = insert(UserReadingDailyStat)
+    return statement.on_duplicate_key_update(
+        reading_seconds=func.greatest(UserReadingDailyStat.reading_seconds, statement.inserted.reading_seconds),
+        chapters_read=func.greatest(UserReadingDailyStat.chapters_read, statement.inserted.chapters_read),
+        updates=func.greatest(UserReadingDailyStat.updates, statement.inserted.updates),
+        updated_at=statement.inserted.updated_at,
+    )
+
+
+_upsert_daily_statement = _build_upsert_statement()
+
+
+def _day_key(user_id: int, day: date) -> str:
+    return STATS_DAY_KEY.format(user_id=user_id, day=day.strftime("%Y%m%d"))
+
+
+def _recent_days(today: date) -> list[date]:
+    """
+    仍保留在 Redis 中的日期（可能尚未压缩到 MySQL）
+    """
+    return [today - timedelta(days=offset)
+            for offset in range(math.ceil(settings.READING_STATS_DAY_EXPIRE / 86400))]
+
+
+class ReadingStatsService:
+
+    @staticmethod
+    async def record_reading(
+            user_id: int,
+            chapter_id: int,
+            timestamp: float | None = None,
+    ) -> None:
+        """
+        记录一次阅读进度更新，失败只记录日志，不影响阅读请求
+        :param user_id: 用户ID
+        :param chapter_id: 章节ID
+        :param timestamp: 阅读时间戳，默认为当前时间（批量同步时为条目的阅读时间，计入当天的统计）
+        """
+        timestamp = timestamp if timestamp is not None else time()
+        today = datetime.fromtimestamp(timestamp).date()
+        day = today.strftime("%Y%m%d")
+        try:
+            await _record_reading_script(
+                keys=[
+                    STATS_LAST_KEY.format(user_id=user_id),
+                    _day_key(user_id, today),
+                    STATS_CHAPTERS_KEY.format(user_id=user_id, day=day),
+                    STATS_SUMMARY_KEY.format(user_id=user_id),
+                    STATS_DIRTY_KEY,
+                ],
+                args=[timestamp, chapter_id, settings.READING_STATS_MAX_GAP, settings.READING_STATS_DAY_EXPIRE,
+                      f"{user_id}:{day}", day, (today - timedelta(days=1)).strftime("%Y%m%d")],
+            )
+        except Exception as e:
+            logger.warning(f"Record reading stats failed: user {user_id} {e}")
+
+    @staticmethod
+    def build_summary(days: dict[date, dict[str, int]]) -> dict[str, int | str]:
+        """
+        由每日统计计算累计汇总
+        :param days: {日期: {reading_seconds, chapters_read, updates}}
+        :return: 累计汇总 hash 的内容
+        """
+        summary: dict[str, int | str] = {field: 0 for field in SUMMARY_FIELDS}
+        previous = None
+        for day in sorted(day for day, row in days.items() if row["updates"] > 0):
+            row = days[day]
+            summary["total_seconds"] += row["reading_seconds"]
+            summary["total_chapters"] += row["chapters_read"]
+            summary["days_read"] += 1
+            summary["streak"] = summary["streak"] + 1 if previous == day - timedelta(days=1) else 1
+            summary["longest_streak"] = max(summary["longest_streak"], summary["streak"])
+            previous = day
+        summary["last_day"] = previous.strftime("%Y%m%d") if previous else ""
+        return summary
+
+    @staticmethod
+    async def get_recent_days(user_ids: list[int], today: date) -> dict[int, dict[date, dict[str, int]]]:
+        """
+        读取用户近几天在 Redis 中的每日汇总（一次往返）
+        :param user_ids: 用户ID列表
+        :param today: 今天
+        :return: {user_id: {日期: {reading_seconds, chapters_read, updates}}}
+        """
+        days = _recent_days(today)
+        pipe = redis_pool.pipeline(transaction=False)
+        for user_id in user_ids:
+            for day in days:
+                pipe.hgetall(_day_key(user_id, day))
+        values = iter(await pipe.execute())
+        recent = {}
+        for user_id in user_ids:
+            recent[user_id] = {}
+            for day in days:
+                value = next(values)
+                if value:
+                    recent[user_id][day] = {
+                        "reading_seconds": int(value.get(b"seconds", 0)),
+                        "chapters_read": int(value.get(b"chapters", 0)),
+                        "updates": int(value.get(b"updates", 0)),
+                    }
+        return recent
+
+    @staticmethod
+    async def save_summary(
+            user_id: int,
+            days: dict[date, dict[str, int]],
+            today: date,
+            overwrite: bool,
+            client=None,
+    ):
+        """
+        写入累计汇总：由 days 中今天之前的每日统计重算，今天的部分在 Lua 脚本内读取 Redis 每日汇总累加
+        :param user_id: 用户ID
+        :param days: {日期: {reading_seconds, chapters_read, updates}}，今天的条目被忽略
+        :param today: 今天
+        :param overwrite: 是否覆盖已存在的累计汇总
+        :param client: 传入 pipeline 时只加入 pipeline，不执行
+        :return: 写入后的累计汇总 [field, value, ...]（bytes）
+        """
+        summary = ReadingStatsService.build_summary({day: row for day, row in days.items() if day < today})
+        return await _write_summary_script(
+            keys=[STATS_SUMMARY_KEY.format(user_id=user_id), _day_key(user_id, today)],
+            args=[int(overwrite), today.strftime("%Y%m%d"), (today - timedelta(days=1)).strftime("%Y%m%d"),
+                  *(item for pair in summary.items() for item in pair)],
+            client=client,
+        )
+
+    @staticmethod
+    async def load_summary(user_id: int, database: AsyncSession) -> dict[str, str]:
+        """
+        从 MySQL 的每日统计与 Redis 中尚未压缩的每日汇总重算累计汇总，并在不存在时写入 Redis
+        MySQL 只读取今天之前的统计（今天的行可能已被压缩进程写入），今天的部分由 save_summary 在 Redis 中累加
+        :param user_id: 用户ID
+        :param database: 数据库会话
+        :return: 累计汇总
+        """
+        today = date.today()
+        statement = select(UserReadingDailyStat.day,
+                           UserReadingDailyStat.reading_seconds,
+                           UserReadingDailyStat.chapters_read,
+                           UserReadingDailyStat.updates) \
+            .where(UserReadingDailyStat.user_id == user_id, UserReadingDailyStat.day < today)
+        days = {row.day: dict(row._mapping) for row in (await database.exec(statement)).all()}
+        days.update((await ReadingStatsService.get_recent_days([user_id], today))[user_id])
+        values = await ReadingStatsService.save_summary(user_id, days, today, overwrite=False)
+        return {field.decode(): value.decode() for field, value in zip(values[::2], values[1::2])}
+
+    @staticmethod
+    async def get_user_stats(user_id: int, database: AsyncSession) -> dict[str, Any]:
+        """
+        获取用户阅读统计：读取累计汇总与当天汇总（一次往返），累计汇总不存在时重算
+        :param user_id: 用户ID
+        :param database: 数据库会话
+        :return: {total_seconds, total_chapters, days_read, current_streak, longest_streak, last_read_day, today}
+        """
+        today = date.today()
+        pipe = redis_pool.pipeline(transaction=False)
+        pipe.hgetall(STATS_SUMMARY_KEY.format(user_id=user_id))
+        pipe.hgetall(_day_key(user_id, today))
+        summary, today_stats = await pipe.execute()
+        if summary:
+            summary = {field.decode(): value.decode() for field, value in summary.items()}
+        else:
+            summary = await ReadingStatsService.load_summary(user_id, database)
+
+        last_day = datetime.strptime(summary["last_day"], "%Y%m%d").date() if summary["last_day"] else None
+        # 昨天之后没有阅读则连续天数中断
+        streak = int(summary["streak"]) if last_day and last_day >= today - timedelta(days=1) else 0
+        return {
+            "total_seconds": int(summary["total_seconds"]),
+            "total_chapters": int(summary["total_chapters"]),
+            "days_read": int(summary["days_read"]),
+            "current_streak": streak,
+            "longest_streak": int(summary["longest_streak"]),
+            "last_read_day": last_day,
+            "today": {
+                "reading_seconds": int(today_stats.get(b"seconds", 0)),
+                "chapters_read": int(today_stats.get(b"chapters", 0)),
+            },
+        }
+
+    @staticmethod
+    async def get_daily_rows(members: list[bytes | str]) -> list[dict]:
+        """
+        按 "user_id:YYYYMMDD" 读取每日汇总（压缩进程使用）
+        :param members: 待压缩集合中的成员
+        :return: 数据库行，已过期的汇总不返回
+        """
+        keys = []
+        pipe = redis_pool.pipeline(transaction=False)
+        for member in members:
+            user_id, day = (member.decode() if isinstance(member, bytes) else member).split(":")
+            day = datetime.strptime(day, "%Y%m%d").date()
+            keys.append((int(user_id), day))
+            pipe.hgetall(_day_key(int(user_id), day))
+        now = datetime.now()
+        return [
+            {
+                "user_id": user_id,
+                "day": day,
+                "reading_seconds": int(value.get(b"seconds", 0)),
+                "chapters_read": int(value.get(b"chapters", 0)),
+                "updates": int(value.get(b"updates", 0)),
+                "updated_at": now,
+            }
+            for (user_id, day), value in zip(keys, await pipe.execute()) if value
+        ]
+
+    @staticmethod
+    async def upsert_daily_rows(rows: list[dict], database: AsyncSession) -> int:
+        """
+        批量写入每日统计，每 WRITE_BATCH_SIZE 行一条 upsert
+        :param rows: get_daily_rows 返回的行
+        :param database: 数据库会话
+        :return: 执行的 SQL 数
+        """
+        statements = 0
+        for start in range(0, len(rows), WRITE_BATCH_SIZE):
+            await database.exec(_upsert_daily_statement, params=rows[start:start + WRITE_BATCH_SIZE])
+            statements += 1
+        await database.commit()
+        return statements
+
+
+    @staticmethod
+    async def discard_stale_summaries(rows: list[dict]) -> int:
+        """
+        压缩进程写入 MySQL 后调用：离线同步的旧进度写入的日期早于 get_recent_days 的范围，
+        之前重算的累计汇总可能缺少这些日期，删除这些用户的累计汇总，下次读取时重算
+        :param rows: 已写入 MySQL 的行
+        :return: 删除的累计汇总数
+        """
+        oldest = min(_recent_days(date.today()))
+        user_ids = {row["user_id"] for row in rows if row["day"] < oldest}
+        if not user_ids:
+            return 0
+        return await redis_pool.delete(*(STATS_SUMMARY_KEY.format(user_id=user_id) for user_id in user_ids))
+
+
+reading_stats_service = ReadingStatsService()
@@ -0,0 +1,66 @@
+# app/services/recommendation_service.py
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.database import redis_pool
+from app.middleware.logging import logger
+from app.models.sql import BookRecommendation
+from app.services.cache_service import cache, generate_cache_key
+
+# 书架变更后待重新计算的用户/图书，由 scripts/build_recommendations.py 增量消费
+DIRTY_USERS_KEY = "recommendation:dirty_users"
+DIRTY_BOOKS_KEY = "recommendation:dirty_books"
+
+
+class RecommendationService:
+
+    @staticmethod
+    @cache(expire=settings.BOOK_CACHE_EXPIRE, exclude_kwargs=["database"], key_prefix="get_book_recommendations")
+    async def get_book_recommendations(
+            book_id: int,
+            database: AsyncSession
+    ) -> list[dict[str, int | float]]:
+        """
+        获取图书推荐（读过此书的人也读过），读取离线任务的预计算结果
+        :param book_id:  图书ID
+        :param database: 数据库会话
+        :return: [{"book_id": 推荐图书ID, "score": 相似度}]
+        """
+        statement = select(BookRecommendation.recommended_book_id, BookRecommendation.score) \
+            .where(BookRecommendation.book_id == book_id) \
+            .order_by(BookRecommendation.rank)
+        result = await database.exec(statement)
+        return [{"book_id": recommended_book_id, "score": score} for recommended_book_id, score in result.all()]
+
+    @staticmethod
+    async def mark_shelf_changed(
+            user_id: int,
+            book_ids: list[int]
+    ) -> None:
+        """
+        标记书架变更，失败只记录日志（下次全量计算会修正）
+        :param user_id: 用户ID
+        :param book_ids: 添加或删除的图书ID列表
+        """
+        try:
+            pipe = redis_pool.pipeline(transaction=False)
+            pipe.sadd(DIRTY_USERS_KEY, user_id)
+            pipe.sadd(DIRTY_BOOKS_KEY, *book_ids)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Mark shelf changed failed: user {user_id} books {book_ids} {e}")
+
+    @staticmethod
+    async def invalidate_recommendation_cache(book_ids: list[int]) -> None:
+        """
+        删除推荐缓存
+        :param book_ids: 图书ID列表
+        """
+        keys = [generate_cache_key(kwargs={"book_id": book_id}, key_prefix="get_book_recommendations")
+                for book_id in book_ids]
+        for start in range(0, len(keys), 1000):
+            await redis_pool.delete(*keys[start:start + 1000])
+
+
+recommendation_service = RecommendationService()
@@ -1,7 +1,62 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import and_, or_
+from sqlalchemy.dialects.mysql import insert
 from sqlmodel import select, delete
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.models.sql import Shelf
+from app.core.config import settings
+from app.models.sql import Book, BookChapter, Shelf, UserReadingProgress
+from app.services.book_service import book_service
+from app.services.recommendation_service import recommendation_service
+from app.services.snapshot_service import snapshot_service
+from app.services.user_reading_progress import user_reading_progress_service
+
+
+def encode_cursor(last_read_at: datetime, shelf_id: int) -> str:
+    """
+    分页游标：上一页最后一条的 (last_read_at, id)，对客户端不透明
+    """
+    payload = json.dumps([last_read_at.isoformat(), shelf_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    解析分页游标
+    :raises ValueError: 游标无效
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_read_at, shelf_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(last_read_at), int(shelf_id)
+    except Exception:
+        raise ValueError("无效的分页游标")
+
+
+def _paginate(statement, cursor: str | None, limit: int):
+    """
+    按 (last_read_at, id) 倒序的 keyset 分页，走 index_user_last_read(user_id, last_read_at)（InnoDB 二级索引包含主键）
+    多取一条用于判断是否还有下一页
+    """
+    if cursor:
+        last_read_at, shelf_id = decode_cursor(cursor)
+        statement = statement.where(Shelf.last_read_at <= last_read_at,
+                                    or_(Shelf.last_read_at < last_read_at, Shelf.id < shelf_id))
+    return statement.order_by(Shelf.last_read_at.desc(), Shelf.id.desc()).limit(limit + 1)
+
+
+def _next_cursor(rows: list, limit: int) -> str | None:
+    """
+    rows 的前两列为 Shelf.id, Shelf.last_read_at
+    """
+    if len(rows) <= limit:
+        return None
+    shelf_id, last_read_at = rows[limit - 1][0], rows[limit - 1][1]
+    return encode_cursor(last_read_at, shelf_id)
 
 
 class ShelfService:
@@ -9,17 +64,182 @@ class ShelfService:
     @staticmethod
     async def get_shelf(
             user_id: int,
-            database: AsyncSession
-    ):
+            database: AsyncSession,
+            limit: int = settings.SHELF_PAGE_SIZE,
+            cursor: str | None = None,
+    ) -> dict[str, Any]:
         """
-        获取用户书架
+        获取用户书架（按最近阅读倒序，keyset 分页）
         :param user_id: 用户ID
         :param database:      数据库会话
-        :return:     书架列表
+        :param limit:   每页条数
+        :param cursor:  上一页返回的 next_cursor，第一页为 None
+        :return:     {"items": [{book_id, created_at, last_read_at}], "next_cursor": 下一页游标，没有更多时为 None}
+        """
+        async def load():
+            statement = select(Shelf.id, Shelf.last_read_at, Shelf.book_id, Shelf.created_at) \
+                .where(Shelf.user_id == user_id)
+            return (await database.exec(_paginate(statement, cursor, limit))).all()
+
+        rows = await snapshot_service.get_rows(user_id, f"shelf:{limit}:{cursor or ''}", load,
+                                               datetime_columns=(1, 3))
+        return {
+            "items": [{"book_id": book_id, "created_at": created_at, "last_read_at": last_read_at}
+                      for _, last_read_at, book_id, created_at in rows[:limit]],
+            "next_cursor": _next_cursor(rows, limit),
+        }
+
+    @staticmethod
+    async def get_shelf_view(
+            user_id: int,
+            database: AsyncSession,
+            limit: int = settings.SHELF_PAGE_SIZE,
+            cursor: str | None = None,
+    ) -> dict[str, Any]:
+        """
+        书架首页：图书卡片 + 最新阅读进度（含章节标题），按书架的 last_read_at 倒序，keyset 分页
+        一条查询取书架与进度（读取用户快照，写入后失效），一次 MGET 取图书缓存；写缓冲中有更新的进度时合并
+        :param user_id: 用户ID
+        :param database:      数据库会话
+        :param limit:   每页条数
+        :param cursor:  上一页返回的 next_cursor，第一页为 None
+        :return:     {"items": [{book_id, added_at, book, progress}], "next_cursor": ...}
+        """
+        async def load():
+            statement = select(Shelf.id,
+                               Shelf.last_read_at,
+                               Shelf.book_id,
+                               Shelf.created_at,
+                               UserReadingProgress.last_chapter_id,
+                               UserReadingProgress.last_position,
+                               UserReadingProgress.last_read_at,
+                               BookChapter.title) \
+                .select_from(Shelf) \
+                .outerjoin(UserReadingProgress, and_(UserReadingProgress.user_id == Shelf.user_id,
+                                                     UserReadingProgress.book_id == Shelf.book_id)) \
+                .outerjoin(BookChapter, BookChapter.id == UserReadingProgress.last_chapter_id) \
+                .where(Shelf.user_id == user_id)
+            return (await database.exec(_paginate(statement, cursor, limit))).all()
+
+        rows = await snapshot_service.get_rows(user_id, f"view:{limit}:{cursor or ''}", load,
+                                               datetime_columns=(1, 3, 6))
+        next_cursor = _next_cursor(rows, limit)
+        rows = rows[:limit]
+        if not rows:
+            return {"items": [], "next_cursor": None}
+
+        buffered = await user_reading_progress_service.get_buffered_progress(user_id)
+        items = []
+        missing_titles = set()
+        for _, _, book_id, created_at, last_chapter_id, last_position, last_read_at, chapter_title in rows:
+            progress = None
+            if last_chapter_id is not None:
+                progress = {
+                    "last_chapter_id": last_chapter_id,
+                    "last_chapter_title": chapter_title,
+                    "last_position": last_position,
+                    "last_read_at": last_read_at,
+                }
+            newer = buffered.get(book_id)
+            if newer and (progress is None or newer["last_read_at"] >= progress["last_read_at"]):
+                same_chapter = progress is not None and progress["last_chapter_id"] == newer["last_chapter_id"]
+                progress = {
+                    "last_chapter_id": newer["last_chapter_id"],
+                    "last_chapter_title": chapter_title if same_chapter else None,
+                    "last_position": newer["last_position"],
+                    "last_read_at": newer["last_read_at"],
+                }
+                if not same_chapter:
+                    missing_titles.add(newer["last_chapter_id"])
+            items.append({"book_id": book_id, "added_at": created_at, "progress": progress})
+
+        # 只有写缓冲中的进度换了章节时才需要补查标题
+        if missing_titles:
+            statement = select(BookChapter.id, BookChapter.title).where(BookChapter.id.in_(missing_titles))
+            titles = dict((await database.exec(statement)).all())
+            for item in items:
+                progress = item["progress"]
+                if progress and progress["last_chapter_title"] is None:
+                    progress["last_chapter_title"] = titles.get(progress["last_chapter_id"])
+
+        books = {book["id"]: book for book in
+                 await book_service.get_book_by_list([item["book_id"] for item in items], database)}
+        view = []
+        for item in items:
+            book = books.get(item["book_id"])
+            if book is None:
+                continue
+            item["book"] = book
+            view.append(item)
+        return {"items": view, "next_cursor": next_cursor}
+
+    @staticmethod
+    async def add_shelf_books(
+            book_ids: list[int],
+            user_id: int,
+            database: AsyncSession
+    ) -> list[dict[str, Any]]:
+        """
+        批量添加图书到书架，一条 INSERT 写入，已在书架上的图书忽略（幂等）
+        :param book_ids:  图书ID列表
+        :param user_id:    用户ID
+        :param database:      数据库会话
+        :return:          [{book_id, status}]，status 为 added / exists / not_found
         """
-        statement = select(Shelf.book_id, Shelf.created_at).where(Shelf.user_id == user_id)
-        result = await database.exec(statement)
-        return result.all()
+        book_ids = list(dict.fromkeys(book_ids))
+        found = set((await database.exec(select(Book.id).where(Book.id.in_(book_ids)))).all())
+        existing = set((await database.exec(
+            select(Shelf.book_id).where(Shelf.user_id == user_id, Shelf.book_id.in_(found))
+        )).all()) if found else set()
+        added = [book_id for book_id in book_ids if book_id in found and book_id not in existing]
+        if added:
+            now = datetime.now()
+            statement = insert(Shelf).values([
+                {"user_id": user_id, "book_id": book_id, "created_at": now, "last_read_at": now}
+                for book_id in added
+            ])
+            # 并发添加同一本书时命中唯一索引，不更新任何列
+            try:
+                await database.exec(statement.on_duplicate_key_update(id=Shelf.id))
+                await database.commit()
+            except Exception as e:
+                raise ValueError(f"添加失败 {str(e)}")
+            await snapshot_service.invalidate([user_id])
+            await recommendation_service.mark_shelf_changed(user_id=user_id, book_ids=added)
+        added = set(added)
+        return [{"book_id": book_id,
+                 "status": "added" if book_id in added else "exists" if book_id in existing else "not_found"}
+                for book_id in book_ids]
+
+    @staticmethod
+    async def remove_shelf_books(
+            book_ids: list[int],
+            user_id: int,
+            database: AsyncSession
+    ) -> list[dict[str, Any]]:
+        """
+        批量删除书架上的图书，一条 DELETE 删除
+        :param book_ids:  图书ID列表
+        :param user_id:      用户ID
+        :param database:        数据库会话
+        :return:              [{book_id, status}]，status 为 removed / not_on_shelf
+        """
+        book_ids = list(dict.fromkeys(book_ids))
+        try:
+            # 锁定要删除的行，返回结果与实际删除一致
+            removed = set((await database.exec(
+                select(Shelf.book_id).where(Shelf.user_id == user_id, Shelf.book_id.in_(book_ids)).with_for_update()
+            )).all())
+            if removed:
+                await database.exec(delete(Shelf).where(Shelf.user_id == user_id, Shelf.book_id.in_(removed)))
+            await database.commit()
+        except Exception as e:
+            raise ValueError(f"删除失败 {str(e)}")
+        if removed:
+            await snapshot_service.invalidate([user_id])
+            await recommendation_service.mark_shelf_changed(user_id=user_id, book_ids=list(removed))
+        return [{"book_id": book_id, "status": "removed" if book_id in removed else "not_on_shelf"}
+                for book_id in book_ids]
 
     @staticmethod
     async def add_shelf(
@@ -28,19 +248,17 @@ class ShelfService:
             database: AsyncSession
     ):
         """
-        添加图书到书架
+        添加图书到书架，已在书架上时直接返回成功
         :param book_id:  图书ID
         :param user_id:    用户ID
         :param database:      数据库会话
         :return:          添加结果
+        :raises ValueError: 图书不存在
         """
-        try:
-            item = Shelf(book_id=book_id, user_id=user_id)
-            database.add(item)
-            await database.commit()
-            return True
-        except Exception as e:
-            raise Exception("添加失败", e)
+        [outcome] = await ShelfService.add_shelf_books([book_id], user_id, database)
+        if outcome["status"] == "not_found":
+            raise ValueError("图书不存在")
+        return True
 
     @staticmethod
     async def delete_shelf(
@@ -55,17 +273,8 @@ class ShelfService:
         :param database:        数据库会话
         :return:              删除结果
         """
-        try:
-            statement = select(Shelf).where(Shelf.book_id == book_id, Shelf.user_id == user_id)
-
-            result = await database.exec(statement)
-            shelf_item = result.one_or_none()
-            if shelf_item:
-                await database.delete(shelf_item)
-                await database.commit()
-            return True
-        except Exception as e:
-            raise Exception(f"删除失败 {str(e)}")
+        await ShelfService.remove_shelf_books([book_id], user_id, database)
+        return True
 
 
 shelf_service = ShelfService()
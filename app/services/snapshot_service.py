@@ -0,0 +1,126 @@
+# app/services/snapshot_service.py
+import json
+from datetime import datetime
+from typing import Any, Awaitable, Callable
+
+from app.core.config import settings
+from app.core.database import redis_pool, register_lua_script
+from app.middleware.logging import logger
+
+# 每个用户一个 hash：_version 为版本号，其余 field 为书架 / 阅读进度查询结果的快照
+USER_SNAPSHOT_KEY = "snapshot:user:{user_id}"
+VERSION_FIELD = "_version"
+
+# 只有版本号未变（读取数据库期间没有写入）时才写入快照，避免并发写入后缓存旧数据
+# KEYS[1] 快照；ARGV: 读取时的版本号, field, 快照, 过期时间
+_set_snapshot_script = register_lua_script("""
+local version = redis.call('HGET', KEYS[1], '_version') or '0'
+if version ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], '_version', version, ARGV[2], ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+""")
+
+# 写入后调用：版本号加一并清空快照
+# KEYS 为多个用户的快照；ARGV[1] 过期时间
+_invalidate_script = register_lua_script("""
+for _, key in ipairs(KEYS) do
+    local version = redis.call('HINCRBY', key, '_version', 1)
+    redis.call('DEL', key)
+    redis.call('HSET', key, '_version', version)
+    redis.call('EXPIRE', key, ARGV[1])
+end
+return #KEYS
+""")
+
+
+# 失效失败（Redis 不可用）的用户ID，下一次读写快照时先重试，避免快照在过期前一直是旧数据
+_pending_invalidation: set[int] = set()
+
+
+def _snapshot_key(user_id: int) -> str:
+    return USER_SNAPSHOT_KEY.format(user_id=user_id)
+
+
+def _encode_rows(rows: list) -> str:
+    return json.dumps([[value.isoformat() if isinstance(value, datetime) else value for value in row]
+                       for row in rows])
+
+
+def _decode_rows(value: bytes, datetime_columns: tuple[int, ...]) -> list[list[Any]]:
+    rows = json.loads(value)
+    for row in rows:
+        for column in datetime_columns:
+            if row[column] is not None:
+                row[column] = datetime.fromisoformat(row[column])
+    return rows
+
+
+class SnapshotService:
+
+    @staticmethod
+    async def get_rows(
+            user_id: int,
+            name: str,
+            loader: Callable[[], Awaitable[list]],
+            datetime_columns: tuple[int, ...] = (),
+    ) -> list[list[Any]]:
+        """
+        读取用户的查询快照，未命中时调用 loader 查询数据库并写入快照
+        :param user_id: 用户ID
+        :param name: 快照名称（同一用户内唯一，包含分页参数等）
+        :param loader: 查询数据库的函数，返回行列表
+        :param datetime_columns: 值为 datetime 的列下标，读取快照时还原
+        :return: 行列表（每行为 list）
+        """
+        key = _snapshot_key(user_id)
+        try:
+            await SnapshotService._retry_pending()
+            version, cached = await redis_pool.hmget(key, VERSION_FIELD, name)
+        except Exception as e:
+            logger.error(f"Snapshot read failed: {e}")
+            return [list(row) for row in await loader()]
+        if cached is not None:
+            return _decode_rows(cached, datetime_columns)
+
+        rows = [list(row) for row in await loader()]
+        try:
+            await _set_snapshot_script(
+                keys=[key],
+                args=[(version or b"0").decode(), name, _encode_rows(rows), settings.USER_SNAPSHOT_EXPIRE],
+            )
+        except Exception as e:
+            logger.error(f"Snapshot write failed: {e}")
+        return rows
+
+    @staticmethod
+    async def invalidate(user_ids: list[int] | set[int]) -> None:
+        """
+        用户的书架或阅读进度写入数据库后调用（提交之后），使快照失效
+        失败只记录日志（数据库已提交，不影响请求结果），留待下一次读写快照时重试
+        :param user_ids: 用户ID列表
+        """
+        _pending_invalidation.update(user_ids)
+        try:
+            await SnapshotService._retry_pending()
+        except Exception as e:
+            logger.error(f"Snapshot invalidate failed: {len(_pending_invalidation)} users pending, {e}")
+
+    @staticmethod
+    async def _retry_pending() -> None:
+        """
+        使 _pending_invalidation 中的用户快照失效，成功后移出
+        """
+        if not _pending_invalidation:
+            return
+        user_ids = list(_pending_invalidation)
+        await _invalidate_script(
+            keys=[_snapshot_key(user_id) for user_id in user_ids],
+            args=[settings.USER_SNAPSHOT_EXPIRE],
+        )
+        _pending_invalidation.difference_update(user_ids)
+
+
+snapshot_service = SnapshotService()
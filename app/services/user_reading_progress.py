@@ -1,34 +1,92 @@
+import json
+import math
 from datetime import datetime
-from sqlmodel import select
+from time import time
+
+from sqlalchemy import case, func, tuple_, update
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select, delete
 from sqlmodel.ext.asyncio.session import AsyncSession
-from app.models.sql import UserReadingProgress
 
+from app.core.config import settings
+from app.core.database import redis_pool, register_lua_script
+from app.models.sql import Shelf, UserReadingProgress
+from app.services.book_service import book_service
+from app.services.popularity_service import popularity_service
+from app.services.reading_stats_service import reading_stats_service
+from app.services.snapshot_service import snapshot_service
 
-class UserReadingProgressService:
+# 阅读进度写缓冲：每个用户一个 hash，field 为 book_id，值为 JSON {last_chapter_id, last_position, last_read_at(时间戳)}
+PROGRESS_BUFFER_KEY = "progress:buffer:{user_id}"
+# 待写入 MySQL 的 "user_id:book_id"
+PROGRESS_DIRTY_KEY = "progress:dirty"
+# 刷写进程取走的批次，写入成功后删除；进程异常退出时保留，下次优先处理
+PROGRESS_FLUSHING_KEY = "progress:dirty:flushing"
+# 删除进度的时间戳：每个用户一个 hash，field 为 book_id；刷写进程写入后据此删除删除前的进度，
+# 避免已取出的旧进度在删除后被写回
+PROGRESS_DELETED_KEY = "progress:deleted:{user_id}"
+# 违反外键无法写入、被刷写进程跳过的 "user_id:book_id"，留待排查
+PROGRESS_DEAD_KEY = "progress:dead"
+# 计数 {updates: 缓冲的更新数, rows: 写入 MySQL 的行数, statements: 执行的 SQL 数}
+PROGRESS_METRICS_KEY = "progress:metrics"
+
+# 只前进：已缓冲的进度比本次更新更新时忽略本次更新
+# KEYS: 用户缓冲, 待写入集合, 计数；ARGV: book_id, 进度 JSON, last_read_at, 过期时间, "user_id:book_id"
+_buffer_progress_script = register_lua_script("""
+local current = redis.call('HGET', KEYS[1], ARGV[1])
+if current and cjson.decode(current)['last_read_at'] > tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+redis.call('SADD', KEYS[2], ARGV[5])
+redis.call('HINCRBY', KEYS[3], 'updates', 1)
+return 1
+""")
+
+
+def _build_upsert_statement():
+    """
+    写入阅读进度，只在 last_read_at 不早于已有记录时覆盖（MySQL 按顺序赋值，last_read_at 必须最后更新）
+    """
+    statement = insert(UserReadingProgress)
+    newer = statement.inserted.last_read_at >= UserReadingProgress.last_read_at
+    return statement.on_duplicate_key_update([
+        ("last_chapter_id", case((newer, statement.inserted.last_chapter_id),
+                                 else_=UserReadingProgress.last_chapter_id)),
+        ("last_position", case((newer, statement.inserted.last_position),
+                               else_=UserReadingProgress.last_position)),
+        ("last_read_at", func.greatest(UserReadingProgress.last_read_at, statement.inserted.last_read_at)),
+    ])
+
+
+_upsert_progress_statement = _build_upsert_statement()
+
+
+def _buffer_key(user_id: int) -> str:
+    return PROGRESS_BUFFER_KEY.format(user_id=user_id)
 
-    @staticmethod
-    async def get_user_single_book_reading_progress(
-            user_id: int,
-            book_id: int,
-            database: AsyncSession
-    ):
-        """
-        获取用户阅读进度
-        :param user_id: 用户ID
-        :param book_id: 图书ID
-        :param database: 数据库会话
-        :return: 用户阅读进度
-        """
-        statement = select(UserReadingProgress.book_id,
-                           UserReadingProgress.last_chapter_id,
-                           UserReadingProgress.last_read_at,
-                           UserReadingProgress.last_position) \
-            .where(UserReadingProgress.user_id == user_id, UserReadingProgress.book_id == book_id)
 
-        result = await database.exec(statement)
-        reading_progress = result.one_or_none()
+def _deleted_key(user_id: int) -> str:
+    return PROGRESS_DELETED_KEY.format(user_id=user_id)
 
-        return reading_progress if reading_progress else None
+
+def _buffered_row(user_id: int, book_id: int, value: bytes) -> dict:
+    """
+    缓冲的进度转为与数据库一致的行
+    """
+    progress = json.loads(value)
+    return {
+        "user_id": user_id,
+        "book_id": book_id,
+        "last_chapter_id": progress["last_chapter_id"],
+        "last_position": progress["last_position"],
+        "last_read_at": datetime.fromtimestamp(progress["last_read_at"]),
+    }
+
+
+class UserReadingProgressService:
 
     @staticmethod
     async def update_user_single_book_reading_progress(
@@ -41,37 +99,224 @@ class UserReadingProgressService:
 
         """
         更新用户阅读进度
+        开启 PROGRESS_WRITE_BEHIND 时只写入 Redis 写缓冲，由刷写进程合并后批量写入数据库
         :param user_id: 用户ID
         :param book_id: 图书ID
         :param last_chapter_id: 最后阅读章节ID
         :param last_position: 最后阅读位置
         :param database: 数据库会话
         :return: 更新结果
+        :raises ValueError: 章节不存在或不属于该图书
         """
-        statement = select(UserReadingProgress) \
-            .where(UserReadingProgress.user_id == user_id, UserReadingProgress.book_id == book_id)
-
-        result = await database.exec(statement)
-        reading_progress = result.one_or_none()
-        if reading_progress:
-            reading_progress.last_chapter_id = last_chapter_id
-            reading_progress.last_position = last_position
-            reading_progress.last_read_at = datetime.now()
-        else:
-            reading_progress = UserReadingProgress(
+        # 写缓冲不经过外键检查，写入前确认章节属于该图书（章节所属图书有缓存）
+        if await book_service.get_chapter_book_id(chapter_id=last_chapter_id, database=database) != book_id:
+            raise ValueError("章节不存在或不属于该图书")
+        if settings.PROGRESS_WRITE_BEHIND:
+            await UserReadingProgressService.buffer_progress(
                 user_id=user_id,
                 book_id=book_id,
                 last_chapter_id=last_chapter_id,
                 last_position=last_position,
-                last_read_at=datetime.now()
             )
-        # 获取用户书架
+        else:
+            # 单条 upsert：不需要先查询，也不会因并发插入触发唯一索引冲突
+            try:
+                await UserReadingProgressService.upsert_progress_rows([{
+                    "user_id": user_id,
+                    "book_id": book_id,
+                    "last_chapter_id": last_chapter_id,
+                    "last_position": last_position,
+                    "last_read_at": datetime.now(),
+                }], database)
+            except Exception as error:
+                raise ValueError(f"更新用户阅读进度失败: {error}")
+        await popularity_service.record_read(book_id=book_id, user_id=user_id, chapter_id=last_chapter_id)
+        await reading_stats_service.record_reading(user_id=user_id, chapter_id=last_chapter_id)
+        return True
+
+    @staticmethod
+    async def sync_user_reading_progress(
+            user_id: int,
+            entries: list[dict],
+            database: AsyncSession
+    ) -> int:
+        """
+        批量同步多本书的阅读进度（客户端离线后重新上线），一条 SQL 写入，只前进不后退；
+        每个条目按其阅读时间计入热度与阅读统计
+        :param user_id: 用户ID
+        :param entries: [{book_id, last_chapter_id, last_position, last_read_at}]，last_read_at 缺省为当前时间
+        :param database: 数据库会话
+        :return: 写入的图书数
+        :raises ValueError: 有章节不存在或不属于对应图书
+        """
+        chapter_books = await book_service.get_chapter_book_ids(
+            {entry["last_chapter_id"] for entry in entries}, database)
+        invalid = sorted({entry["book_id"] for entry in entries
+                          if chapter_books.get(entry["last_chapter_id"]) != entry["book_id"]})
+        if invalid:
+            raise ValueError(f"章节不存在或不属于该图书: book_id {invalid}")
+
+        now = datetime.now()
+        for entry in entries:
+            last_read_at = entry.get("last_read_at") or now
+            if last_read_at.tzinfo is not None:
+                last_read_at = last_read_at.astimezone().replace(tzinfo=None)
+            # 不接受未来时间，避免之后的正常更新被挡住
+            entry["last_read_at"] = min(last_read_at, now)
+        entries = sorted(entries, key=lambda entry: entry["last_read_at"])
+        rows: dict[int, dict] = {}
+        for entry in entries:
+            rows[entry["book_id"]] = {
+                "user_id": user_id,
+                "book_id": entry["book_id"],
+                "last_chapter_id": entry["last_chapter_id"],
+                "last_position": entry["last_position"],
+                "last_read_at": entry["last_read_at"],
+            }
         try:
-            database.add(reading_progress)
-            await database.commit()
-            return True
+            await UserReadingProgressService.upsert_progress_rows(list(rows.values()), database)
         except Exception as error:
-            raise ValueError(f"更新用户阅读进度失败: {error}")
+            raise ValueError(f"同步用户阅读进度失败: {error}")
+        for entry in entries:
+            await popularity_service.record_read(book_id=entry["book_id"], user_id=user_id,
+                                                 chapter_id=entry["last_chapter_id"])
+            await reading_stats_service.record_reading(user_id=user_id, chapter_id=entry["last_chapter_id"],
+                                                       timestamp=entry["last_read_at"].timestamp())
+        return len(rows)
+
+    @staticmethod
+    async def buffer_progress(
+            user_id: int,
+            book_id: int,
+            last_chapter_id: int,
+            last_position: int,
+            last_read_at: float | None = None,
+    ) -> bool:
+        """
+        写入阅读进度写缓冲（一次往返）
+        :param last_read_at: 阅读时间戳，默认为当前时间
+        :return: 是否写入（早于已缓冲进度的更新被忽略）
+        """
+        last_read_at = last_read_at if last_read_at is not None else time()
+        value = json.dumps({
+            "last_chapter_id": last_chapter_id,
+            "last_position": last_position,
+            "last_read_at": last_read_at,
+        })
+        written = await _buffer_progress_script(
+            keys=[_buffer_key(user_id), PROGRESS_DIRTY_KEY, PROGRESS_METRICS_KEY],
+            args=[book_id, value, last_read_at, settings.PROGRESS_BUFFER_EXPIRE, f"{user_id}:{book_id}"],
+        )
+        return bool(written)
+
+    @staticmethod
+    async def get_buffered_progress(user_id: int) -> dict[int, dict]:
+        """
+        读取用户写缓冲中的全部进度（一次往返）
+        :param user_id: 用户ID
+        :return: {book_id: {book_id, last_chapter_id, last_position, last_read_at}}
+        """
+        progress = {}
+        for book_id, value in (await redis_pool.hgetall(_buffer_key(user_id))).items():
+            row = _buffered_row(user_id, int(book_id), value)
+            del row["user_id"]
+            progress[row["book_id"]] = row
+        return progress
+
+    @staticmethod
+    async def get_buffered_rows(members: list[bytes | str]) -> list[dict]:
+        """
+        按 "user_id:book_id" 读取缓冲中的进度（刷写进程使用）
+        :param members: 待写入集合中的成员
+        :return: 数据库行，已删除或过期的进度不返回
+        """
+        keys = []
+        pipe = redis_pool.pipeline(transaction=False)
+        for member in members:
+            user_id, book_id = (int(part) for part in (member.decode() if isinstance(member, bytes) else member).split(":"))
+            keys.append((user_id, book_id))
+            pipe.hget(_buffer_key(user_id), book_id)
+        values = await pipe.execute()
+        return [_buffered_row(user_id, book_id, value) for (user_id, book_id), value in zip(keys, values) if value]
+
+    @staticmethod
+    async def upsert_progress_rows(rows: list[dict], database: AsyncSession) -> int:
+        """
+        批量写入阅读进度，每 PROGRESS_FLUSH_BATCH 行一条 upsert，只前进不后退；
+        同一事务内再用一条多表 UPDATE 把书架中对应图书的 last_read_at 推进到进度时间（书架按其排序）
+        :param rows: [{user_id, book_id, last_chapter_id, last_position, last_read_at}]
+        :param database: 数据库会话
+        :return: 执行的 SQL 数
+        """
+        statements = await UserReadingProgressService._execute_upserts(rows, database)
+        await database.commit()
+        await snapshot_service.invalidate({row["user_id"] for row in rows})
+        return statements
+
+    @staticmethod
+    async def _execute_upserts(rows: list[dict], database: AsyncSession) -> int:
+        """
+        执行 upsert_progress_rows 的 SQL，不提交
+        """
+        statements = 0
+        for start in range(0, len(rows), settings.PROGRESS_FLUSH_BATCH):
+            batch = rows[start:start + settings.PROGRESS_FLUSH_BATCH]
+            await database.exec(_upsert_progress_statement, params=batch)
+            await database.exec(
+                update(Shelf)
+                .where(tuple_(Shelf.user_id, Shelf.book_id).in_([(row["user_id"], row["book_id"]) for row in batch]),
+                       UserReadingProgress.user_id == Shelf.user_id,
+                       UserReadingProgress.book_id == Shelf.book_id,
+                       UserReadingProgress.last_read_at > Shelf.last_read_at)
+                .values(last_read_at=UserReadingProgress.last_read_at)
+            )
+            statements += 2
+        return statements
+
+    @staticmethod
+    async def _write_buffered_batch(rows: list[dict], database: AsyncSession) -> int:
+        """
+        写入一批缓冲的进度：upsert 之后（持有行锁）再检查删除时间戳，删除时间之前的进度在同一事务内删除。
+        删除请求先写时间戳再删库：时间戳写在检查之前时由本事务删除，写在检查之后时删库等待本事务提交后再删除
+        :return: 执行的 SQL 数
+        """
+        statements = await UserReadingProgressService._execute_upserts(rows, database)
+        pipe = redis_pool.pipeline(transaction=False)
+        for row in rows:
+            pipe.hget(_deleted_key(row["user_id"]), row["book_id"])
+        for row, deleted_at in zip(rows, await pipe.execute()):
+            if deleted_at is not None and float(deleted_at) >= row["last_read_at"].timestamp():
+                await database.exec(delete(UserReadingProgress).where(
+                    UserReadingProgress.user_id == row["user_id"],
+                    UserReadingProgress.book_id == row["book_id"],
+                    UserReadingProgress.last_read_at <= datetime.fromtimestamp(float(deleted_at))))
+                statements += 1
+        await database.commit()
+        await snapshot_service.invalidate({row["user_id"] for row in rows})
+        return statements
+
+    @staticmethod
+    async def write_buffered_rows(rows: list[dict], database: AsyncSession) -> tuple[int, list[dict]]:
+        """
+        写入刷写进程取出的进度（刷写进程使用）：整批违反外键（图书或章节已删除）时逐行重试，
+        跳过无法写入的行，避免一条坏数据使整个批次反复失败
+        :param rows: get_buffered_rows 返回的行
+        :param database: 数据库会话
+        :return: (执行的 SQL 数, 跳过的行)
+        """
+        try:
+            return await UserReadingProgressService._write_buffered_batch(rows, database), []
+        except IntegrityError:
+            await database.rollback()
+        statements = 0
+        dropped = []
+        for row in rows:
+            try:
+                statements += await UserReadingProgressService._write_buffered_batch([row], database)
+            except IntegrityError:
+                await database.rollback()
+                dropped.append(row)
+        return statements, dropped
 
     @staticmethod
     async def delete_user_single_book_reading_progress(
@@ -81,24 +326,30 @@ class UserReadingProgressService:
     ):
         """
         删除用户阅读进度
+        先删除写缓冲并记录删除时间戳，刷写进程已取出的旧进度不会被写回；
+        数据库只删除删除时间之前的进度
         :param user_id: 用户ID
         :param book_id: 图书ID
         :param database: 数据库会话
         :return: 删除结果
         """
         try:
-            statement = select(UserReadingProgress) \
-                .where(UserReadingProgress.user_id == user_id, UserReadingProgress.book_id == book_id)
-
-            result = await database.exec(statement)
-            reading_progress = result.one_or_none()
-            if reading_progress:
-
-                await database.delete(reading_progress)
-                await database.commit()
-                return True
-            else:
-                pass
+            # last_read_at 精确到秒（写入时四舍五入），删除时间向上取整
+            deleted_at = datetime.fromtimestamp(math.ceil(time()))
+            pipe = redis_pool.pipeline(transaction=True)
+            pipe.hdel(_buffer_key(user_id), book_id)
+            pipe.srem(PROGRESS_DIRTY_KEY, f"{user_id}:{book_id}")
+            pipe.hset(_deleted_key(user_id), book_id, deleted_at.timestamp())
+            pipe.expire(_deleted_key(user_id), settings.PROGRESS_BUFFER_EXPIRE)
+            await pipe.execute()
+
+            result = await database.exec(delete(UserReadingProgress).where(
+                UserReadingProgress.user_id == user_id,
+                UserReadingProgress.book_id == book_id,
+                UserReadingProgress.last_read_at <= deleted_at))
+            await database.commit()
+            if result.rowcount:
+                await snapshot_service.invalidate([user_id])
             return True
 
         except Exception as error:
@@ -111,21 +362,33 @@ class UserReadingProgressService:
 
     ):
         """
-        获取用户阅读进度
+        获取用户阅读进度（合并写缓冲中尚未写入数据库的进度，按最近阅读排序）
+        数据库部分读取用户快照，写入数据库后快照失效
         :param user_id: 用户ID
         :param database: 数据库会话
         :return: 用户阅读进度
         """
-        statement = select(UserReadingProgress.book_id,
-                           UserReadingProgress.last_chapter_id,
-                           UserReadingProgress.last_read_at,
-                           UserReadingProgress.last_position) \
-            .where(UserReadingProgress.user_id == user_id)
+        async def load():
+            statement = select(UserReadingProgress.book_id,
+                               UserReadingProgress.last_chapter_id,
+                               UserReadingProgress.last_read_at,
+                               UserReadingProgress.last_position) \
+                .where(UserReadingProgress.user_id == user_id)
+            return (await database.exec(statement)).all()
+
+        rows = await snapshot_service.get_rows(user_id, "progress", load, datetime_columns=(2,))
+        reading_progress = {
+            book_id: {"book_id": book_id, "last_chapter_id": last_chapter_id,
+                      "last_read_at": last_read_at, "last_position": last_position}
+            for book_id, last_chapter_id, last_read_at, last_position in rows
+        }
 
-        result = await database.exec(statement)
-        reading_progress = result.all()
+        for row in (await UserReadingProgressService.get_buffered_progress(user_id)).values():
+            current = reading_progress.get(row["book_id"])
+            if current is None or current["last_read_at"] <= row["last_read_at"]:
+                reading_progress[row["book_id"]] = row
 
-        return reading_progress if reading_progress else None
+        return sorted(reading_progress.values(), key=lambda row: row["last_read_at"], reverse=True) or None
 
 
 user_reading_progress_service = UserReadingProgressService()
@@ -2,7 +2,7 @@ from sqlalchemy.exc import IntegrityError
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash_async, verify_password_async
 from app.models.sql.User import User
 
 
@@ -48,7 +48,7 @@ class UserService:
             raise ValueError("邮箱已被注册")
 
         # 创建新用户
-        hashed_password = get_password_hash(password)
+        hashed_password = await get_password_hash_async(password)
         db_user = User(
             username=username,
             password=hashed_password,
@@ -92,7 +92,7 @@ class UserService:
             raise ValueError("用户名或密码无效")
         if not user.is_active:
             raise ValueError("用户未激活")
-        if verify_password(password, user.password):
+        if await verify_password_async(password, user.password):
             return user
         else:
             raise ValueError("密码无效")
@@ -125,10 +125,10 @@ class UserService:
 
         if not user:
             raise ValueError("账号不存在")
-        if not verify_password(old_password, user.password):
+        if not await verify_password_async(old_password, user.password):
             raise ValueError("旧密码错误")
 
-        user.password = get_password_hash(new_password)
+        user.password = await get_password_hash_async(new_password)
 
         try:
             await db.commit()
@@ -0,0 +1,196 @@
+# app/utils/epub_stream.py
+"""
+流式读取 EPUB：直接解析 zip 内的 OPF / 目录，逐个读取章节文件，
+超大章节按段落边界切分，内存占用只与单个分段大小有关，与整本书大小无关
+"""
+import codecs
+import posixpath
+import re
+import xml.etree.ElementTree as ElementTree
+import zipfile
+from dataclasses import dataclass, field
+from typing import Iterator
+from urllib.parse import unquote
+
+NAMESPACES = {
+    "container": "urn:oasis:names:tc:opendocument:xmlns:container",
+    "opf": "http://www.idpf.org/2007/opf",
+    "dc": "http://purl.org/dc/elements/1.1/",
+    "ncx": "http://www.daisy.org/z3986/2005/ncx/",
+    "xhtml": "http://www.w3.org/1999/xhtml",
+    "epub": "http://www.idpf.org/2007/ops",
+}
+READ_CHUNK_SIZE = 256 * 1024
+# 优先在这些结束标签之后切分
+SPLIT_BOUNDARY = re.compile(r"</(?:p|div|section|h[1-6]|li|tr|table|blockquote|pre)>", re.IGNORECASE)
+
+
+@dataclass
+class EpubPackage:
+    """OPF 中解析出的元数据与目录"""
+    title: str = "未知标题"
+    authors: list[str] = field(default_factory=list)
+    description: str = ""
+    cover_href: str | None = None
+    # 按阅读顺序的 [(目录标题, zip 内路径)]
+    toc: list[tuple[str, str]] = field(default_factory=list)
+    first_document: str | None = None
+
+
+def _text(element) -> str:
+    return "".join(element.itertext()).strip() if element is not None else ""
+
+
+def _resolve(base_dir: str, href: str) -> str:
+    return posixpath.normpath(posixpath.join(base_dir, unquote(href.split("#")[0])))
+
+
+def _parse_ncx(zf: zipfile.ZipFile, path: str) -> list[tuple[str, str]]:
+    root = ElementTree.fromstring(zf.read(path))
+    base_dir = posixpath.dirname(path)
+    entries = []
+    for nav_point in root.iter(f"{{{NAMESPACES['ncx']}}}navPoint"):
+        label = nav_point.find("ncx:navLabel/ncx:text", NAMESPACES)
+        content = nav_point.find("ncx:content", NAMESPACES)
+        if content is not None and content.get("src"):
+            entries.append((_text(label), _resolve(base_dir, content.get("src"))))
+    return entries
+
+
+def _parse_nav(zf: zipfile.ZipFile, path: str) -> list[tuple[str, str]]:
+    root = ElementTree.fromstring(zf.read(path))
+    base_dir = posixpath.dirname(path)
+    for nav in root.iter(f"{{{NAMESPACES['xhtml']}}}nav"):
+        if nav.get(f"{{{NAMESPACES['epub']}}}type") == "toc":
+            return [
+                (_text(link), _resolve(base_dir, link.get("href")))
+                for link in nav.iter(f"{{{NAMESPACES['xhtml']}}}a") if link.get("href")
+            ]
+    return []
+
+
+def read_package(zf: zipfile.ZipFile) -> EpubPackage:
+    """
+    解析 container.xml 与 OPF，得到元数据、封面路径和目录
+    :param zf: EPUB zip
+    :return: 包信息
+    """
+    container = ElementTree.fromstring(zf.read("META-INF/container.xml"))
+    opf_path = container.find(".//container:rootfile", NAMESPACES).get("full-path")
+    opf = ElementTree.fromstring(zf.read(opf_path))
+    base_dir = posixpath.dirname(opf_path)
+
+    package = EpubPackage()
+    metadata = opf.find("opf:metadata", NAMESPACES)
+    title = metadata.find("dc:title", NAMESPACES)
+    if _text(title):
+        package.title = _text(title)
+    package.authors = [_text(creator) for creator in metadata.findall("dc:creator", NAMESPACES) if _text(creator)] \
+        or ["未知作者"]
+    package.description = _text(metadata.find("dc:description", NAMESPACES))
+
+    manifest = {}
+    cover_id = None
+    for meta in metadata.findall("opf:meta", NAMESPACES):
+        if meta.get("name") == "cover":
+            cover_id = meta.get("content")
+    nav_path = None
+    for item in opf.find("opf:manifest", NAMESPACES):
+        href = _resolve(base_dir, item.get("href", ""))
+        manifest[item.get("id")] = href
+        properties = (item.get("properties") or "").split()
+        if "cover-image" in properties:
+            package.cover_href = href
+        if "nav" in properties:
+            nav_path = href
+    if package.cover_href is None and cover_id in manifest:
+        package.cover_href = manifest[cover_id]
+
+    spine = opf.find("opf:spine", NAMESPACES)
+    spine_items = [manifest[ref.get("idref")] for ref in spine if ref.get("idref") in manifest]
+    package.first_document = next((href for href in spine_items if href != nav_path), None)
+    ncx_path = manifest.get(spine.get("toc")) if spine.get("toc") else None
+
+    toc = []
+    if ncx_path and ncx_path in zf.namelist():
+        toc = _parse_ncx(zf, ncx_path)
+    if not toc and nav_path and nav_path in zf.namelist():
+        toc = _parse_nav(zf, nav_path)
+    # 同一文件只取一次
+    seen = set()
+    for title, href in toc:
+        if href not in seen and href in zf.namelist():
+            seen.add(href)
+            package.toc.append((title, href))
+    return package
+
+
+def split_content(content: str, max_bytes: int) -> list[str]:
+    """
+    按段落边界把超长内容切分为不超过 max_bytes（UTF-8）的分段
+    :param content: 章节内容
+    :param max_bytes: 单段上限
+    :return: 分段列表
+    """
+    if len(content.encode("utf-8")) <= max_bytes:
+        return [content]
+    segments = []
+    pieces: list[str] = []
+    size = 0
+    for piece in _split_pieces(content, max_bytes):
+        piece_size = len(piece.encode("utf-8"))
+        if pieces and size + piece_size > max_bytes:
+            segments.append("".join(pieces))
+            pieces, size = [], 0
+        pieces.append(piece)
+        size += piece_size
+    if pieces:
+        segments.append("".join(pieces))
+    return segments
+
+
+def _split_pieces(content: str, max_bytes: int) -> Iterator[str]:
+    """
+    切成以段落结束标签结尾的片段，单个片段超限时按字符硬切
+    """
+    start = 0
+    for match in SPLIT_BOUNDARY.finditer(content):
+        yield from _hard_split(content[start:match.end()], max_bytes)
+        start = match.end()
+    if start < len(content):
+        yield from _hard_split(content[start:], max_bytes)
+
+
+def _hard_split(piece: str, max_bytes: int) -> Iterator[str]:
+    if len(piece.encode("utf-8")) <= max_bytes:
+        yield piece
+        return
+    # UTF-8 单字符最多 4 字节
+    step = max(max_bytes // 4, 1)
+    for start in range(0, len(piece), step):
+        yield piece[start:start + step]
+
+
+def iter_member_segments(zf: zipfile.ZipFile, path: str, max_bytes: int) -> Iterator[str]:
+    """
+    流式读取 zip 内的一个文件并按 max_bytes 切分，内存中最多保留约两个分段
+    :param zf: EPUB zip
+    :param path: zip 内路径
+    :param max_bytes: 单段上限（UTF-8 字节）
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    chunks: list[str] = []
+    size = 0
+    with zf.open(path) as member:
+        while chunk := member.read(READ_CHUNK_SIZE):
+            chunks.append(decoder.decode(chunk))
+            size += len(chunk)
+            if size > max_bytes * 2:
+                segments = split_content("".join(chunks), max_bytes)
+                # 最后一段可能还未到段落结尾，留到下一轮
+                yield from segments[:-1]
+                chunks, size = [segments[-1]], len(segments[-1].encode("utf-8"))
+    chunks.append(decoder.decode(b"", final=True))
+    content = "".join(chunks)
+    if content:
+        yield from split_content(content, max_bytes)
@@ -0,0 +1,35 @@
+# app/utils/static_files.py
+import os
+import re
+
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+# 文件名中带内容哈希（如 cover-small.3f2a9c1b7d4e.webp）的文件内容永不改变
+HASHED_FILE_PATTERN = re.compile(r"\.[0-9a-f]{12}\.[a-z0-9]+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    静态文件服务：带内容哈希的文件返回长期不可变缓存头
+    """
+
+    def __init__(self, *args, default_cache_control: str | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.default_cache_control = default_cache_control
+
+    def file_response(
+            self,
+            full_path: str | os.PathLike[str],
+            stat_result: os.stat_result,
+            scope: Scope,
+            status_code: int = 200,
+    ) -> Response:
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if HASHED_FILE_PATTERN.search(os.fspath(full_path)):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        elif self.default_cache_control:
+            response.headers["Cache-Control"] = self.default_cache_control
+        return response
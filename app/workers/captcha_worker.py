@@ -0,0 +1,72 @@
+"""
+验证码池补充进程
+
+定期检查 captcha:pool 的长度，低于 CAPTCHA_POOL_LOW_WATERMARK 时在进程池中批量渲染验证码，
+补充到 CAPTCHA_POOL_SIZE。API 进程只从池中取出，不再在请求中渲染图片。
+用法（在项目根目录执行）：
+    python -m app.workers.captcha_worker --workers 2
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.core.config import settings
+from app.core.database import redis_pool
+from app.middleware.logging import logger
+from app.services.captcha_service import CAPTCHA_POOL_KEY, CaptchaService
+
+# 检查间隔（秒）
+CHECK_INTERVAL = 0.5
+# 每个进程池任务生成的数量
+RENDER_BATCH = 50
+
+
+async def refill(executor: ProcessPoolExecutor, workers: int) -> int:
+    """
+    补充验证码池到容量上限
+    :return: 本次补充的数量
+    """
+    missing = settings.CAPTCHA_POOL_SIZE - await redis_pool.llen(CAPTCHA_POOL_KEY)
+    if missing <= 0:
+        return 0
+    loop = asyncio.get_running_loop()
+    batches = [min(RENDER_BATCH, missing - start) for start in range(0, missing, RENDER_BATCH)]
+    added = 0
+    # 每批完成后立即写入，池空时尽快恢复供应
+    for start in range(0, len(batches), workers):
+        futures = [loop.run_in_executor(executor, CaptchaService.render_pool_entries, count)
+                   for count in batches[start:start + workers]]
+        for future in asyncio.as_completed(futures):
+            entries = await future
+            await redis_pool.rpush(CAPTCHA_POOL_KEY, *entries)
+            added += len(entries)
+    return added
+
+
+async def main(workers: int):
+    logger.info(f"Captcha worker started: {workers} processes, pool size {settings.CAPTCHA_POOL_SIZE}, "
+                f"low watermark {settings.CAPTCHA_POOL_LOW_WATERMARK}")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            try:
+                size = await redis_pool.llen(CAPTCHA_POOL_KEY)
+                if size < settings.CAPTCHA_POOL_LOW_WATERMARK:
+                    start = time.perf_counter()
+                    added = await refill(executor, workers)
+                    elapsed = time.perf_counter() - start
+                    logger.info(f"Captcha pool refilled: {size} -> {size + added}, "
+                                f"{added / max(elapsed, 1e-9):.0f} captcha/s")
+            except Exception as e:
+                logger.error(f"Captcha pool refill failed: {e}")
+            await asyncio.sleep(CHECK_INTERVAL)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="验证码池补充进程")
+    parser.add_argument("--workers", type=int, default=settings.CAPTCHA_WORKERS, help="渲染进程数")
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.workers))
+    except KeyboardInterrupt:
+        pass
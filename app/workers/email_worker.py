@@ -0,0 +1,180 @@
+"""
+邮件发送进程
+
+消费 email:outbox 中的邮件：复用已登录的 SMTP 连接，按批发送并限制每秒发送数（EMAIL_MAX_PER_SECOND）；
+临时失败按指数退避放入 email:retry，超过 EMAIL_MAX_RETRIES 或永久失败（收件人被拒等）移入 email:dead。
+邮件先原子地移入 email:processing 再发送，进程异常退出后下次启动重新入队（同一发件箱只运行一个实例）。
+定期输出 发送/s 与队列长度。
+用法（在项目根目录执行）：
+    python -m app.workers.email_worker
+本地测试：python -m aiosmtpd -n -l 127.0.0.1:1025，并设置 SMTP_SERVER=127.0.0.1 SMTP_PORT=1025 SMTP_SSL=false
+"""
+import asyncio
+import json
+import random
+import smtplib
+import time
+
+from app.core.config import settings
+from app.core.database import redis_pool, register_lua_script
+from app.middleware.logging import logger
+from app.services.email_outbox_service import (
+    EMAIL_DEAD_KEY, EMAIL_METRICS_KEY, EMAIL_OUTBOX_KEY, EMAIL_PROCESSING_KEY, EMAIL_RETRY_KEY,
+    email_outbox_service,
+)
+from app.services.email_service import email_sender
+
+# 等待新邮件的阻塞超时（秒），同时决定重试邮件的最大额外延迟
+QUEUE_POLL_TIMEOUT = 5
+# 连接空闲超过该时间（秒）主动关闭
+IDLE_CLOSE_AFTER = 60
+# 指标输出间隔（秒）
+METRICS_INTERVAL = 10
+
+# 到期的重试邮件移回发件箱消费端
+_move_due_script = register_lua_script("""
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, message in ipairs(due) do
+    redis.call('ZREM', KEYS[1], message)
+    redis.call('RPUSH', KEYS[2], message)
+end
+return #due
+""")
+
+
+def _is_permanent(error: Exception) -> bool:
+    """
+    永久失败不再重试：收件人被拒、5xx 响应（认证失败除外，通常是配置问题，修复后可重试成功）
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    return (isinstance(error, smtplib.SMTPResponseException)
+            and not isinstance(error, smtplib.SMTPAuthenticationError)
+            and error.smtp_code >= 500)
+
+
+def send_batch(messages: list[dict]) -> list[Exception | None]:
+    """
+    使用复用的连接依次发送（在线程中执行）
+    :return: 每封邮件的异常，成功为 None
+    """
+    interval = 1 / settings.EMAIL_MAX_PER_SECOND
+    results: list[Exception | None] = []
+    for message in messages:
+        start = time.monotonic()
+        try:
+            email_sender.send_with_connection(
+                to_emails=message["to_emails"],
+                subject=message["subject"],
+                body=message["body"],
+                is_html=message["is_html"],
+            )
+            results.append(None)
+        except Exception as e:
+            results.append(e)
+            if not isinstance(e, smtplib.SMTPRecipientsRefused):
+                # 连接状态未知，下一封重新连接
+                email_sender.close()
+        wait = interval - (time.monotonic() - start)
+        if wait > 0:
+            time.sleep(wait)
+    return results
+
+
+async def take_batch() -> list[bytes]:
+    """
+    取出一批邮件（原子地移入处理中队列）
+    """
+    first = await redis_pool.blmove(EMAIL_OUTBOX_KEY, EMAIL_PROCESSING_KEY, QUEUE_POLL_TIMEOUT, "RIGHT", "LEFT")
+    if first is None:
+        return []
+    pipe = redis_pool.pipeline(transaction=False)
+    for _ in range(settings.EMAIL_BATCH_SIZE - 1):
+        pipe.lmove(EMAIL_OUTBOX_KEY, EMAIL_PROCESSING_KEY, "RIGHT", "LEFT")
+    return [first] + [raw for raw in await pipe.execute() if raw is not None]
+
+
+async def process_batch(batch: list[bytes]) -> int:
+    """
+    发送一批邮件并记录结果
+    :return: 发送成功数
+    """
+    messages, invalid = [], []
+    for raw in batch:
+        try:
+            messages.append((raw, json.loads(raw)))
+        except ValueError:
+            invalid.append(raw)
+    results = await asyncio.to_thread(send_batch, [message for _, message in messages])
+
+    sent = retried = dead = 0
+    pipe = redis_pool.pipeline(transaction=True)
+    for raw in invalid:
+        pipe.lrem(EMAIL_PROCESSING_KEY, 1, raw)
+        pipe.lpush(EMAIL_DEAD_KEY, raw)
+        dead += 1
+    for (raw, message), error in zip(messages, results):
+        pipe.lrem(EMAIL_PROCESSING_KEY, 1, raw)
+        if error is None:
+            sent += 1
+            continue
+        message["attempts"] += 1
+        message["error"] = str(error)
+        if _is_permanent(error) or message["attempts"] >= settings.EMAIL_MAX_RETRIES:
+            logger.error(f"Email {message['id']} to {message['to_emails']} dead after "
+                         f"{message['attempts']} attempts: {error}")
+            pipe.lpush(EMAIL_DEAD_KEY, json.dumps(message))
+            dead += 1
+        else:
+            # 指数退避，加入抖动避免同时重试
+            delay = settings.EMAIL_RETRY_BASE_DELAY * 2 ** (message["attempts"] - 1) * random.uniform(0.8, 1.2)
+            pipe.zadd(EMAIL_RETRY_KEY, {json.dumps(message): time.time() + delay})
+            retried += 1
+    pipe.hincrby(EMAIL_METRICS_KEY, "sent", sent)
+    pipe.hincrby(EMAIL_METRICS_KEY, "retried", retried)
+    pipe.hincrby(EMAIL_METRICS_KEY, "dead", dead)
+    await pipe.execute()
+    return sent
+
+
+async def requeue_unfinished() -> int:
+    """
+    把上次退出时处理中的邮件放回发件箱消费端
+    :return: 重新入队数
+    """
+    count = 0
+    while await redis_pool.lmove(EMAIL_PROCESSING_KEY, EMAIL_OUTBOX_KEY, "LEFT", "RIGHT"):
+        count += 1
+    return count
+
+
+async def main():
+    requeued = await requeue_unfinished()
+    logger.info(f"Email worker started: {requeued} unfinished emails requeued")
+    last_send = last_metrics = time.monotonic()
+    sent_since_metrics = 0
+    try:
+        while True:
+            await _move_due_script(keys=[EMAIL_RETRY_KEY, EMAIL_OUTBOX_KEY],
+                                   args=[time.time(), settings.EMAIL_BATCH_SIZE])
+            batch = await take_batch()
+            now = time.monotonic()
+            if batch:
+                sent_since_metrics += await process_batch(batch)
+                last_send = now
+            elif now - last_send > IDLE_CLOSE_AFTER:
+                await asyncio.to_thread(email_sender.close)
+            if now - last_metrics >= METRICS_INTERVAL:
+                metrics = await email_outbox_service.get_metrics()
+                logger.info(f"Email outbox: {sent_since_metrics / (now - last_metrics):.2f} sent/s, "
+                            f"queued {metrics['queued']}, retrying {metrics['retrying']}, dead {metrics['dead']}")
+                last_metrics, sent_since_metrics = now, 0
+    finally:
+        email_sender.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,145 @@
+"""
+图书入库工作进程
+
+消费 ingest:queue 中的上传任务，解析与写库在进程池中执行，与 API 进程分离，不占用请求事件循环。
+任务先原子地移入 ingest:processing 再处理，进程异常退出后，下次启动会把未完成的任务重新入队
+（同一队列只运行一个工作进程实例，通过 --workers 扩展并发）。
+用法（在项目根目录执行）：
+    python -m app.workers.ingest_worker --workers 2
+"""
+import argparse
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from time import time
+
+import redis
+
+from app.core.config import settings
+from app.core.database import get_sync_connection, redis_pool
+from app.epub_parser import BookChange, file_sha256, ingest_epub, invalidate_change
+from app.middleware.logging import logger
+from app.services.ingest_service import INGEST_PROCESSING_KEY, INGEST_QUEUE_KEY, ingest_service, job_key
+
+# 等待新任务的阻塞超时（秒）
+QUEUE_POLL_TIMEOUT = 5
+# 进度写回间隔（秒）
+PROGRESS_INTERVAL = 1.0
+
+# 子进程内复用的连接（首次使用时创建）
+_connection = None
+_redis = None
+
+
+def _run_job(job_id: str, path: str) -> tuple[str, BookChange]:
+    """
+    进程池任务：入库一个文件，并定期把进度写回任务状态
+    :return: (任务状态, 写库结果)
+    """
+    global _connection, _redis
+    if _connection is None:
+        _connection = get_sync_connection()
+    if _redis is None:
+        _redis = redis.Redis.from_url(settings.REDIS_URL)
+
+    content_hash = file_sha256(path)
+    with _connection.cursor() as cursor:
+        cursor.execute("select id, total_chapter from book where content_hash = %s limit 1", (content_hash,))
+        row = cursor.fetchone()
+    if row:
+        return ingest_service.STATUS_SKIPPED, BookChange(book_id=row[0], chapters=row[1])
+
+    last_report = 0.0
+
+    def progress(value: float):
+        nonlocal last_report
+        now = time()
+        if now - last_report >= PROGRESS_INTERVAL:
+            _redis.hset(job_key(job_id), mapping={"progress": round(value * 100, 1), "updated_at": now})
+            last_report = now
+
+    try:
+        change = ingest_epub(_connection, path, content_hash=content_hash, progress=progress)
+    except Exception:
+        # 连接可能已不可用，下次任务重新创建
+        _connection.close()
+        _connection = None
+        raise
+    return ingest_service.STATUS_DONE, change
+
+
+async def handle_job(executor: ProcessPoolExecutor, job_id: str):
+    """
+    处理一个任务：子进程入库，完成后刷新缓存并更新任务状态
+    """
+    job = await ingest_service.get_job(job_id)
+    if job is None:
+        # 任务已过期
+        await redis_pool.lrem(INGEST_PROCESSING_KEY, 1, job_id)
+        return
+    await ingest_service.update_job(job_id, status=ingest_service.STATUS_RUNNING)
+    loop = asyncio.get_running_loop()
+    try:
+        status, change = await loop.run_in_executor(executor, _run_job, job_id, job["path"])
+    except asyncio.CancelledError:
+        # 保留在处理中队列，下次启动重新入队
+        raise
+    except Exception as e:
+        logger.error(f"Ingest job {job_id} failed: {e}")
+        await ingest_service.update_job(job_id, status=ingest_service.STATUS_FAILED, message=str(e))
+    else:
+        await invalidate_change(change)
+        await ingest_service.update_job(job_id, status=status, progress=100, book_id=change.book_id,
+                                        chapters=change.chapters)
+        # 内容已入库，失败的任务保留文件便于排查
+        if os.path.exists(job["path"]):
+            os.remove(job["path"])
+        logger.info(f"Ingest job {job_id} {status}: book {change.book_id}, {change.written} chapters written")
+    await redis_pool.lrem(INGEST_PROCESSING_KEY, 1, job_id)
+
+
+async def requeue_unfinished() -> int:
+    """
+    把上次退出时处理中的任务放回队列消费端
+    :return: 重新入队的任务数
+    """
+    count = 0
+    while await redis_pool.lmove(INGEST_PROCESSING_KEY, INGEST_QUEUE_KEY, "LEFT", "RIGHT"):
+        count += 1
+    return count
+
+
+async def main(workers: int):
+    requeued = await requeue_unfinished()
+    logger.info(f"Ingest worker started: {workers} processes, {requeued} unfinished jobs requeued")
+    semaphore = asyncio.Semaphore(workers)
+    tasks: set[asyncio.Task] = set()
+
+    def on_done(task: asyncio.Task):
+        tasks.discard(task)
+        semaphore.release()
+        if not task.cancelled() and task.exception():
+            logger.error(f"Ingest job handler error: {task.exception()}")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            # 有空闲进程时才取任务，其余任务留在队列中
+            await semaphore.acquire()
+            job_id = await redis_pool.blmove(INGEST_QUEUE_KEY, INGEST_PROCESSING_KEY, QUEUE_POLL_TIMEOUT,
+                                             "RIGHT", "LEFT")
+            if job_id is None:
+                semaphore.release()
+                continue
+            task = asyncio.create_task(handle_job(executor, job_id.decode()))
+            tasks.add(task)
+            task.add_done_callback(on_done)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="图书入库工作进程")
+    parser.add_argument("--workers", type=int, default=settings.INGEST_WORKERS, help="入库进程数")
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.workers))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,101 @@
+"""
+阅读进度刷写进程
+
+每 PROGRESS_FLUSH_INTERVAL 秒把写缓冲中变化过的进度合并写入 MySQL：
+同一用户同一本书在间隔内的多次更新只写入最后一次，每 PROGRESS_FLUSH_BATCH 行一条 upsert。
+交接方式：RENAME progress:dirty -> progress:dirty:flushing，写入并提交后再删除 flushing；
+进程在写入过程中退出时 flushing 保留，下次先重新写入（upsert 只前进，重复写入无副作用）。
+违反外键的进度（图书或章节已删除）逐行跳过，记入 progress:dead，不阻塞后续批次。
+同一时间只运行一个实例。
+用法（在项目根目录执行）：
+    python -m app.workers.progress_flusher
+"""
+import asyncio
+import time
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.database import engine, redis_pool
+from app.middleware.logging import logger
+from app.services.user_reading_progress import (
+    PROGRESS_DEAD_KEY, PROGRESS_DIRTY_KEY, PROGRESS_FLUSHING_KEY, PROGRESS_METRICS_KEY,
+    user_reading_progress_service,
+)
+
+# 每次从 flushing 集合读取的成员数
+SCAN_COUNT = 5000
+
+
+async def take_dirty() -> bool:
+    """
+    取走待写入集合，上次未完成的批次优先
+    :return: 是否有待写入的批次
+    """
+    if await redis_pool.exists(PROGRESS_FLUSHING_KEY):
+        return True
+    if not await redis_pool.exists(PROGRESS_DIRTY_KEY):
+        return False
+    # 只有本进程会移走 dirty，exists 与 rename 之间不会消失
+    await redis_pool.rename(PROGRESS_DIRTY_KEY, PROGRESS_FLUSHING_KEY)
+    return True
+
+
+async def flush_once() -> tuple[int, int]:
+    """
+    写入一个批次
+    :return: (写入行数, 执行的 SQL 数)
+    """
+    if not await take_dirty():
+        return 0, 0
+    members = [member async for member in redis_pool.sscan_iter(PROGRESS_FLUSHING_KEY, count=SCAN_COUNT)]
+    rows = await user_reading_progress_service.get_buffered_rows(members)
+    statements = 0
+    dropped = []
+    if rows:
+        async with AsyncSession(engine) as database:
+            statements, dropped = await user_reading_progress_service.write_buffered_rows(rows, database)
+    pipe = redis_pool.pipeline(transaction=True)
+    pipe.delete(PROGRESS_FLUSHING_KEY)
+    if dropped:
+        logger.warning(f"Progress rows dropped (foreign key): {len(dropped)}")
+        pipe.sadd(PROGRESS_DEAD_KEY, *(f"{row['user_id']}:{row['book_id']}" for row in dropped))
+    pipe.hincrby(PROGRESS_METRICS_KEY, "rows", len(rows) - len(dropped))
+    pipe.hincrby(PROGRESS_METRICS_KEY, "statements", statements)
+    await pipe.execute()
+    return len(rows) - len(dropped), statements
+
+
+async def log_metrics():
+    metrics = await redis_pool.hgetall(PROGRESS_METRICS_KEY)
+    updates, rows, statements = (int(metrics.get(name, 0)) for name in (b"updates", b"rows", b"statements"))
+    logger.info(f"Progress totals: {updates} updates buffered, {rows} rows / {statements} statements written "
+                f"({updates / max(statements, 1):.1f} updates per statement)")
+
+
+async def main():
+    logger.info(f"Progress flusher started: interval {settings.PROGRESS_FLUSH_INTERVAL}s, "
+                f"batch {settings.PROGRESS_FLUSH_BATCH}")
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                rows, statements = await flush_once()
+                if rows:
+                    logger.info(f"Progress flushed: {rows} rows in {statements} statements, "
+                                f"{time.perf_counter() - start:.3f}s")
+                    await log_metrics()
+            except Exception as e:
+                logger.error(f"Progress flush failed: {e}")
+            await asyncio.sleep(settings.PROGRESS_FLUSH_INTERVAL)
+    finally:
+        # 退出前写入剩余的进度
+        await flush_once()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
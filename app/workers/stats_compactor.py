@@ -0,0 +1,79 @@
+"""
+阅读统计压缩进程
+
+每 READING_STATS_COMPACT_INTERVAL 秒把 Redis 中变化过的每日汇总（stats:day:{user_id}:{YYYYMMDD}）
+写入 MySQL 的 user_reading_daily_stat，每 WRITE_BATCH_SIZE 行一条 upsert。
+交接方式与阅读进度刷写进程相同：RENAME stats:dirty -> stats:dirty:compacting，提交后再删除；
+每日汇总是当天累计值，重复写入无副作用。离线同步写入较早日期时，写入后删除对应用户的累计汇总，读取时重算。
+同一时间只运行一个实例。
+用法（在项目根目录执行）：
+    python -m app.workers.stats_compactor
+"""
+import asyncio
+import time
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.database import engine, redis_pool
+from app.middleware.logging import logger
+from app.services.reading_stats_service import STATS_COMPACTING_KEY, STATS_DIRTY_KEY, reading_stats_service
+
+# 每次从 compacting 集合读取的成员数
+SCAN_COUNT = 5000
+
+
+async def take_dirty() -> bool:
+    """
+    取走待压缩集合，上次未完成的批次优先
+    :return: 是否有待压缩的批次
+    """
+    if await redis_pool.exists(STATS_COMPACTING_KEY):
+        return True
+    if not await redis_pool.exists(STATS_DIRTY_KEY):
+        return False
+    await redis_pool.rename(STATS_DIRTY_KEY, STATS_COMPACTING_KEY)
+    return True
+
+
+async def compact_once() -> tuple[int, int]:
+    """
+    压缩一个批次
+    :return: (写入行数, 执行的 SQL 数)
+    """
+    if not await take_dirty():
+        return 0, 0
+    members = [member async for member in redis_pool.sscan_iter(STATS_COMPACTING_KEY, count=SCAN_COUNT)]
+    rows = await reading_stats_service.get_daily_rows(members)
+    statements = 0
+    if rows:
+        async with AsyncSession(engine) as database:
+            statements = await reading_stats_service.upsert_daily_rows(rows, database)
+        await reading_stats_service.discard_stale_summaries(rows)
+    await redis_pool.delete(STATS_COMPACTING_KEY)
+    return len(rows), statements
+
+
+async def main():
+    logger.info(f"Reading stats compactor started: interval {settings.READING_STATS_COMPACT_INTERVAL}s")
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                rows, statements = await compact_once()
+                if rows:
+                    logger.info(f"Reading stats compacted: {rows} rows in {statements} statements, "
+                                f"{time.perf_counter() - start:.3f}s")
+            except Exception as e:
+                logger.error(f"Reading stats compaction failed: {e}")
+            await asyncio.sleep(settings.READING_STATS_COMPACT_INTERVAL)
+    finally:
+        await compact_once()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,80 @@
+# benchmarks/asgi.py
+"""
+进程内 ASGI 调用工具：不经过网络和 uvicorn，直接调用 app，测量单 worker 的处理开销
+"""
+import time
+from typing import Any
+
+
+async def call_asgi(
+        app,
+        method: str,
+        path: str,
+        headers: dict[str, str] | None = None,
+        query_string: str = "",
+        client: tuple[str, int] = ("127.0.0.1", 50000),
+) -> tuple[int, dict[str, str], bytes]:
+    """
+    调用一次 ASGI 应用
+    :return: (状态码, 响应头, 响应体)
+    """
+    scope: dict[str, Any] = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query_string.encode(),
+        "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "client": client,
+        "server": ("127.0.0.1", 8000),
+    }
+    request_sent = False
+    status = 0
+    response_headers: dict[str, str] = {}
+    body = bytearray()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers.update({k.decode(): v.decode() for k, v in message.get("headers", [])})
+        elif message["type"] == "http.response.body":
+            body.extend(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, response_headers, bytes(body)
+
+
+async def measure(app, method: str, path: str, requests: int, warmup: int = 50, **kwargs) -> dict[str, float]:
+    """
+    顺序发送请求，统计单 worker 的吞吐和延迟
+    :return: {"rps": 每秒请求数, "p50_ms": ..., "p99_ms": ...}
+    """
+    for _ in range(warmup):
+        await call_asgi(app, method, path, **kwargs)
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(requests):
+        begin = time.perf_counter()
+        status, _, _ = await call_asgi(app, method, path, **kwargs)
+        latencies.append(time.perf_counter() - begin)
+        if status >= 400:
+            raise RuntimeError(f"{method} {path} 返回 {status}")
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
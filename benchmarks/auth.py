@@ -0,0 +1,66 @@
+# benchmarks/auth.py
+"""
+鉴权开销：每次请求 jwt.decode + json.loads（无缓存） vs 已验证令牌缓存
+
+1. verify_access_token 单次调用耗时
+2. 只挂载一个依赖 get_current_user 的空路由（与书架路由相同：路由器依赖 + 参数依赖），
+   测量单 worker 的请求吞吐，不需要 MySQL / Redis。
+用法（在项目根目录执行）：
+    python -m benchmarks.auth --requests 20000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi import APIRouter, Depends, FastAPI
+
+from app.core.security import create_access_token, get_current_user, token_cache, verify_access_token
+from benchmarks.asgi import measure
+
+
+def build_app() -> FastAPI:
+    router = APIRouter(prefix="/bench", dependencies=[Depends(get_current_user)])
+
+    @router.get("/me")
+    async def me(current_user=Depends(get_current_user)):
+        return {"id": current_user["id"]}
+
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+
+def time_verify(token: str, calls: int) -> float:
+    """
+    :return: 单次调用耗时（微秒）
+    """
+    start = time.perf_counter()
+    for _ in range(calls):
+        verify_access_token(token)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+async def main(requests: int):
+    token = create_access_token(data={"sub": json.dumps(
+        {"id": 1, "email": "benchmark@example.com", "username": "benchmark", "avatar": "", "is_active": True})})
+    headers = {"Authorization": f"Bearer {token}"}
+    app = build_app()
+    maxsize = token_cache.maxsize
+
+    print(f"{'mode':<10}{'verify us':>12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, size in (("no-cache", 0), ("cache", maxsize)):
+        token_cache.maxsize = size
+        token_cache.clear()
+        verify_us = time_verify(token, requests)
+        result = await measure(app, "GET", "/bench/me", requests, headers=headers)
+        print(f"{name:<10}{verify_us:>12.2f}{result['rps']:>10.0f}"
+              f"{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}")
+    token_cache.maxsize = maxsize
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="鉴权开销基准测试")
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
@@ -0,0 +1,94 @@
+# benchmarks/middleware.py
+"""
+中间件栈开销：缓存命中时 /book/{id} 的单 worker 吞吐与延迟
+- none：只挂载 book_router
+- legacy：BaseHTTPMiddleware 限流 + @app.middleware('http') 日志（旧实现，逻辑与现有中间件相同）
+- asgi：纯 ASGI 的 RateLimitMiddleware + LoggingMiddleware
+
+限流使用当前 RATE_LIMIT_MODE，日志级别调到 WARNING 避免输出刷屏（各模式相同）。
+需要 .env 中配置的 MySQL / Redis 可用（首次请求回源填充缓存）。
+用法（在项目根目录执行）：
+    python -m benchmarks.middleware --book-id 1 --requests 5000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import time
+
+from fastapi import FastAPI, Request, status
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse
+
+from app.api import book_router
+from app.core.security import create_access_token
+from app.middleware import LoggingMiddleware, RateLimitMiddleware, RateLimitPolicy, logger
+from app.middleware.rate_limit import get_rate_limit_identity, hybrid_rate_limiter
+from app.models.response_model import ResponseCode
+from benchmarks.asgi import measure
+
+POLICIES = [RateLimitPolicy(prefix="/book", limit=10 ** 9, period=60)]
+
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, policies: list[RateLimitPolicy]):
+        super().__init__(app)
+        self.rate_limit = RateLimitMiddleware(app, policies=policies)
+
+    async def dispatch(self, request: Request, call_next):
+        policy = self.rate_limit.get_policy(request.url.path)
+        key = f"rate_limit:{policy.prefix or '*'}:{get_rate_limit_identity(request, policy)}"
+        allowed, remaining, reset, retry = await self.rate_limit.limiter.hit(key, policy)
+        headers = {
+            "RateLimit-Limit": str(policy.limit),
+            "RateLimit-Remaining": str(remaining),
+            "RateLimit-Reset": str(math.ceil(reset / 1000)),
+            "RateLimit-Policy": f"{policy.limit};w={policy.period}",
+        }
+        if not allowed:
+            return JSONResponse(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                                content={"code": ResponseCode.ERROR, "data": None}, headers=headers)
+        response = await call_next(request)
+        response.headers.update(headers)
+        return response
+
+
+def build_app(mode: str) -> FastAPI:
+    app = FastAPI()
+    app.include_router(book_router)
+    if mode == "legacy":
+        app.add_middleware(LegacyRateLimitMiddleware, policies=POLICIES)
+
+        @app.middleware('http')
+        async def log_middleware(request: Request, call_next):
+            start_time = time.perf_counter()
+            response = await call_next(request)
+            process_time = time.perf_counter() - start_time
+            response.headers["X-Process-Time"] = str(process_time)
+            logger.info(f"{request.client.host} {request.method} {request.url} {response.status_code} "
+                        f"{process_time:.4f}s")
+            return response
+    elif mode == "asgi":
+        app.add_middleware(RateLimitMiddleware, policies=POLICIES)
+        app.add_middleware(LoggingMiddleware)
+    return app
+
+
+async def main(book_id: int, requests: int):
+    logger.setLevel(logging.WARNING)
+    token = create_access_token(data={"sub": json.dumps({"id": 0, "email": "", "username": "benchmark"})})
+    headers = {"Authorization": f"Bearer {token}"}
+    print(f"{'stack':<10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for mode in ("none", "legacy", "asgi"):
+        result = await measure(build_app(mode), "GET", f"/book/{book_id}", requests, headers=headers)
+        await hybrid_rate_limiter.stop()
+        print(f"{mode:<10}{result['rps']:>10.0f}{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="中间件栈基准测试")
+    parser.add_argument("--book-id", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.book_id, args.requests))
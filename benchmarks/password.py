@@ -0,0 +1,95 @@
+# benchmarks/password.py
+"""
+登录负载下的事件循环阻塞：在事件循环中直接计算 bcrypt（旧路径） vs 密码线程池
+
+并发发起登录请求（每个请求做一次密码校验），同时持续发送一个不做 I/O 的轻量请求
+（代表缓存命中的章节读取），统计登录吞吐、被拒绝的登录数和轻量请求的 p50 / p99 延迟。
+只挂载基准路由，不需要 MySQL / Redis。
+用法（在项目根目录执行）：
+    python -m benchmarks.password --logins 64 --concurrency 16
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi import APIRouter, FastAPI
+
+from app.core import security
+from app.core.error_handler import wrap_error_handler_api
+from benchmarks.asgi import call_asgi
+
+PASSWORD = "benchmark-password"
+# 轻量请求的发送间隔（秒）
+READ_INTERVAL = 0.001
+
+
+def build_app(hashed_password: str, inline: bool) -> FastAPI:
+    router = APIRouter(prefix="/bench")
+
+    @router.get("/login")
+    @wrap_error_handler_api()
+    async def login():
+        if inline:
+            return {"ok": security.verify_password(PASSWORD, hashed_password)}
+        return {"ok": await security.verify_password_async(PASSWORD, hashed_password)}
+
+    @router.get("/read")
+    async def read():
+        return {"ok": True}
+
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+
+async def run(app: FastAPI, logins: int, concurrency: int) -> dict[str, float]:
+    queue = iter(range(logins))
+    statuses: list[int] = []
+    done = asyncio.Event()
+
+    async def login_client():
+        for _ in queue:
+            status, _, _ = await call_asgi(app, "GET", "/bench/login")
+            statuses.append(status)
+
+    async def read_client(latencies: list[float]):
+        while not done.is_set():
+            # 延迟从计划发送时刻算起，包含事件循环被阻塞导致的等待
+            begin = time.perf_counter() + READ_INTERVAL
+            await asyncio.sleep(READ_INTERVAL)
+            await call_asgi(app, "GET", "/bench/read")
+            latencies.append(time.perf_counter() - begin)
+
+    latencies: list[float] = []
+    reader = asyncio.create_task(read_client(latencies))
+    start = time.perf_counter()
+    await asyncio.gather(*(login_client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await reader
+    latencies.sort()
+    succeeded = sum(1 for status in statuses if status == 200)
+    return {
+        "logins_per_s": succeeded / elapsed,
+        "rejected": sum(1 for status in statuses if status == 503),
+        "reads": len(latencies),
+        "read_p50_ms": latencies[len(latencies) // 2] * 1000,
+        "read_p99_ms": latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000,
+    }
+
+
+async def main(logins: int, concurrency: int):
+    hashed_password = security.get_password_hash(PASSWORD)
+    print(f"{'mode':<8}{'logins/s':>10}{'rejected':>10}{'reads':>8}{'read p50 ms':>14}{'read p99 ms':>14}")
+    for name, inline in (("inline", True), ("pool", False)):
+        result = await run(build_app(hashed_password, inline), logins, concurrency)
+        print(f"{name:<8}{result['logins_per_s']:>10.1f}{result['rejected']:>10}{result['reads']:>8}"
+              f"{result['read_p50_ms']:>14.3f}{result['read_p99_ms']:>14.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="密码哈希线程池基准测试")
+    parser.add_argument("--logins", type=int, default=64, help="登录请求总数")
+    parser.add_argument("--concurrency", type=int, default=16, help="并发登录数")
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.concurrency))
@@ -0,0 +1,62 @@
+# benchmarks/rate_limit.py
+"""
+限流中间件的单请求开销：不限流 vs redis 模式（每个请求一次 EVALSHA） vs hybrid 模式（进程内令牌桶 + 批量同步）
+
+同一个已登录用户顺序请求一个不做 I/O 的接口，统计吞吐、延迟和每个请求的 Redis 命令数。
+需要 .env 中配置的 Redis 可用（本机 Redis 往返很短，跨机房部署时两种模式的差距更大）。
+用法（在项目根目录执行）：
+    python -m benchmarks.rate_limit --requests 5000
+"""
+import argparse
+import asyncio
+import json
+
+from fastapi import FastAPI
+
+from app.core import redis_pool
+from app.core.security import create_access_token
+from app.middleware import RateLimitMiddleware, RateLimitPolicy
+from app.middleware.rate_limit import hybrid_rate_limiter
+from benchmarks.asgi import measure
+
+
+def build_app(mode: str | None) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/book/{book_id}")
+    async def get_book(book_id: int):
+        return {"id": book_id}
+
+    if mode is not None:
+        app.add_middleware(
+            RateLimitMiddleware,
+            mode=mode,
+            # 容量足够大，测量的是限流检查本身的开销
+            policies=[RateLimitPolicy(prefix="/book", limit=10 ** 9, period=60)],
+        )
+    return app
+
+
+async def commands_processed() -> int:
+    return (await redis_pool.info("stats"))["total_commands_processed"]
+
+
+async def main(requests: int):
+    token = create_access_token(data={"sub": json.dumps({"id": 0, "email": "", "username": "benchmark"})})
+    headers = {"Authorization": f"Bearer {token}"}
+    print(f"{'mode':<10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'redis cmds/req':>16}")
+    for mode in (None, "redis", "hybrid"):
+        before = await commands_processed()
+        result = await measure(build_app(mode), "GET", "/book/1", requests, headers=headers)
+        await hybrid_rate_limiter.stop()
+        # 减去两次 INFO 本身
+        commands = (await commands_processed() - before - 1) / requests
+        print(f"{mode or 'none':<10}{result['rps']:>10.0f}{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}"
+              f"{commands:>16.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="限流中间件基准测试")
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
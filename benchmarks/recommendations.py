@@ -0,0 +1,63 @@
+# benchmarks/recommendations.py
+"""
+推荐离线任务的计算耗时（不含 MySQL 读写）
+
+按 Zipf 分布生成合成书架数据（热门书被更多人收藏），测量：
+- 构建稀疏矩阵
+- 全量计算所有图书的 top-K
+- 增量计算（一小部分用户书架变更）
+用法（在项目根目录执行）：
+    python -m benchmarks.recommendations --rows 1000000 --users 100000 --books 20000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from scripts.build_recommendations import build_matrix, compute_recommendations
+
+
+def generate_shelf(rows: int, users: int, books: int, seed: int = 42) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    pairs = np.empty(0, dtype=np.int64)
+    while len(pairs) < rows:
+        user_ids = rng.integers(1, users + 1, size=rows, dtype=np.int64)
+        # Zipf 分布的图书热度，截断到图书数量范围内
+        book_ids = rng.zipf(1.3, size=rows) % books + 1
+        # 去重（shelf 表 user_id + book_id 唯一）
+        pairs = np.unique(np.concatenate([pairs, user_ids * (books + 1) + book_ids]))
+    pairs = rng.permutation(pairs)[:rows]
+    return (pairs // (books + 1)).astype(np.int32), (pairs % (books + 1)).astype(np.int32)
+
+
+def main(rows: int, users: int, books: int, top_k: int, dirty_ratio: float):
+    user_ids, book_ids = generate_shelf(rows, users, books)
+    print(f"shelf 行数 {len(user_ids)}, 用户 {users}, 图书 {books}")
+
+    start = time.perf_counter()
+    matrix, book_index = build_matrix(user_ids, book_ids)
+    built = time.perf_counter()
+    print(f"构建矩阵: {built - start:.2f}s")
+
+    recommendations = compute_recommendations(matrix, book_index, top_k=top_k)
+    computed = time.perf_counter()
+    print(f"全量计算: {computed - built:.2f}s ({len(recommendations)} 本)")
+
+    rng = np.random.default_rng(7)
+    dirty_users = rng.choice(np.unique(user_ids), size=max(1, int(users * dirty_ratio)), replace=False)
+    targets = np.unique(book_ids[np.isin(user_ids, dirty_users)])
+    start = time.perf_counter()
+    recommendations = compute_recommendations(matrix, book_index, targets, top_k=top_k)
+    print(f"增量计算: {time.perf_counter() - start:.2f}s "
+          f"({len(dirty_users)} 个用户变更, 重算 {len(recommendations)} 本)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="推荐计算基准测试")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--books", type=int, default=20_000)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--dirty-ratio", type=float, default=0.001)
+    args = parser.parse_args()
+    main(args.rows, args.users, args.books, args.top_k, args.dirty_ratio)
@@ -0,0 +1,46 @@
+# benchmarks/response_cache.py
+"""
+缓存命中时图书接口的单 worker 吞吐：JSON 解码 + 模型校验（旧路径） vs 直接返回缓存 bytes（RAW_RESPONSE_CACHE）
+
+只挂载 book_router，不经过限流等中间件，测量的是路由本身的 CPU 开销。
+需要 .env 中配置的 MySQL / Redis 可用（首次请求回源填充缓存）。
+用法（在项目根目录执行）：
+    python -m benchmarks.response_cache --book-id 1 --chapter-id 1 --requests 5000
+"""
+import argparse
+import asyncio
+import json
+
+from fastapi import FastAPI
+
+from app.api import book_router
+from app.core.config import settings
+from app.core.security import create_access_token
+from benchmarks.asgi import measure
+
+
+async def main(book_id: int, chapter_id: int, requests: int):
+    app = FastAPI()
+    app.include_router(book_router)
+    token = create_access_token(data={"sub": json.dumps({"id": 0, "email": "", "username": "benchmark"})})
+    endpoints = [
+        (f"/book/{book_id}", {}),
+        (f"/book/toc/{book_id}", {}),
+        (f"/book/chapter/{chapter_id}", {"Authorization": f"Bearer {token}"}),
+    ]
+    print(f"{'endpoint':<28}{'mode':<10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for path, headers in endpoints:
+        for raw in (False, True):
+            settings.RAW_RESPONSE_CACHE = raw
+            result = await measure(app, "GET", path, requests, headers=headers)
+            print(f"{path:<28}{'raw' if raw else 'model':<10}"
+                  f"{result['rps']:>10.0f}{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="图书接口响应缓存基准测试")
+    parser.add_argument("--book-id", type=int, default=1)
+    parser.add_argument("--chapter-id", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.book_id, args.chapter_id, args.requests))
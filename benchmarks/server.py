@@ -0,0 +1,119 @@
+# benchmarks/server.py
+"""
+服务进程吞吐：原来的启动方式 vs run.py 的生产模式
+
+- current：单进程，asyncio 事件循环 + h11 解析器（原 requirements 中的 uvicorn 没有 uvloop / httptools；
+  热重载只增加文件监视进程，不计入）
+- production：ENV=production python run.py（WEB_CONCURRENCY 个进程，uvloop + httptools）
+
+每种模式启动一个真实的服务进程，用 --connections 个 keep-alive 连接在 --duration 秒内持续请求 --path，
+统计吞吐、延迟和错误数。压测客户端是单个 Python 进程，多核机器上建议客户端与服务端分开部署，或改用 wrk。
+需要 .env 中配置的 MySQL / Redis 可用。
+用法（在项目根目录执行）：
+    python -m benchmarks.server --path /book/1 --connections 64 --duration 15
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HOST = "127.0.0.1"
+PORT = 8765
+
+MODES = {
+    "current": [sys.executable, "-m", "uvicorn", "app.main:app", "--host", HOST, "--port", str(PORT),
+                "--workers", "1", "--loop", "asyncio", "--http", "h11", "--no-access-log"],
+    "production": [sys.executable, "run.py"],
+}
+
+
+async def wait_ready(timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection(HOST, PORT)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"服务未在 {timeout}s 内启动")
+
+
+async def read_response(reader: asyncio.StreamReader) -> int:
+    """
+    读取一个响应（只支持 Content-Length）
+    :return: 状态码
+    """
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.split(b"\r\n")
+    status = int(lines[0].split()[1])
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def client(path: str, deadline: float, latencies: list[float], errors: list[int], headers: str):
+    request = f"GET {path} HTTP/1.1\r\nHost: {HOST}\r\n{headers}\r\n".encode()
+    reader, writer = await asyncio.open_connection(HOST, PORT)
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(request)
+            status = await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def measure(path: str, connections: int, duration: float, headers: str) -> dict[str, float]:
+    latencies: list[float] = []
+    errors: list[int] = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(path, start + duration, latencies, errors, headers)
+                           for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": len(errors),
+    }
+
+
+async def main(path: str, connections: int, duration: float, token: str | None):
+    headers = f"Authorization: Bearer {token}\r\n" if token else ""
+    env = {**os.environ, "ENV": "production", "SERVER_HOST": HOST, "SERVER_PORT": str(PORT)}
+    print(f"{'mode':<12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for mode, command in MODES.items():
+        process = subprocess.Popen(command, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            await wait_ready()
+            # 预热：填充缓存、建立连接池
+            await measure(path, connections, 2, headers)
+            result = await measure(path, connections, duration, headers)
+        finally:
+            process.terminate()
+            process.wait()
+        print(f"{mode:<12}{result['rps']:>10.0f}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+              f"{result['errors']:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="服务进程吞吐基准测试")
+    parser.add_argument("--path", default="/book/1")
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--token", default=None, help="访问令牌，请求需要登录的接口时使用")
+    args = parser.parse_args()
+    asyncio.run(main(args.path, args.connections, args.duration, args.token))
@@ -1,12 +1,67 @@
-import uvicorn
+import importlib.util
 import os
 
-if __name__ == "__main__":
+import uvicorn
+
+from app.core.config import settings
+from app.middleware.logging import logger
+
+# 兼容平台注入的 PORT 环境变量
+PORT = int(os.environ.get("PORT", settings.SERVER_PORT))
+
+
+def worker_count() -> int:
+    """
+    worker 进程数：WEB_CONCURRENCY 未设置时取本进程可用的 CPU 核数（容器内受 cpuset 限制）
+    """
+    if settings.WEB_CONCURRENCY > 0:
+        return settings.WEB_CONCURRENCY
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def run_production():
+    """
+    生产模式：多进程，uvloop 事件循环 + httptools 解析器（uvicorn[standard]），
+    SIGTERM 后停止接受新连接，等待进行中的请求最多 SERVER_GRACEFUL_TIMEOUT 秒
+    """
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    workers = worker_count()
+    logger.info(f"Starting production server: {workers} workers, loop {loop}, http {http}, "
+                f"{settings.SERVER_HOST}:{PORT}")
     uvicorn.run(
         "app.main:app",
-        host="127.0.0.1",
-        port=int(os.environ.get("PORT", 8000)),
+        host=settings.SERVER_HOST,
+        port=PORT,
+        workers=workers,
+        loop=loop,
+        http=http,
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEP_ALIVE,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+        # 部署在反向代理之后，只对 FORWARDED_ALLOW_IPS 按 X-Forwarded-For 改写客户端 IP
+        proxy_headers=True,
+        forwarded_allow_ips=settings.FORWARDED_ALLOW_IPS,
+        access_log=False,
+        server_header=False,
+    )
+
+
+def run_development():
+    uvicorn.run(
+        "app.main:app",
+        host=settings.SERVER_HOST,
+        port=PORT,
         access_log=False,
         reload=True,
         workers=1
-    )
\ No newline at end of file
+    )
+
+
+if __name__ == "__main__":
+    if settings.ENV == "production":
+        run_production()
+    else:
+        run_development()
@@ -0,0 +1,72 @@
+"""
+封面缩略图回填脚本
+
+为已入库的书籍生成固定尺寸、带内容哈希的缩略图，写回 book.cover_variants 并刷新图书缓存。
+用法（在项目根目录执行）：
+    python -m scripts.build_cover_thumbnails --workers 8
+    python -m scripts.build_cover_thumbnails --book-ids 1 2 3 --force
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from app.core.database import get_sync_connection
+from app.services.book_service import book_service
+from app.services.cover_service import build_cover_variants, get_book_dir
+
+
+def _build(book_id: int, cover: str) -> tuple[int, dict[str, str] | None, str | None]:
+    """
+    进程池任务：生成单本书的缩略图
+    """
+    try:
+        return book_id, build_cover_variants(book_id, cover), None
+    except Exception as e:
+        return book_id, None, str(e)
+
+
+def run(book_ids: list[int] | None = None, workers: int | None = None, force: bool = False):
+    connection = get_sync_connection()
+    cursor = connection.cursor()
+    if book_ids:
+        cursor.execute("select id, cover, cover_variants from book where id in %s", (book_ids,))
+    else:
+        cursor.execute("select id, cover, cover_variants from book")
+    books = [
+        (book_id, cover) for book_id, cover, cover_variants in cursor.fetchall()
+        if cover and (force or not cover_variants)
+        and os.path.exists(os.path.join(get_book_dir(book_id), cover))
+    ]
+    print(f"待处理书籍: {len(books)}")
+
+    start = time.perf_counter()
+    updated = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_build, book_id, cover) for book_id, cover in books]
+        for future in as_completed(futures):
+            book_id, variants, error = future.result()
+            if error:
+                print(f"Error processing book {book_id}: {error}")
+                continue
+            updated.append((json.dumps(variants), book_id))
+
+    if updated:
+        cursor.executemany("update book set cover_variants = %s where id = %s", updated)
+        connection.commit()
+        asyncio.run(book_service.invalidate_book_cache([book_id for _, book_id in updated]))
+    connection.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"完成: {len(updated)}/{len(books)} 本, 耗时 {elapsed:.2f}s, {len(updated) / max(elapsed, 1e-9):.1f} 本/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成封面缩略图")
+    parser.add_argument("--book-ids", type=int, nargs="*", help="只处理指定书籍")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认 CPU 核数")
+    parser.add_argument("--force", action="store_true", help="已有缩略图也重新生成")
+    args = parser.parse_args()
+    run(book_ids=args.book_ids, workers=args.workers, force=args.force)
@@ -0,0 +1,220 @@
+"""
+"读过此书的人也读过" 推荐离线计算任务
+
+从 shelf 表加载 用户→图书 关系构建稀疏矩阵 X（用户 × 图书），共现矩阵 C = Xᵀ·X，
+相似度 score = C[a, b] / sqrt(n_a · n_b)（余弦），每本书保留 top-K 写入 book_recommendation。
+
+默认增量模式：只重算书架发生变化的图书（ShelfService 写入 Redis 脏集合）及与其有共同读者的图书；
+--full 全量重算（同时清除脏集合）；--interval 按间隔循环运行。
+用法（在项目根目录执行）：
+    python -m scripts.build_recommendations --full
+    python -m scripts.build_recommendations --interval 300
+"""
+import argparse
+import asyncio
+import time
+from array import array
+from datetime import datetime
+
+import numpy as np
+import pymysql
+from scipy import sparse
+
+from app.core.config import settings
+from app.core.database import get_sync_connection, redis_pool
+from app.services.recommendation_service import DIRTY_BOOKS_KEY, DIRTY_USERS_KEY, recommendation_service
+
+PROCESSING_SUFFIX = ":processing"
+WRITE_BATCH_SIZE = 5000
+
+
+def load_shelf(connection) -> tuple[np.ndarray, np.ndarray]:
+    """
+    流式读取书架表
+    :return: (user_ids, book_ids)
+    """
+    user_ids, book_ids = array('i'), array('i')
+    with connection.cursor(pymysql.cursors.SSCursor) as cursor:
+        cursor.execute("select user_id, book_id from shelf")
+        while rows := cursor.fetchmany(50000):
+            for user_id, book_id in rows:
+                user_ids.append(user_id)
+                book_ids.append(book_id)
+    return np.frombuffer(user_ids, dtype=np.int32), np.frombuffer(book_ids, dtype=np.int32)
+
+
+def build_matrix(user_ids: np.ndarray, book_ids: np.ndarray) -> tuple[sparse.csr_matrix, np.ndarray]:
+    """
+    构建 用户 × 图书 的 0/1 稀疏矩阵
+    :return: (矩阵, 列号对应的图书ID)
+    """
+    users, user_index = np.unique(user_ids, return_inverse=True)
+    books, book_index = np.unique(book_ids, return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(user_index), dtype=np.float32), (user_index, book_index)),
+        shape=(len(users), len(books)),
+    )
+    # 重复行求和后归一为 1
+    matrix.data[:] = 1
+    return matrix, books
+
+
+def compute_recommendations(
+        matrix: sparse.csr_matrix,
+        books: np.ndarray,
+        target_books: np.ndarray | None = None,
+        top_k: int = 20,
+        chunk_size: int = 2048,
+) -> dict[int, list[tuple[int, float]]]:
+    """
+    计算目标图书的 top-K 相似图书
+    :param matrix: 用户 × 图书 矩阵
+    :param books: 列号对应的图书ID（升序）
+    :param target_books: 需要计算的图书ID，None 表示全部
+    :param top_k: 每本书保留数量
+    :param chunk_size: 每批计算的图书数，控制共现矩阵内存
+    :return: {图书ID: [(推荐图书ID, 相似度), ...]}
+    """
+    book_counts = np.asarray(matrix.sum(axis=0), dtype=np.float32).ravel()
+    book_user = matrix.T.tocsr()
+    if target_books is None:
+        targets = np.arange(len(books))
+    else:
+        target_books = target_books[np.isin(target_books, books)]
+        targets = np.unique(np.searchsorted(books, target_books))
+
+    results: dict[int, list[tuple[int, float]]] = {}
+    for start in range(0, len(targets), chunk_size):
+        chunk = targets[start:start + chunk_size]
+        co_occurrence = (book_user[chunk] @ matrix).tocsr()
+        for row, target in enumerate(chunk):
+            begin, end = co_occurrence.indptr[row], co_occurrence.indptr[row + 1]
+            columns = co_occurrence.indices[begin:end]
+            counts = co_occurrence.data[begin:end]
+            mask = columns != target
+            columns, counts = columns[mask], counts[mask]
+            if not len(columns):
+                results[int(books[target])] = []
+                continue
+            scores = counts / np.sqrt(book_counts[target] * book_counts[columns])
+            if len(scores) > top_k:
+                top = np.argpartition(-scores, top_k)[:top_k]
+            else:
+                top = np.arange(len(scores))
+            top = top[np.argsort(-scores[top], kind="stable")]
+            results[int(books[target])] = [(int(books[columns[i]]), float(scores[i])) for i in top]
+    return results
+
+
+def save_recommendations(connection, recommendations: dict[int, list[tuple[int, float]]]):
+    """
+    替换目标图书的推荐结果，分批提交
+    """
+    book_ids = list(recommendations)
+    books_per_batch = max(WRITE_BATCH_SIZE // max(settings.RECOMMENDATION_TOP_K, 1), 1)
+    now = datetime.now()
+    with connection.cursor() as cursor:
+        for start in range(0, len(book_ids), books_per_batch):
+            batch = book_ids[start:start + books_per_batch]
+            cursor.execute("delete from book_recommendation where book_id in %s", (batch,))
+            rows = [
+                (book_id, recommended_book_id, score, rank, now)
+                for book_id in batch
+                for rank, (recommended_book_id, score) in enumerate(recommendations[book_id])
+            ]
+            if rows:
+                cursor.executemany(
+                    "insert into book_recommendation(book_id, recommended_book_id, score, `rank`, updated_at) "
+                    "values (%s, %s, %s, %s, %s)",
+                    rows
+                )
+            connection.commit()
+
+
+async def take_dirty() -> tuple[set[int], set[int]]:
+    """
+    取出脏集合：先改名为 processing 再读取，任务中途失败时下次运行会合并重试
+    """
+    dirty = []
+    for key in (DIRTY_USERS_KEY, DIRTY_BOOKS_KEY):
+        processing = key + PROCESSING_SUFFIX
+        if await redis_pool.exists(key):
+            # 合并上次未处理完的集合；SUNIONSTORE 与 DEL 在同一事务中，中间不会漏掉新写入的成员
+            pipe = redis_pool.pipeline(transaction=True)
+            pipe.sunionstore(processing, [processing, key])
+            pipe.delete(key)
+            await pipe.execute()
+        dirty.append({int(member) for member in await redis_pool.smembers(processing)})
+    return dirty[0], dirty[1]
+
+
+def co_read_books(matrix: sparse.csr_matrix, books: np.ndarray, book_ids: np.ndarray) -> np.ndarray:
+    """
+    与指定图书有共同读者的图书（读者数变化会改变与这些图书的相似度）
+    :return: 图书ID
+    """
+    columns = np.searchsorted(books, book_ids[np.isin(book_ids, books)])
+    readers = np.unique(matrix.T.tocsr()[columns].indices)
+    return books[np.unique(matrix[readers].indices)]
+
+
+async def finish_dirty():
+    await redis_pool.delete(DIRTY_USERS_KEY + PROCESSING_SUFFIX, DIRTY_BOOKS_KEY + PROCESSING_SUFFIX)
+
+
+async def run_once(full: bool = False):
+    start = time.perf_counter()
+    # 全量运行同样取走脏集合，完成后清除，避免下次增量重复计算
+    dirty_users, dirty_books = await take_dirty()
+    if not full and not dirty_users and not dirty_books:
+        print("无书架变更，跳过")
+        return
+
+    connection = get_sync_connection()
+    try:
+        user_ids, book_ids = load_shelf(connection)
+        loaded = time.perf_counter()
+        matrix, books = build_matrix(user_ids, book_ids)
+        if full:
+            targets = None
+        else:
+            # 变更用户书架上的所有图书与其共现关系都发生了变化；
+            # 变更图书的读者数变化，与其有共同读者的图书的相似度也随之变化
+            affected = book_ids[np.isin(user_ids, np.fromiter(dirty_users, dtype=np.int32))]
+            changed = np.fromiter(dirty_books, dtype=np.int32)
+            targets = np.union1d(np.union1d(affected, changed), co_read_books(matrix, books, changed)).astype(np.int32)
+        recommendations = compute_recommendations(matrix, books, targets, top_k=settings.RECOMMENDATION_TOP_K)
+        # 书架上已无人收藏的图书清空推荐
+        if targets is None:
+            with connection.cursor() as cursor:
+                cursor.execute("select distinct book_id from book_recommendation")
+                stale = [book_id for book_id, in cursor.fetchall()]
+        else:
+            stale = targets.tolist()
+        for book_id in stale:
+            recommendations.setdefault(int(book_id), [])
+        computed = time.perf_counter()
+        save_recommendations(connection, recommendations)
+    finally:
+        connection.close()
+
+    await recommendation_service.invalidate_recommendation_cache(list(recommendations))
+    await finish_dirty()
+    elapsed = time.perf_counter() - start
+    print(f"shelf 行数 {len(user_ids)}, 重算图书 {len(recommendations)}, "
+          f"加载 {loaded - start:.2f}s, 计算 {computed - loaded:.2f}s, 总计 {elapsed:.2f}s")
+
+
+async def main(full: bool, interval: int | None):
+    await run_once(full=full)
+    while interval:
+        await asyncio.sleep(interval)
+        await run_once()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="计算图书推荐")
+    parser.add_argument("--full", action="store_true", help="全量重算")
+    parser.add_argument("--interval", type=int, default=None, help="增量任务循环间隔（秒）")
+    args = parser.parse_args()
+    asyncio.run(main(args.full, args.interval))
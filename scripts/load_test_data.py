@@ -0,0 +1,316 @@
+"""
+测试数据批量导入（book.csv 等 CSV 文件、mysqldump 导出的 .sql 文件）
+
+流式读取源文件，按批 executemany（pymysql 合并为多行 INSERT），每 --chunk-rows 行提交一个事务；
+会话内关闭 foreign_key_checks 与 unique_checks，--rebuild-indexes 先删除非唯一二级索引、导入完成后一次性重建。
+每次提交后把已处理的文件字节偏移写入检查点文件，中断后重新执行同一命令会从检查点继续；
+重复导入的行按主键忽略（源数据必须包含主键列），从检查点继续时保持 unique_checks 开启，
+因此提交与写检查点之间中断也不会产生重复数据。
+导入过程中输出 行/s 与按字节速率估算的剩余时间。
+用法（在项目根目录执行）：
+    python -m scripts.load_test_data book.csv
+    python -m scripts.load_test_data chapters.csv --table book_chapter --rebuild-indexes
+    python -m scripts.load_test_data reading_plus_book_2025-09-29_012155.sql
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from app.core.database import get_sync_connection
+
+# executemany 每批行数
+BATCH_ROWS = 5000
+# 每个事务的行数
+CHUNK_ROWS = 50000
+
+CREATE_TABLE = re.compile(r"^CREATE TABLE `([^`]+)`", re.IGNORECASE)
+COLUMN_DEFINITION = re.compile(r"^\s+`([^`]+)`")
+INSERT_VALUES = re.compile(r"^INSERT INTO `([^`]+)` VALUES ", re.IGNORECASE)
+
+
+@dataclass
+class Checkpoint:
+    """导入检查点"""
+    path: str
+    size: int
+    mtime_ns: int
+    offset: int = 0
+    rows: int = 0
+    # --rebuild-indexes 删除的索引 {表名: [ADD INDEX 子句]}，中断后继续时用于重建
+    dropped_indexes: dict[str, list[str]] = field(default_factory=dict)
+    # SQL 文件中已读取的表结构 {表名: [列名]}
+    columns: dict[str, list[str]] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, checkpoint_path: str, source: str) -> "Checkpoint":
+        stat = os.stat(source)
+        fresh = cls(path=os.path.abspath(source), size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        if not os.path.exists(checkpoint_path):
+            return fresh
+        with open(checkpoint_path, encoding="utf-8") as f:
+            saved = cls(**json.load(f))
+        if (saved.path, saved.size, saved.mtime_ns) != (fresh.path, fresh.size, fresh.mtime_ns):
+            raise SystemExit(f"源文件与检查点 {checkpoint_path} 不一致，使用 --restart 重新导入")
+        return saved
+
+    def save(self, checkpoint_path: str):
+        # 先写临时文件再替换，避免中断时检查点损坏
+        temp_path = checkpoint_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.__dict__, f, ensure_ascii=False)
+        os.replace(temp_path, checkpoint_path)
+
+
+@dataclass
+class LoadStats:
+    """导入统计"""
+    total_bytes: int
+    start_offset: int
+    rows: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+
+    def report(self, offset: int) -> str:
+        elapsed = max(time.perf_counter() - self.started_at, 1e-9)
+        byte_rate = (offset - self.start_offset) / elapsed
+        remaining = (self.total_bytes - offset) / byte_rate if byte_rate else 0
+        return (f"已导入 {self.rows} 行，{offset / max(self.total_bytes, 1):.1%}，"
+                f"{self.rows / elapsed:.0f} 行/s，{byte_rate / 1024 / 1024:.2f} MB/s，"
+                f"耗时 {elapsed:.1f}s，预计剩余 {remaining:.0f}s")
+
+
+def _read_lines(f, offset: int, position: list[int]) -> Iterator[str]:
+    """
+    从 offset 开始逐行读取，position[0] 始终为已读取内容的结束偏移
+    """
+    f.seek(offset)
+    position[0] = offset
+    for line in f:
+        position[0] += len(line)
+        yield line.decode("utf-8")
+
+
+def iter_csv(source: str, offset: int, batch_rows: int) -> Iterator[tuple[list[str], list[list[str]], int]]:
+    """
+    流式读取 CSV（首行为列名），每批产出 (列名, 行, 批次结束偏移)
+    """
+    with open(source, "rb") as f:
+        columns = next(csv.reader([f.readline().decode("utf-8-sig")]))
+        position = [0]
+        reader = csv.reader(_read_lines(f, max(offset, f.tell()), position))
+        batch = []
+        for row in reader:
+            batch.append(row)
+            if len(batch) >= batch_rows:
+                yield columns, batch, position[0]
+                batch = []
+        if batch:
+            yield columns, batch, position[0]
+
+
+def iter_sql_dump(source: str, offset: int, columns: dict[str, list[str]]) -> Iterator[tuple[str, str, int]]:
+    """
+    流式读取 mysqldump 文件，只执行数据：每条 INSERT 产出 (表名, VALUES 部分, 语句结束偏移)。
+    CREATE TABLE 中的列名记录到 columns，INSERT 按列名插入，兼容之后迁移新增的列
+    """
+    table = None
+    with open(source, "rb") as f:
+        position = [0]
+        for line in _read_lines(f, offset, position):
+            if match := INSERT_VALUES.match(line):
+                yield match.group(1), line[match.end():].rstrip().rstrip(";"), position[0]
+            elif match := CREATE_TABLE.match(line):
+                table = match.group(1)
+                columns[table] = []
+            elif table and line.startswith(")"):
+                table = None
+            elif table and (match := COLUMN_DEFINITION.match(line)):
+                columns[table].append(match.group(1))
+
+
+def get_secondary_indexes(cursor, table: str) -> list[tuple[str, str]]:
+    """
+    非唯一二级索引（唯一索引保留，从检查点继续时开启 unique_checks 检测重复行）
+    :return: [(索引名, ADD INDEX 子句)]
+    """
+    cursor.execute(f"show index from `{table}`")
+    names = [column[0] for column in cursor.description]
+    indexes: dict[str, dict] = {}
+    for row in cursor.fetchall():
+        row = dict(zip(names, row))
+        if row["Key_name"] == "PRIMARY" or not row["Non_unique"]:
+            continue
+        index = indexes.setdefault(row["Key_name"], {"type": row["Index_type"], "columns": []})
+        column = f"`{row['Column_name']}`" + (f"({row['Sub_part']})" if row["Sub_part"] else "")
+        index["columns"].append((row["Seq_in_index"], column))
+    return [
+        (name, f"add {'fulltext ' if index['type'] == 'FULLTEXT' else ''}index `{name}` "
+               f"({', '.join(column for _, column in sorted(index['columns']))})")
+        for name, index in indexes.items()
+    ]
+
+
+def drop_indexes(connection, table: str, checkpoint: Checkpoint, checkpoint_path: str):
+    if table in checkpoint.dropped_indexes:
+        return
+    with connection.cursor() as cursor:
+        indexes = get_secondary_indexes(cursor, table)
+        # 先记录再删除，中断后继续时也能重建
+        checkpoint.dropped_indexes[table] = [clause for _, clause in indexes]
+        checkpoint.save(checkpoint_path)
+        if indexes:
+            print(f"删除 {table} 的二级索引: {', '.join(name for name, _ in indexes)}")
+            cursor.execute(f"alter table `{table}` " + ", ".join(f"drop index `{name}`" for name, _ in indexes))
+
+
+def rebuild_indexes(connection, checkpoint: Checkpoint, checkpoint_path: str):
+    with connection.cursor() as cursor:
+        for table, clauses in list(checkpoint.dropped_indexes.items()):
+            if clauses:
+                start = time.perf_counter()
+                # 一条 ALTER 重建全部索引，只扫描一次表
+                cursor.execute(f"alter table `{table}` " + ", ".join(clauses))
+                print(f"重建 {table} 索引 {len(clauses)} 个，耗时 {time.perf_counter() - start:.1f}s")
+            del checkpoint.dropped_indexes[table]
+            checkpoint.save(checkpoint_path)
+
+
+def get_primary_key(cursor, table: str) -> list[str]:
+    """
+    主键列名（按索引顺序）
+    """
+    cursor.execute(f"show index from `{table}` where Key_name = 'PRIMARY'")
+    names = [column[0] for column in cursor.description]
+    rows = sorted((dict(zip(names, row)) for row in cursor.fetchall()), key=lambda row: row["Seq_in_index"])
+    return [row["Column_name"] for row in rows]
+
+
+def _insert_prefix(table: str, columns: list[str]) -> str:
+    column_list = ", ".join(f"`{column}`" for column in columns)
+    return f"insert into `{table}` ({column_list}) values "
+
+
+def _ignore_duplicates(cursor, table: str, columns: list[str], primary_keys: dict[str, list[str]]) -> str:
+    """
+    按主键忽略已导入的行（只忽略重复键，其他错误照常报出）。
+    源数据不含主键列时重复导入会生成新的自增主键，无法去重，直接退出
+    :param primary_keys: 已查询的主键 {表名: [列名]}
+    """
+    if table not in primary_keys:
+        primary_keys[table] = get_primary_key(cursor, table)
+    primary_key = primary_keys[table]
+    missing = [column for column in primary_key if column not in columns]
+    if not primary_key or missing:
+        raise SystemExit(f"{table} 的源数据缺少主键列 {', '.join(missing) or '(表没有主键)'}，"
+                         f"中断后继续会重复导入，请在源数据中包含主键")
+    return f" on duplicate key update `{primary_key[0]}` = `{primary_key[0]}`"
+
+
+def load(
+        source: str,
+        table: str | None = None,
+        batch_rows: int = BATCH_ROWS,
+        chunk_rows: int = CHUNK_ROWS,
+        rebuild: bool = False,
+        restart: bool = False,
+        checkpoint_path: str | None = None,
+) -> LoadStats:
+    """
+    导入一个 CSV 或 SQL 文件
+    :param source: 源文件
+    :param table: 目标表（CSV），默认取文件名
+    :param batch_rows: executemany 每批行数
+    :param chunk_rows: 每个事务的行数
+    :param rebuild: 导入前删除非唯一二级索引，完成后重建
+    :param restart: 忽略已有检查点，从头导入
+    :param checkpoint_path: 检查点文件，默认 {source}.checkpoint.json
+    :return: 统计信息
+    """
+    checkpoint_path = checkpoint_path or source + ".checkpoint.json"
+    if restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    checkpoint = Checkpoint.load(checkpoint_path, source)
+    if checkpoint.offset:
+        print(f"从检查点继续：偏移 {checkpoint.offset}，已导入 {checkpoint.rows} 行")
+    stats = LoadStats(total_bytes=checkpoint.size, start_offset=checkpoint.offset)
+    is_sql = source.lower().endswith(".sql")
+    table = table or os.path.splitext(os.path.basename(source))[0]
+
+    connection = get_sync_connection()
+    try:
+        with connection.cursor() as cursor:
+            # 会话级设置：源数据自身一致，跳过外键检查；
+            # 关闭 unique_checks 时 InnoDB 可能不检查二级唯一索引的重复，只在从头导入时关闭，
+            # 从检查点继续时上次提交后的行可能已写入，需要唯一索引检测重复
+            cursor.execute("set unique_checks = %s, foreign_key_checks = 0", (1 if checkpoint.offset else 0,))
+        if rebuild and not is_sql:
+            drop_indexes(connection, table, checkpoint, checkpoint_path)
+
+        pending_rows = 0
+        primary_keys: dict[str, list[str]] = {}
+
+        def commit(offset: int):
+            nonlocal pending_rows
+            connection.commit()
+            checkpoint.offset = offset
+            checkpoint.rows += pending_rows
+            checkpoint.save(checkpoint_path)
+            pending_rows = 0
+            print(stats.report(offset))
+
+        offset = checkpoint.offset
+        with connection.cursor() as cursor:
+            if is_sql:
+                for name, values, offset in iter_sql_dump(source, checkpoint.offset, checkpoint.columns):
+                    if rebuild:
+                        drop_indexes(connection, name, checkpoint, checkpoint_path)
+                    columns = checkpoint.columns[name]
+                    # mysqldump 的扩展 INSERT 已经是多行语句，直接执行
+                    cursor.execute(_insert_prefix(name, columns) + values
+                                   + _ignore_duplicates(cursor, name, columns, primary_keys))
+                    # 行数按分隔符估算，仅用于统计
+                    rows = values.count("),(") + 1
+                    stats.rows += rows
+                    pending_rows += rows
+                    if pending_rows >= chunk_rows:
+                        commit(offset)
+            else:
+                for columns, batch, offset in iter_csv(source, checkpoint.offset, batch_rows):
+                    placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+                    cursor.executemany(_insert_prefix(table, columns) + placeholders
+                                       + _ignore_duplicates(cursor, table, columns, primary_keys), batch)
+                    stats.rows += len(batch)
+                    pending_rows += len(batch)
+                    if pending_rows >= chunk_rows:
+                        commit(offset)
+        if pending_rows or offset != checkpoint.offset:
+            commit(offset)
+
+        rebuild_indexes(connection, checkpoint, checkpoint_path)
+    except BaseException:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+    os.remove(checkpoint_path)
+    print(f"完成：{stats.report(checkpoint.size)}")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量导入测试数据")
+    parser.add_argument("source", help="CSV（首行为列名）或 mysqldump 导出的 .sql 文件")
+    parser.add_argument("--table", default=None, help="目标表（CSV），默认取文件名")
+    parser.add_argument("--batch-rows", type=int, default=BATCH_ROWS, help="每批插入行数")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="每个事务的行数")
+    parser.add_argument("--rebuild-indexes", action="store_true", help="导入前删除非唯一二级索引，完成后重建")
+    parser.add_argument("--restart", action="store_true", help="忽略检查点，从头导入")
+    parser.add_argument("--checkpoint", default=None, help="检查点文件，默认 {source}.checkpoint.json")
+    args = parser.parse_args()
+    load(args.source, table=args.table, batch_rows=args.batch_rows, chunk_rows=args.chunk_rows,
+         rebuild=args.rebuild_indexes, restart=args.restart, checkpoint_path=args.checkpoint)
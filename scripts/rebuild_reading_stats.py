@@ -0,0 +1,88 @@
+"""
+阅读统计累计汇总重算任务
+
+先把 Redis 中待压缩的每日汇总写入 MySQL，再从 user_reading_daily_stat 全量（或指定用户）重算
+累计汇总（总阅读时长、章节数、阅读天数、连续天数）并覆盖 Redis 中的 stats:summary:{user_id}。
+近几天的每日汇总以 Redis 中的值为准；今天的部分在写入累计汇总的 Lua 脚本中读取，
+与进行中的阅读进度更新互不覆盖。修改统计口径或 Redis 数据丢失后运行。
+用法（在项目根目录执行）：
+    python -m scripts.rebuild_reading_stats
+    python -m scripts.rebuild_reading_stats --user 1
+"""
+import argparse
+import asyncio
+import time
+from datetime import date
+from itertools import groupby
+
+import pymysql
+
+from app.core.database import get_sync_connection, redis_pool
+from app.services.reading_stats_service import reading_stats_service
+from app.workers.stats_compactor import compact_once
+
+# 每批重算的用户数
+USER_BATCH_SIZE = 1000
+
+
+def load_daily_stats(connection, user_id: int | None = None):
+    """
+    按 (user_id, day) 顺序流式读取每日统计
+    :return: 迭代 (user_id, day, reading_seconds, chapters_read, updates)
+    """
+    sql = "select user_id, day, reading_seconds, chapters_read, updates from user_reading_daily_stat"
+    params = ()
+    if user_id is not None:
+        sql += " where user_id = %s"
+        params = (user_id,)
+    with connection.cursor(pymysql.cursors.SSCursor) as cursor:
+        cursor.execute(sql + " order by user_id, day", params)
+        while rows := cursor.fetchmany(50000):
+            yield from rows
+
+
+async def save_summaries(users: dict[int, dict[date, dict[str, int]]]) -> None:
+    """
+    合并 Redis 中近几天的每日汇总后重算并覆盖累计汇总（每个用户一次 Lua 脚本，一次往返）
+    :param users: {user_id: {日期: {reading_seconds, chapters_read, updates}}}
+    """
+    today = date.today()
+    recent = await reading_stats_service.get_recent_days(list(users), today)
+    pipe = redis_pool.pipeline(transaction=False)
+    for user_id, days in users.items():
+        days.update(recent[user_id])
+        await reading_stats_service.save_summary(user_id, days, today, overwrite=True, client=pipe)
+    await pipe.execute()
+
+
+async def main(user_id: int | None):
+    start = time.perf_counter()
+    rows, _ = await compact_once()
+    print(f"压缩待写入的每日汇总 {rows} 行")
+
+    connection = get_sync_connection()
+    users_total = 0
+    try:
+        batch = {}
+        for current_user, rows in groupby(load_daily_stats(connection, user_id), key=lambda row: row[0]):
+            batch[current_user] = {
+                day: {"reading_seconds": seconds, "chapters_read": chapters, "updates": updates}
+                for _, day, seconds, chapters, updates in rows
+            }
+            if len(batch) >= USER_BATCH_SIZE:
+                await save_summaries(batch)
+                users_total += len(batch)
+                batch = {}
+        if batch:
+            await save_summaries(batch)
+            users_total += len(batch)
+    finally:
+        connection.close()
+    print(f"重算用户 {users_total}, 总计 {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="重算阅读统计累计汇总")
+    parser.add_argument("--user", type=int, default=None, help="只重算指定用户")
+    args = parser.parse_args()
+    asyncio.run(main(args.user))
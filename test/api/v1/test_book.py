@@ -1,4 +1,9 @@
+import io
+import time
+import uuid
+
 import requests
+from ebooklib import epub
 
 from test.config import BASE_URL, headers
 
@@ -32,3 +37,89 @@ def test_get_book_total():
     response = requests.get(f"{BASE_URL}/book/total", headers=headers)
     assert response.status_code == 200
 
+
+def test_get_book_covers():
+    """测试图书信息包含各尺寸封面"""
+    response = requests.get(f"{BASE_URL}/book/1", headers=headers)
+    assert response.status_code == 200
+    covers = response.json()["data"]["covers"]
+    assert "original" in covers
+
+def test_get_popular_books():
+    """测试获取热门图书排行"""
+    for period in ["day", "week", "all", "trending"]:
+        response = requests.get(f"{BASE_URL}/book/popular", params={"period": period, "limit": 10}, headers=headers)
+        assert response.status_code == 200
+
+def test_get_book_recommendations():
+    """测试获取图书推荐"""
+    book_id = 1
+    response = requests.get(f"{BASE_URL}/book/recommend/{book_id}", headers=headers)
+    assert response.status_code == 200
+
+def test_upload_book():
+    """测试上传 EPUB 并查询入库任务"""
+    response = requests.post(f"{BASE_URL}/book/upload", headers=headers,
+                             files={"file": ("test.epub", b"not an epub")})
+    assert response.status_code == 400
+    response = requests.get(f"{BASE_URL}/book/upload/{'0' * 32}", headers=headers)
+    assert response.status_code == 404
+
+
+def test_rate_limit_headers():
+    """测试限流响应头（阅读接口按用户限流）"""
+    response = requests.get(f"{BASE_URL}/book/1", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["RateLimit-Limit"] == "300"
+    assert int(response.headers["RateLimit-Remaining"]) < 300
+
+
+def _build_epub(title: str, chapters: int) -> bytes:
+    book = epub.EpubBook()
+    book.set_identifier(title)
+    book.set_title(title)
+    book.add_author("test")
+    items = []
+    for index in range(chapters):
+        item = epub.EpubHtml(title=f"第{index + 1}章", file_name=f"chapter{index + 1}.xhtml")
+        item.content = f"<html><body><p>第{index + 1}章内容</p></body></html>"
+        book.add_item(item)
+        items.append(item)
+    book.toc = items
+    book.spine = items
+    book.add_item(epub.EpubNcx())
+    book.add_item(epub.EpubNav())
+    buffer = io.BytesIO()
+    epub.write_epub(buffer, book)
+    return buffer.getvalue()
+
+
+def _ingest(title: str, chapters: int) -> dict:
+    response = requests.post(f"{BASE_URL}/book/upload", headers=headers,
+                             files={"file": ("test.epub", _build_epub(title, chapters))})
+    assert response.status_code == 200
+    job_id = response.json()["data"]["id"]
+    for _ in range(60):
+        job = requests.get(f"{BASE_URL}/book/upload/{job_id}", headers=headers).json()["data"]
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(1)
+    raise AssertionError("入库任务超时")
+
+
+def test_reingest_removes_chapter_with_reading_progress():
+    """测试重新入库删除了有阅读进度的章节：进度改到保留的章节，入库不失败"""
+    title = f"test-{uuid.uuid4().hex}"
+    job = _ingest(title, 3)
+    assert job["status"] == "done"
+    book_id = job["book_id"]
+    toc = requests.get(f"{BASE_URL}/book/toc/{book_id}", headers=headers).json()["data"]
+    entries = [{"book_id": book_id, "last_chapter_id": toc[-1][0], "last_position": 50}]
+    response = requests.patch(f"{BASE_URL}/user_reading_progress/sync", headers=headers, json={"entries": entries})
+    assert response.status_code == 200
+
+    job = _ingest(title, 1)
+    assert job["status"] == "done"
+    progress = {row["book_id"]: row for row in
+                requests.get(f"{BASE_URL}/user_reading_progress/get", headers=headers).json()["data"]}
+    assert progress[book_id]["last_chapter_id"] == toc[0][0]
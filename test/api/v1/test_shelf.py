@@ -9,6 +9,34 @@ def test_get_user_shelf():
     assert response.status_code == 200
 
 
+def test_get_user_shelf_pages():
+    """测试书架分页：翻页不重复"""
+    response = requests.get(f"{BASE_URL}/shelf/get", headers=headers, params={"limit": 1})
+    assert response.status_code == 200
+    page = response.json()["data"]
+    assert len(page["items"]) <= 1
+    if page["next_cursor"]:
+        response = requests.get(f"{BASE_URL}/shelf/get", headers=headers,
+                                params={"limit": 1, "cursor": page["next_cursor"]})
+        assert response.status_code == 200
+        assert response.json()["data"]["items"][0]["book_id"] != page["items"][0]["book_id"]
+
+
+def test_get_user_shelf_invalid_cursor():
+    """测试无效的分页游标"""
+    response = requests.get(f"{BASE_URL}/shelf/get", headers=headers, params={"cursor": "invalid"})
+    assert response.status_code == 400
+
+
+def test_get_shelf_view():
+    """测试书架首页视图（图书卡片 + 阅读进度）"""
+    response = requests.get(f"{BASE_URL}/shelf/view", headers=headers)
+    assert response.status_code == 200
+    for item in response.json()["data"]["items"]:
+        assert item["book"]["id"] == item["book_id"]
+        assert "progress" in item
+
+
 def test_add_book_to_shelf():
     """测试添加书籍到书架"""
     data = {"book_id": 1}
@@ -22,3 +50,26 @@ def test_delete_book_from_shelf():
     assert response.status_code == 200
 
 
+
+
+def test_shelf_snapshot_after_write():
+    """测试书架快照：添加、删除后立即读到最新书架"""
+    requests.get(f"{BASE_URL}/shelf/get", headers=headers, params={"limit": 100})
+    requests.post(f"{BASE_URL}/shelf/add", headers=headers, json={"book_id": 2})
+    response = requests.get(f"{BASE_URL}/shelf/get", headers=headers, params={"limit": 100})
+    assert 2 in [item["book_id"] for item in response.json()["data"]["items"]]
+    requests.delete(f"{BASE_URL}/shelf/delete/2", headers=headers)
+    response = requests.get(f"{BASE_URL}/shelf/get", headers=headers, params={"limit": 100})
+    assert 2 not in [item["book_id"] for item in response.json()["data"]["items"]]
+
+
+def test_batch_add_and_remove_shelf():
+    """测试批量添加、删除书架图书（重复添加幂等）"""
+    response = requests.post(f"{BASE_URL}/shelf/add/batch", headers=headers, json={"book_ids": [1, 2, 2, 0]})
+    assert response.status_code == 200
+    statuses = {item["book_id"]: item["status"] for item in response.json()["data"]["items"]}
+    assert statuses[1] in ("added", "exists") and statuses[0] == "not_found"
+    response = requests.post(f"{BASE_URL}/shelf/add/batch", headers=headers, json={"book_ids": [1, 2]})
+    assert [item["status"] for item in response.json()["data"]["items"]] == ["exists", "exists"]
+    response = requests.post(f"{BASE_URL}/shelf/delete/batch", headers=headers, json={"book_ids": [2, 0]})
+    assert [item["status"] for item in response.json()["data"]["items"]] == ["removed", "not_on_shelf"]
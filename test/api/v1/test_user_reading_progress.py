@@ -12,6 +12,16 @@ def test_add_user_reading_progress():
     response = requests.patch(f"{BASE_URL}/user_reading_progress/add", headers=headers, json=data)
     assert response.status_code == 200
 
+def test_add_user_reading_progress_unknown_chapter():
+    """测试章节不存在时拒绝写入（写缓冲不经过外键检查）"""
+    data = {
+        "book_id": 1,
+        "last_chapter_id": 10 ** 9,
+        "last_position": 1
+    }
+    response = requests.patch(f"{BASE_URL}/user_reading_progress/add", headers=headers, json=data)
+    assert response.status_code == 400
+
 def test_delete_user_reading_progress():
     """测试删除用户阅读进度"""
     book_id = 1
@@ -24,3 +34,59 @@ def test_user_reading_progress():
     """测试获取用户阅读进度"""
     response = requests.get(f"{BASE_URL}/user_reading_progress/get", headers=headers)
     assert response.status_code == 200
+
+
+def test_sync_user_reading_progress():
+    """测试批量同步阅读进度"""
+    toc = requests.get(f"{BASE_URL}/book/toc/2", headers=headers).json()["data"]
+    data = {
+        "entries": [
+            {"book_id": 1, "last_chapter_id": 1, "last_position": 10, "last_read_at": "2025-01-01T08:00:00"},
+            {"book_id": 2, "last_chapter_id": toc[0][0], "last_position": 20},
+        ]
+    }
+    response = requests.patch(f"{BASE_URL}/user_reading_progress/sync", headers=headers, json=data)
+    assert response.status_code == 200
+    assert response.json()["data"]["synced"] == 2
+
+
+def test_sync_user_reading_progress_chapter_of_other_book():
+    """测试批量同步时章节不属于对应图书：整个请求返回 400"""
+    data = {
+        "entries": [
+            {"book_id": 1, "last_chapter_id": 1, "last_position": 10},
+            {"book_id": 2, "last_chapter_id": 1, "last_position": 20},
+        ]
+    }
+    response = requests.patch(f"{BASE_URL}/user_reading_progress/sync", headers=headers, json=data)
+    assert response.status_code == 400
+
+
+def test_user_reading_stats():
+    """测试阅读统计：更新进度后当天统计与连续天数"""
+    data = {"book_id": 1, "last_chapter_id": 1, "last_position": 1}
+    requests.patch(f"{BASE_URL}/user_reading_progress/add", headers=headers, json=data)
+    response = requests.get(f"{BASE_URL}/user_reading_progress/stats", headers=headers)
+    assert response.status_code == 200
+    stats = response.json()["data"]
+    assert stats["today"]["chapters_read"] >= 1
+    assert stats["current_streak"] >= 1
+    assert stats["longest_streak"] >= stats["current_streak"]
+
+
+def _popularity_score(book_id: int) -> float:
+    response = requests.get(f"{BASE_URL}/book/popular", headers=headers, params={"period": "all", "limit": 100})
+    assert response.status_code == 200
+    return next((row["score"] for row in response.json()["data"] if row["book_id"] == book_id), 0)
+
+
+def test_progress_updates_count_one_read_per_chapter():
+    """测试同一章节的多次进度更新只计一次热度"""
+    data = {"book_id": 1, "last_chapter_id": 1, "last_position": 1}
+    requests.patch(f"{BASE_URL}/user_reading_progress/add", headers=headers, json=data)
+    score = _popularity_score(1)
+    assert score >= 1
+    data["last_position"] = 2
+    response = requests.patch(f"{BASE_URL}/user_reading_progress/add", headers=headers, json=data)
+    assert response.status_code == 200
+    assert _popularity_score(1) == score